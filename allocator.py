@@ -0,0 +1,163 @@
+import threading
+import time
+from sqlalchemy import select, update
+from models import db, ParkingSpot
+import occupancy
+
+# --- In-memory spot allocator ---
+# Keeps a set of free spot ids per lot so booking can hand out a spot in
+# constant time instead of loading every available spot. The sets are built
+# from the database on first use and kept current by every route that changes
+# a spot's state in this process. Spots freed elsewhere (the expiry worker,
+# another app worker, replay-events) are picked up by a full reload every
+# `refresh_interval` seconds, and a lot is re-read from the database whenever
+# its set has nothing left to hand out.
+
+
+class SpotAllocator:
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._free = {}  # lot_id -> set of free spot ids
+        self._lock = threading.Lock()
+        self._loaded_at = None
+
+    def load(self):
+        rows = db.session.query(ParkingSpot.id, ParkingSpot.lot_id).filter(
+            ParkingSpot.is_available == True,
+            ParkingSpot.status == 'A'
+        ).all()
+        free = {}
+        for spot_id, lot_id in rows:
+            free.setdefault(lot_id, set()).add(spot_id)
+        with self._lock:
+            self._free = free
+            self._loaded_at = time.monotonic()
+
+    def load_lot(self, lot_id):
+        """Re-read one lot's free spots from the database. Returns the new set."""
+        free = set(db.session.scalars(select(ParkingSpot.id).where(
+            ParkingSpot.lot_id == lot_id, ParkingSpot.is_available == True, ParkingSpot.status == 'A')))
+        with self._lock:
+            self._free[lot_id] = free
+            return set(free)
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            self.load()
+
+    def free_count(self, lot_id):
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._free.get(lot_id, ()))
+
+    def free_counts(self):
+        self._ensure_loaded()
+        with self._lock:
+            return {lot_id: len(spots) for lot_id, spots in self._free.items()}
+
+    def claim(self, lot_id, accept=None):
+        """Take any free spot in the lot (that `accept` approves) off the free list. Returns its id, or None.
+
+        Candidates are taken off the list one at a time and `accept` runs
+        outside the lock, since it may read the database. Rejected ones are
+        put back afterwards.
+        """
+        self._ensure_loaded()
+        rejected = []
+        try:
+            while True:
+                with self._lock:
+                    spots = self._free.get(lot_id)
+                    if not spots:
+                        return None
+                    spot_id = spots.pop()
+                if accept is None or accept(spot_id):
+                    return spot_id
+                rejected.append(spot_id)
+        finally:
+            if rejected:
+                with self._lock:
+                    self._free.setdefault(lot_id, set()).update(rejected)
+
+    def claim_spot(self, lot_id, spot_id):
+        """Take a specific spot off the free list. Returns False if it was not free."""
+        self._ensure_loaded()
+        with self._lock:
+            spots = self._free.get(lot_id)
+            if not spots or spot_id not in spots:
+                return False
+            spots.remove(spot_id)
+            return True
+
+    def reserve(self, lot_id, spot_id=None, attempts=5, accept=None):
+        """Claim a free spot (or the given one) for the current transaction.
+
+        The claim is a conditional ``UPDATE ... WHERE is_available`` so two
+        requests can never both get the same spot, even across processes whose
+        free lists have drifted. A candidate that loses the race is dropped and
+        the next free one is tried. When the free list has nothing suitable the
+        lot is re-read from the database once, since another process may have
+        freed spots since. Returns the claimed spot id or None.
+        """
+        reloaded = False
+        for _ in range(attempts):
+            if spot_id is None:
+                candidate = self.claim(lot_id, accept)
+                if candidate is None and not reloaded:
+                    self.load_lot(lot_id)
+                    reloaded = True
+                    candidate = self.claim(lot_id, accept)
+                if candidate is None:
+                    return None
+            elif self.claim_spot(lot_id, spot_id):
+                candidate = spot_id
+            elif not reloaded and spot_id in self.load_lot(lot_id) and self.claim_spot(lot_id, spot_id):
+                reloaded = True
+                candidate = spot_id
+            else:
+                return None
+
+            result = db.session.execute(
+                update(ParkingSpot)
+                .where(ParkingSpot.id == candidate, ParkingSpot.lot_id == lot_id,
+                       ParkingSpot.is_available == True, ParkingSpot.status == 'A')
+                .values(is_available=False, status='O')
+            )
+            if result.rowcount == 1:
+                occupancy.move(lot_id, 'A', 'O')
+                return candidate
+            if spot_id is not None:
+                return None
+        return None
+
+    def release(self, lot_id, spot_id):
+        self._ensure_loaded()
+        with self._lock:
+            self._free.setdefault(lot_id, set()).add(spot_id)
+
+    def release_many(self, spots):
+        # spots: iterable of (lot_id, spot_id)
+        self._ensure_loaded()
+        with self._lock:
+            for lot_id, spot_id in spots:
+                self._free.setdefault(lot_id, set()).add(spot_id)
+
+    def discard(self, lot_id, spot_id):
+        self._ensure_loaded()
+        with self._lock:
+            self._free.get(lot_id, set()).discard(spot_id)
+
+    def discard_many(self, lot_id, spot_ids):
+        self._ensure_loaded()
+        with self._lock:
+            self._free.get(lot_id, set()).difference_update(spot_ids)
+
+    def drop_lot(self, lot_id):
+        with self._lock:
+            self._free.pop(lot_id, None)
+
+
+allocator = SpotAllocator()
@@ -0,0 +1,186 @@
+import time
+from datetime import datetime, time as dt_time, timedelta
+import numpy as np
+from sqlalchemy import String, or_, select, type_coerce
+from models import db, ParkingLot, ParkingSpot, Reservation
+from expiry import now_local
+
+# --- Revenue and occupancy analytics ---
+# Pulls the reservation columns for a time window into NumPy arrays, one
+# chunk per round trip, and computes everything with array operations:
+# intervals are clipped to the window and to "now", then folded into an hourly
+# occupied-spot-hours curve with a difference array, and grouped per lot with
+# bincount. Spot totals come from the per-lot counters, so utilization is
+# measured against today's lot sizes.
+
+ANALYTICS_CHUNK = 50000
+DEFAULT_DAYS = 30
+HOUR = np.timedelta64(1, 'h')
+
+
+def parse_window(args):
+    """Read ?from=YYYY-MM-DD&to=YYYY-MM-DD&lot_id=N. Raises ValueError.
+
+    Defaults to the last DEFAULT_DAYS days. The window ends at the end of
+    `to` or at the current hour, whichever is earlier.
+    """
+    now = now_local()
+    end_day = datetime.strptime(args['to'], '%Y-%m-%d').date() if args.get('to') else now.date()
+    start_day = datetime.strptime(args['from'], '%Y-%m-%d').date() if args.get('from') \
+        else end_day - timedelta(days=DEFAULT_DAYS - 1)
+    if end_day < start_day:
+        raise ValueError("'to' must not be before 'from'")
+    lot_id = int(args['lot_id']) if args.get('lot_id') else None
+
+    start = datetime.combine(start_day, dt_time.min)
+    current_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    end = min(datetime.combine(end_day + timedelta(days=1), dt_time.min), current_hour)
+    if end <= start:
+        raise ValueError("The window starts in the future")
+    return start, end, lot_id
+
+
+def load_arrays(start, end, lot_id=None, chunk=ANALYTICS_CHUNK):
+    """Reservations overlapping [start, end) as column arrays: lot_id, parking_time, leaving_time, cost, completed."""
+    # Times are fetched as they come from the driver (strings on SQLite) and
+    # parsed by NumPy in bulk instead of one datetime per row
+    stmt = select(
+        ParkingSpot.lot_id,
+        type_coerce(Reservation.parking_time, String),
+        type_coerce(Reservation.leaving_time, String),
+        Reservation.cost,
+        Reservation.status,
+    ).join(ParkingSpot, ParkingSpot.id == Reservation.spot_id).where(
+        Reservation.parking_time < end,
+        or_(Reservation.leaving_time > start, Reservation.leaving_time.is_(None)),
+    )
+    if lot_id:
+        stmt = stmt.where(ParkingSpot.lot_id == lot_id)
+
+    parts = {'lot_id': [], 'parking_time': [], 'leaving_time': [], 'cost': [], 'completed': []}
+    result = db.session.connection().execute(stmt, execution_options={'stream_results': True, 'max_row_buffer': chunk})
+    try:
+        while rows := result.fetchmany(chunk):
+            lots, starts, ends, costs, statuses = zip(*rows)
+            parts['lot_id'].append(np.array(lots, dtype=np.int64))
+            parts['parking_time'].append(np.array(starts, dtype='datetime64[us]'))
+            parts['leaving_time'].append(np.array(ends, dtype='datetime64[us]'))
+            parts['cost'].append(np.array(costs, dtype=np.float64))
+            parts['completed'].append(np.array(statuses) == 'Completed')
+    finally:
+        result.close()
+
+    empty = {'lot_id': np.int64, 'parking_time': 'datetime64[us]', 'leaving_time': 'datetime64[us]',
+             'cost': np.float64, 'completed': bool}
+    return {name: np.concatenate(arrays) if arrays else np.array([], dtype=empty[name])
+            for name, arrays in parts.items()}
+
+
+def hourly_occupancy(starts, ends, hours):
+    """Occupied spot-hours in each of `hours` buckets, for intervals given in hours from the window start."""
+    first, last = np.floor(starts).astype(np.int64), np.floor(ends).astype(np.int64)
+    same = first == last
+    spans = ~same
+
+    # Partial hours at either end of each interval, then +1 for every whole hour in between.
+    # bincount of an empty selection is int64 even with weights, so accumulate into floats.
+    partial = np.zeros(hours + 1)
+    partial += np.bincount(first[same], weights=(ends - starts)[same], minlength=hours + 1)
+    partial += np.bincount(first[spans], weights=(first + 1 - starts)[spans], minlength=hours + 1)
+    partial += np.bincount(last[spans], weights=(ends - last)[spans], minlength=hours + 1)
+    steps = np.bincount(first[spans] + 1, minlength=hours + 2) - np.bincount(last[spans], minlength=hours + 2)
+    return (partial[:hours] + np.cumsum(steps)[:hours])
+
+
+def compute(columns, start, end, lot_sizes):
+    """Occupancy, utilization, dwell time and revenue for the window from load_arrays output."""
+    now = np.datetime64(now_local(), 'us')
+    window_start, window_end = np.datetime64(start, 'us'), np.datetime64(end, 'us')
+    hours = int((window_end - window_start) // HOUR)
+
+    lots = np.array(sorted(lot_sizes), dtype=np.int64)
+    count = len(lots)
+    # A cancelled advance booking is Completed with no charge and never occupied its spot
+    keep = ~(columns['completed'] & (columns['cost'] == 0)) & np.isin(columns['lot_id'], lots)
+    lot_ids, parked, left, cost = (columns[name][keep] for name in ('lot_id', 'parking_time', 'leaving_time', 'cost'))
+
+    # Open bookings (and ones with no leaving time) occupy their spot up to now
+    left = np.where(np.isnat(left) | (left > now), now, left)
+    clipped_start = np.clip(parked, window_start, window_end)
+    clipped_end = np.clip(left, window_start, window_end)
+    occupied = np.maximum((clipped_end - clipped_start) / HOUR, 0.0)
+    active = occupied > 0
+
+    curve = hourly_occupancy(((clipped_start - window_start) / HOUR)[active],
+                             ((clipped_end - window_start) / HOUR)[active], hours)
+
+    lot_index = np.searchsorted(lots, lot_ids)
+    occupied_hours = np.bincount(lot_index, weights=occupied, minlength=count)
+    # Revenue and dwell time belong to the window the booking started in
+    started = parked >= window_start
+    reservations = np.bincount(lot_index[started], minlength=count)
+    revenue = np.bincount(lot_index[started], weights=cost[started], minlength=count)
+    finished = started & (left <= now)
+    dwell = np.maximum((left - parked) / HOUR, 0.0)
+    dwell_total = np.bincount(lot_index[finished], weights=dwell[finished], minlength=count)
+    dwell_count = np.bincount(lot_index[finished], minlength=count)
+
+    spots = np.array([lot_sizes.get(int(lot), 0) for lot in lots], dtype=np.float64)
+    spot_hours = spots * hours
+    total_spots = sum(lot_sizes.values())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(spot_hours > 0, occupied_hours / spot_hours, 0.0)
+        per_spot_hour = np.where(spot_hours > 0, revenue / spot_hours, 0.0)
+        avg_dwell = np.where(dwell_count > 0, dwell_total / dwell_count, 0.0)
+    occupancy = curve / total_spots if total_spots else np.zeros(hours)
+
+    # Average occupancy for each hour of the day over the window
+    hour_of_day = (np.arange(hours) + start.hour) % 24
+    by_hour = np.bincount(hour_of_day, weights=occupancy, minlength=24) / np.maximum(np.bincount(hour_of_day, minlength=24), 1)
+
+    return {
+        'window': {'from': start.isoformat(), 'to': end.isoformat(), 'hours': hours},
+        'reservations': int(reservations.sum()),
+        'total_spots': int(total_spots),
+        'occupied_hours': round(float(occupied_hours.sum()), 2),
+        'utilization': round(float(occupied_hours.sum() / (total_spots * hours)), 4) if total_spots and hours else 0.0,
+        'revenue': round(float(revenue.sum()), 2),
+        'avg_dwell_hours': round(float(dwell_total.sum() / dwell_count.sum()), 2) if dwell_count.sum() else 0.0,
+        'peak_hours': [int(h) for h in np.argsort(-by_hour, kind='stable')[:3]],
+        'hourly': {
+            'labels': [str(t) for t in (window_start + np.arange(hours) * HOUR).astype('datetime64[h]')],
+            'occupancy': np.round(occupancy, 4).tolist(),
+        },
+        'hour_of_day': {'labels': list(range(24)), 'occupancy': np.round(by_hour, 4).tolist()},
+        'lots': [{
+            'lot_id': int(lot),
+            'spots': int(spots[i]),
+            'reservations': int(reservations[i]),
+            'occupied_hours': round(float(occupied_hours[i]), 2),
+            'utilization': round(float(utilization[i]), 4),
+            'revenue': round(float(revenue[i]), 2),
+            'revenue_per_spot_hour': round(float(per_spot_hour[i]), 2),
+            'avg_dwell_hours': round(float(avg_dwell[i]), 2),
+        } for i, lot in enumerate(lots)],
+    }
+
+
+def report(start, end, lot_id=None):
+    started = time.perf_counter()
+    columns = load_arrays(start, end, lot_id)
+    loaded = time.perf_counter()
+
+    query = db.session.query(ParkingLot.id, ParkingLot.location_name,
+                             ParkingLot.available_count + ParkingLot.occupied_count + ParkingLot.unavailable_count)
+    if lot_id:
+        query = query.filter(ParkingLot.id == lot_id)
+    lots = query.all()
+    result = compute(columns, start, end, {lot.id: lot[2] for lot in lots})
+    names = {lot.id: lot.location_name for lot in lots}
+    for lot in result['lots']:
+        lot['location'] = names[lot['lot_id']]
+    result['elapsed_ms'] = {
+        'load': round((loaded - started) * 1000, 1),
+        'compute': round((time.perf_counter() - loaded) * 1000, 1),
+    }
+    return result
@@ -0,0 +1,101 @@
+from sqlalchemy import select
+from models import ParkingLot, ParkingSpot, Reservation, ReservationEvent
+
+# --- /api listing queries ---
+# Statements, filters and row serializers for the read API, shared by the
+# Flask handlers in app.py and the async service in async_api.py so both
+# serve exactly the contract in api.yaml. `args` is any mapping of query
+# string values (werkzeug or Starlette).
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_STREAM_CHUNK = 1000
+
+
+def _int_arg(args, name, default):
+    try:
+        return int(args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def page_args(args):
+    """Return (after_id, limit, ndjson) for a keyset-paginated listing."""
+    after_id = _int_arg(args, 'after_id', 0)
+    limit = min(max(_int_arg(args, 'limit', API_PAGE_SIZE), 1), API_MAX_PAGE_SIZE)
+    return after_id, limit, args.get('format') == 'ndjson'
+
+
+def paged(stmt, id_column, after_id):
+    return stmt.where(id_column > after_id).order_by(id_column)
+
+
+def lots_listing(args):
+    stmt = select(ParkingLot.id, ParkingLot.location_name, ParkingLot.address,
+                  ParkingLot.pin_code, ParkingLot.price_per_hour)
+
+    return 'lots', stmt, ParkingLot.id, lambda lot: {
+        'id': lot.id,
+        'location_name': lot.location_name,
+        'address': lot.address,
+        'pin_code': lot.pin_code,
+        'price': lot.price_per_hour
+    }
+
+
+def spots_listing(args):
+    lot_id = args.get('lot_id')
+    status = args.get('status')
+
+    stmt = select(ParkingSpot.id, ParkingSpot.spot_number, ParkingSpot.status, ParkingSpot.lot_id)
+    if lot_id:
+        stmt = stmt.where(ParkingSpot.lot_id == lot_id)
+    if status:
+        stmt = stmt.where(ParkingSpot.status == status)
+
+    return 'spots', stmt, ParkingSpot.id, lambda spot: {
+        'id': spot.id,
+        'spot_number': spot.spot_number,
+        'status': spot.status,
+        'lot_id': spot.lot_id
+    }
+
+
+def reservations_listing(args):
+    user_id = args.get('user_id')
+    stmt = select(Reservation.id, Reservation.user_id, Reservation.spot_id,
+                  Reservation.parking_time, Reservation.leaving_time, Reservation.status)
+    if user_id:
+        stmt = stmt.where(Reservation.user_id == user_id)
+
+    return 'reservations', stmt, Reservation.id, lambda res: {
+        'id': res.id,
+        'user_id': res.user_id,
+        'spot_id': res.spot_id,
+        'parking_time': res.parking_time.isoformat() if res.parking_time else None,
+        'leaving_time': res.leaving_time.isoformat() if res.leaving_time else None,
+        'status': res.status
+    }
+
+
+def events_listing(args):
+    kind = args.get('kind')
+    stmt = select(ReservationEvent.id, ReservationEvent.kind, ReservationEvent.occurred_at, ReservationEvent.reservation_id,
+                  ReservationEvent.spot_id, ReservationEvent.lot_id, ReservationEvent.user_id, ReservationEvent.spot_status,
+                  ReservationEvent.day, ReservationEvent.amount, ReservationEvent.data)
+    if kind:
+        stmt = stmt.where(ReservationEvent.kind == kind)
+
+    return 'events', stmt, ReservationEvent.id, lambda event: {
+        'id': event.id,
+        'kind': event.kind,
+        'occurred_at': event.occurred_at.isoformat(),
+        'reservation_id': event.reservation_id,
+        'spot_id': event.spot_id,
+        'lot_id': event.lot_id,
+        'user_id': event.user_id,
+        'spot_status': event.spot_status,
+        'day': event.day.isoformat() if event.day else None,
+        'amount': event.amount,
+        'data': event.data
+    }
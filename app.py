@@ -1,23 +1,52 @@
-from datetime import date, datetime
-from pytz import timezone
-from flask import Flask, render_template, redirect, url_for, request, session, flash, jsonify
+from datetime import datetime, timezone
+from flask import Flask, render_template, redirect, url_for, request, session, flash, jsonify, Response, stream_with_context, send_file
 from flask_login import LoginManager, login_user, logout_user, login_required, UserMixin, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, Admin, User, ParkingLot, ParkingSpot, Reservation 
+from models import db, Admin, User, ParkingLot, ParkingSpot, Reservation
+import rollups
+import events
+from expiry import ExpiryScheduler, now_local
+from allocator import allocator
+from intervals import interval_index, has_overlap, lock_spot, bookable_spot_ids
+from bulk_booking import BulkBookingError, parse_request as parse_bulk_request, book_many
+from availability import availability_feed, snapshot as availability_snapshot
+from chart_cache import chart_cache, GLOBAL, user_scope
+import charts
+import analytics
+from provisioning import provision_spots, retire_spots
+import occupancy
+from profiler import SQLProfiler
+from auth import IdentityCache, role_required, add_identifiers, remove_identifiers, identifiers_taken, find_principal
+from passwords import PasswordHasher, HasherBusy
+from config import configure_database
+from api_queries import API_STREAM_CHUNK, page_args, paged, lots_listing, spots_listing, reservations_listing, events_listing
+from replica import configure_replica, replica_reads
+from export import EXPORT_FORMATS, ExportError, parse_filters as parse_export_filters, export_query, iter_csv, write_columnar, export_to_file, filename as export_filename
 import os
+import tempfile
 from forms import RegistrationForm, LoginForm
-from collections import defaultdict, Counter
-from sqlalchemy import func
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import OperationalError
 import json
+import time
+import click
 from flask_migrate import Migrate
 
 app = Flask(__name__, static_folder='static')
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'instance', 'parking.db')
+configure_database(app)
+replica_sync = configure_replica(app)
 app.config['SECRET_KEY'] = 'secret-key'
+app.config['SQL_PROFILING'] = os.environ.get('SQL_PROFILING', '0') == '1'
 db.init_app(app)
 migrate = Migrate(app, db)
 
+expiry_scheduler = ExpiryScheduler(app)
+event_snapshotter = events.EventSnapshotter(app)
+sql_profiler = SQLProfiler(app)
+identity_cache = IdentityCache()
+password_hasher = PasswordHasher(app)
+chart_cache.init_app(app)
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -35,17 +64,54 @@ class UnifiedUser(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
+    # user_id is the 'role:id' string from UnifiedUser.get_id
+    identity = identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+
     role, actual_id = user_id.split(':')
     if role == 'admin':
         admin = db.session.get(Admin, int(actual_id))
 
         if admin:
-            return UnifiedUser(f"{admin.id}", 'admin')
+            identity = UnifiedUser(f"{admin.id}", 'admin')
     else:
         user = db.session.get(User, int(actual_id))
         if user:
-            return UnifiedUser(f"{user.id}", 'user')
-    return None
+            identity = UnifiedUser(f"{user.id}", 'user')
+
+    if identity is not None:
+        identity_cache.set(user_id, identity)
+    return identity
+
+
+# Any flush that edits or deletes an account drops its cached identity, whichever
+# route or command made it. Bulk query.delete()/update() skip these hooks.
+def forget_identity(role):
+    def forget(mapper, connection, target):
+        identity_cache.invalidate(f"{role}:{target.id}")
+    return forget
+
+for model, role in ((Admin, 'admin'), (User, 'user')):
+    event.listen(model, 'after_update', forget_identity(role))
+    event.listen(model, 'after_delete', forget_identity(role))
+
+ADMIN_PAGE_SIZE = 50
+RECENT_RESERVATIONS_PER_USER = 5
+
+
+def listing_args(sort_columns, default_sort, default_dir='asc'):
+    # Page number and ORDER BY clause for an admin listing (?page=&sort=&dir=)
+    page = max(request.args.get('page', 1, type=int), 1)
+    sort = request.args.get('sort', default_sort)
+    if sort not in sort_columns:
+        sort = default_sort
+    direction = request.args.get('dir', default_dir)
+    if direction not in ('asc', 'desc'):
+        direction = default_dir
+    column = sort_columns[sort]
+    order = column.desc() if direction == 'desc' else column.asc()
+    return page, sort, direction, order
 
 # --- Routes ---
 
@@ -62,24 +128,24 @@ def login():
         login_input = form.login_input.data
         password = form.password.data
 
-        # Try user login with email or full name
-        user = User.query.filter(
-            (User.email == login_input) | (User.full_name == login_input)
-        ).first()
-
-        if user and check_password_hash(user.password, password):
-            login_user(UnifiedUser(str(user.id), 'user'))
-            session['user_id'] = user.id
-            session['role'] = 'user'
-            return redirect(url_for('user_dashboard'))
-
-        # Admin login
-        admin = Admin.query.filter_by(username=login_input).first()
-        if admin and check_password_hash(admin.password, password):
-            login_user(UnifiedUser(str(admin.id), 'admin'))
-            session['admin_id'] = admin.id
-            session['role'] = 'admin'
-            return redirect(url_for('admin_dashboard'))
+        try:
+            # User email/full name or admin username, in one indexed lookup
+            principal = find_principal(login_input)
+            matches, new_hash = password_hasher.verify(principal[2], password) if principal else (False, None)
+            if matches:
+                role, principal_id, _ = principal
+                model = Admin if role == 'admin' else User
+                if new_hash:
+                    db.session.execute(update(model).where(model.id == principal_id).values(password=new_hash))
+                    db.session.commit()
+
+                login_user(UnifiedUser(str(principal_id), role))
+                session['admin_id' if role == 'admin' else 'user_id'] = principal_id
+                session['role'] = role
+                return redirect(url_for('admin_dashboard' if role == 'admin' else 'user_dashboard'))
+        except HasherBusy:
+            error = "Too many login attempts right now. Please try again in a moment."
+            return render_template('login.html', form=form, error=error), 503
 
         error = "Invalid username or password"
 
@@ -101,14 +167,23 @@ def register():
             flash("Passwords do not match.", "danger")
             return render_template("register.html", form=form)
 
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user:
+        taken = identifiers_taken(email, full_name)
+        if email in taken:
             flash("Email already registered.", "warning")
             return render_template("register.html", form=form)
+        if taken:
+            flash("That name is already taken. Please use a different full name.", "warning")
+            return render_template("register.html", form=form)
 
-        hashed_pw = generate_password_hash(password)
+        try:
+            hashed_pw = password_hasher.hash(password)
+        except HasherBusy:
+            flash("The server is busy. Please try again in a moment.", "warning")
+            return render_template("register.html", form=form), 503
         new_user = User(full_name=full_name, email=email, password=hashed_pw)
         db.session.add(new_user)
+        db.session.flush()
+        add_identifiers('user', new_user.id, email, full_name)
         db.session.commit()
 
         flash("Registration successful. Please log in.", "success")
@@ -119,70 +194,51 @@ def register():
 
 
 @app.route('/admin/dashboard')
-@login_required
+@role_required('admin')
 def admin_dashboard():
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-
-    bookings = Reservation.query.all()
-
-    # Group by date
-    bookings_by_date = defaultdict(int)
-    for booking in bookings:
-        date_str = booking.parking_time.strftime('%Y-%m-%d')
-        bookings_by_date[date_str] += 1
-
-    sorted_dates = sorted(bookings_by_date.items())
-    dates = [d for d, _ in sorted_dates]
-    counts = [c for _, c in sorted_dates]
-
-    # Count bookings per lot
-    lot_bookings = Counter()
-    for booking in bookings:
-        if booking.spot and booking.spot.lot:
-            lot_bookings[booking.spot.lot.location_name] += 1
-
-    lots = list(lot_bookings.keys())
-    lot_counts = list(lot_bookings.values())
-
-    # Top users by number of bookings
-    user_counts = db.session.query(
-        User.full_name, db.func.count(Reservation.id)
-    ).join(Reservation).group_by(User.full_name).order_by(db.func.count(Reservation.id).desc()).limit(5).all()
-
-    top_users = [u[0] for u in user_counts]
-    user_booking_counts = [u[1] for u in user_counts]
-
-    # Count available vs occupied spots
-    from models import ParkingSpot  # if not already imported
-    available_count = ParkingSpot.query.filter_by(status='Available').count()
-    occupied_count = ParkingSpot.query.filter_by(status='Occupied').count()
-
-    spot_status_data = {
-        'labels': ['Available', 'Occupied'],
-        'counts': [available_count, occupied_count]
-    }
-
-    bookings_data = {
-        'dates': dates,
-        'counts': counts,
-        'top_users': top_users,
-        'user_booking_counts': user_booking_counts
-    }
-
-    lots_data = {
-        'lots': lots,
-        'counts': lot_counts
-    }
-
-    return render_template("admin_dashboard.html", bookings_data=bookings_data, lots_data=lots_data, spot_status_data=spot_status_data)
+    # Chart data is fetched by static/js/admin_charts.js from admin_chart
+    return render_template("admin_dashboard.html")
+
+
+ADMIN_CHARTS = {
+    'bookings': lambda start, end, granularity: charts.bookings_over_time(start, end, granularity),
+    'lots': lambda start, end, granularity: charts.bookings_per_lot(start, end),
+    'top-users': lambda start, end, granularity: charts.top_users(start, end),
+    'spot-status': lambda start, end, granularity: charts.spot_status(),
+}
+
+USER_CHARTS = {
+    'bookings': charts.user_bookings,
+    'costs': charts.user_costs,
+}
+
+
+def chart_response(scope, name, compute):
+    """Cached chart JSON with ETag/Last-Modified, answering 304 when the client's copy is current."""
+    entry = chart_cache.get_or_compute(scope, name, lambda: charts.cache_entry(compute()))
+    response = jsonify(entry['data'])
+    response.set_etag(entry['etag'])
+    response.last_modified = datetime.fromtimestamp(entry['generated_at'], timezone.utc)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.route('/admin/charts/<name>')
+@role_required('admin', json=True)
+def admin_chart(name):
+    if name not in ADMIN_CHARTS:
+        return jsonify({'error': 'Unknown chart'}), 404
+    try:
+        start, end, granularity = charts.parse_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return chart_response(GLOBAL, charts.cache_name(name, start, end, granularity),
+                          lambda: ADMIN_CHARTS[name](start, end, granularity))
 
 @app.route('/admin/add_lot', methods=['GET', 'POST'])
-@login_required
+@role_required('admin')
 def add_parking_lot():
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-
     if request.method == 'POST':
         location = request.form['location']
         address = request.form['address']
@@ -194,30 +250,23 @@ def add_parking_lot():
         lot = ParkingLot(location_name=location, address=address, pin_code=pincode,
                          price_per_hour=price, max_spots=max_spots)
         db.session.add(lot)
-        db.session.commit()
+        db.session.flush()
 
         # Create spots
-        for i in range(1, max_spots + 1):
-            spot = ParkingSpot(
-                lot_id=lot.id,
-                spot_number=f"S{i}",
-                status='A',
-                is_available=True
-            )   
-            db.session.add(spot)
+        new_spot_ids = provision_spots(lot.id, max_spots, start_number=1)
 
         db.session.commit()
+        allocator.release_many((lot.id, spot_id) for spot_id in new_spot_ids)
+        availability_feed.resync_all()
+        chart_cache.invalidate(GLOBAL)
         flash("Parking lot created successfully", "success")
         return redirect(url_for('admin_dashboard'))
     
     return render_template('add_parking_lot.html')
 
 @app.route('/admin/lots', methods=['GET', 'POST'])
-@login_required
+@role_required('admin')
 def view_parking_lots():
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-
     if request.method == 'POST':
         lot_id = request.form.get('lot_id')
         lot = ParkingLot.query.get(lot_id)
@@ -232,18 +281,14 @@ def view_parking_lots():
 
 
 @app.route('/admin/edit_lot/<int:lot_id>', methods=['GET', 'POST'])
-@login_required
+@role_required('admin')
 def edit_lot(lot_id):
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-    
     lot = ParkingLot.query.get(lot_id)
 
     if not lot:
         flash("Parking lot not found.", "danger")
         return redirect(url_for('view_parking_lots'))
     
-    print("Rendering edit_lot page for:", lot.location_name)
 
     if request.method == 'POST':
         lot.location_name = request.form['location']
@@ -254,20 +299,34 @@ def edit_lot(lot_id):
         
         if new_spots < 0:
             flash("Max spots must be a positive number.", "danger")
-        else:
-            lot.max_spots = new_spots
-            db.session.commit()
-            flash("Parking lot updated, including max spots.", "success")
-            return redirect(url_for('view_parking_lots'))
+            return render_template('edit_parking_lot.html', lot=lot)
+
+        # Resize the lot: add spots, or retire free spots with no booking history
+        current_spot_count = ParkingSpot.query.filter_by(lot_id=lot.id).count()
+        added_ids, retired_ids = [], []
+        if new_spots > current_spot_count:
+            added_ids = provision_spots(lot.id, new_spots - current_spot_count)
+        elif new_spots < current_spot_count:
+            retired_ids = retire_spots(lot.id, current_spot_count - new_spots)
+            if retired_ids is None:
+                db.session.rollback()
+                flash("Cannot shrink the lot that far: the remaining spots are occupied or have booking history.", "danger")
+                return redirect(url_for('edit_lot', lot_id=lot_id))
+
+        lot.max_spots = new_spots
+        db.session.commit()
+        allocator.release_many((lot_id, spot_id) for spot_id in added_ids)
+        allocator.discard_many(lot_id, retired_ids)
+        availability_feed.resync_all()
+        chart_cache.invalidate(GLOBAL)
+        flash("Parking lot updated, including max spots.", "success")
+        return redirect(url_for('view_parking_lots'))
 
     return render_template('edit_parking_lot.html', lot=lot)
 
 @app.route('/admin/delete_lot/<int:lot_id>', methods=['POST'])
-@login_required
+@role_required('admin')
 def delete_lot(lot_id):
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-
     lot = ParkingLot.query.get_or_404(lot_id)
 
     # Ensure all spots are available
@@ -281,15 +340,15 @@ def delete_lot(lot_id):
         
     db.session.delete(lot)
     db.session.commit()
+    allocator.drop_lot(lot_id)
+    availability_feed.resync_all()
+    chart_cache.invalidate(GLOBAL)
     flash("Parking lot deleted", "success")
     return redirect(url_for('view_parking_lots'))
 
 @app.route('/admin/add_spots/<int:lot_id>', methods=['POST'])
-@login_required
+@role_required('admin')
 def add_missing_spots(lot_id):
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-
     lot = ParkingLot.query.get_or_404(lot_id)
     current_spot_count = ParkingSpot.query.filter_by(lot_id=lot.id).count()
     missing_spots = lot.max_spots - current_spot_count
@@ -298,126 +357,121 @@ def add_missing_spots(lot_id):
         flash("No missing spots to add. All spots already exist.", "info")
         return redirect(url_for('view_parking_lots'))
 
-    for i in range(1, missing_spots + 1):
-        # Generate a unique spot number like S6, S7, ...
-        spot_number = f"S{current_spot_count + i}"
-        new_spot = ParkingSpot(
-            lot_id=lot.id,
-            status='A',
-            spot_number=spot_number,
-            is_available=True
-        )
-        db.session.add(new_spot)
+    # Numbered after the highest existing spot, like S6, S7, ...
+    new_spot_ids = provision_spots(lot.id, missing_spots)
 
     db.session.commit()
+    allocator.release_many((lot_id, spot_id) for spot_id in new_spot_ids)
+    availability_feed.resync_all()
+    chart_cache.invalidate(GLOBAL)
     flash(f"{missing_spots} missing spot(s) added to {lot.location_name}.", "success")
     return redirect(url_for('view_parking_lots'))
 
 
 @app.route('/admin/spots', methods=['GET', 'POST'])
-@login_required
+@role_required('admin')
 def manage_spots():
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-
     try:
-        # Auto-release expired bookings here
-        now = datetime.now(timezone('Asia/Kolkata'))
-        expired_bookings = Reservation.query.filter(
-            Reservation.status.in_(['Booked', 'O']),
-            Reservation.leaving_time < now
-        ).all()
-
-        for booking in expired_bookings:
-            booking.status = 'Completed'
-            booking.spot.is_available = True
-            booking.spot.status = 'A' 
-
-        db.session.commit()
-
-        # Then fetch lots/spots as usual
-        lots = ParkingLot.query.all()
+        # Expired bookings are released by the expiry scheduler (expiry.py)
+        lots = ParkingLot.query.order_by(ParkingLot.location_name).all()
         selected_lot_id = request.args.get('lot_id')
         selected_status = request.args.get('status')
-        #spots = []
+        page, sort, direction, order = listing_args(
+            {'id': ParkingSpot.id, 'lot': ParkingSpot.lot_id, 'status': ParkingSpot.status}, 'lot'
+        )
 
-        query = ParkingSpot.query
+        query = ParkingSpot.query.options(joinedload(ParkingSpot.lot))
         if selected_lot_id:
             query = query.filter_by(lot_id=selected_lot_id)
         if selected_status:
             query = query.filter_by(status=selected_status)
 
-        spots = query.all()
+        pagination = query.order_by(order, ParkingSpot.id).paginate(page=page, per_page=ADMIN_PAGE_SIZE, error_out=False)
 
-        return render_template("admin_spots.html", lots=lots, spots=spots, selected_lot_id=selected_lot_id, selected_status=selected_status)
+        return render_template("admin_spots.html", lots=lots, spots=pagination.items, pagination=pagination,
+                               selected_lot_id=selected_lot_id, selected_status=selected_status,
+                               sort=sort, direction=direction)
 
     except Exception as e:
-        print("Error in manage_slots:", e)
+        app.logger.exception("Error in manage_spots: %s", e)
         return "Internal Server Error", 500 
     
 
 @app.route('/admin/spots/<int:spot_id>/toggle')
-@login_required
+@role_required('admin')
 def toggle_spot_status(spot_id):
-    if current_user.role != 'admin':
-        return "Unauthorized", 403
-
     spot = ParkingSpot.query.get_or_404(spot_id)
     current_status = spot.status.strip().upper()
 
-    print("Toggle Requested for Spot ID:", spot.id)
-    print("Current Status Before Toggle:", repr(current_status))
-
     if current_status == 'A':
+        # An open booking on this spot would find it out of service when its window starts
+        if has_overlap(spot.id, now_local(), datetime.max):
+            flash("Spot has upcoming bookings and cannot be made unavailable until they finish or are cancelled", "danger")
+            return redirect(url_for('manage_spots'))
         spot.status = 'U'
-        print("Status changed to: U (Unavailable)")
     elif current_status == 'U':
         spot.status = 'A'
-        print("Status changed to: A (Available)")
     elif current_status == 'O':
-        print("Cannot toggle: Spot is occupied (O)")
         flash("Spot status cannot be toggled while Occupied", "danger")
         return redirect(url_for('manage_spots'))
     else:
-        print("Unrecognized status value")
+        app.logger.warning("Spot %s has unrecognized status %r", spot.id, current_status)
         flash("Unknown status value", "danger")
         return redirect(url_for('manage_spots'))
 
+    now_free = spot.status == 'A' and spot.is_available
+    lot_id, new_status = spot.lot_id, spot.status
+    occupancy.move(lot_id, current_status, new_status)
+    events.record(events.spot_toggled(spot.id, lot_id, current_status, new_status))
+
     db.session.commit()
+    app.logger.debug("Spot %s toggled %s -> %s", spot_id, current_status, 'A' if now_free else 'U')
+    if now_free:
+        allocator.release(lot_id, spot_id)
+    else:
+        allocator.discard(lot_id, spot_id)
+    availability_feed.publish([(lot_id, spot_id, current_status, new_status)])
+    chart_cache.invalidate(GLOBAL)
     flash("Spot status updated", "success")
     return redirect(url_for('manage_spots'))
 
 
-@app.route('/admin/users', methods = ['GET', 'POST'])
-@login_required
+@app.route('/admin/users')
+@role_required('admin', redirect_to='login')
 def manage_users():
-    if current_user.role != 'admin':
-        flash("Unauthorized access", "danger")
-        return redirect(url_for('login'))
-
-    users = User.query.all()
-    selected_user = None
-    reservations = []
-
-    if request.method == 'POST':
-        user_id = request.form.get('user_id')
-        if user_id:
-            selected_user = User.query.get(int(user_id))
-            reservations = Reservation.query.filter_by(user_id=user_id).all()
-        else:
-            reservations = Reservation.query.all()
-    else:
-        reservations = Reservation.query.all()
-
-    return render_template('admin_users.html', users=users, reservations=reservations, selected_user=selected_user)
+    search = request.args.get('q', '').strip()
+    page, sort, direction, order = listing_args(
+        {'name': User.full_name, 'email': User.email, 'joined': User.created_at}, 'name'
+    )
+
+    query = User.query
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(User.full_name.ilike(pattern) | User.email.ilike(pattern))
+
+    pagination = query.order_by(order, User.id).paginate(page=page, per_page=ADMIN_PAGE_SIZE, error_out=False)
+
+    # Each user's most recent reservations and total count, for the whole page in one
+    # query; a fleet user can have thousands, which the bookings page lists in full
+    ranked = select(
+        Reservation.user_id, Reservation.spot_id, Reservation.parking_time, Reservation.leaving_time,
+        func.row_number().over(partition_by=Reservation.user_id,
+                               order_by=(Reservation.parking_time.desc(), Reservation.id.desc())).label('position'),
+        func.count().over(partition_by=Reservation.user_id).label('total'),
+    ).where(Reservation.user_id.in_([user.id for user in pagination.items])).subquery()
+    recent, totals = {}, {}
+    for row in db.session.execute(select(ranked).where(ranked.c.position <= RECENT_RESERVATIONS_PER_USER)
+                                  .order_by(ranked.c.user_id, ranked.c.position)):
+        recent.setdefault(row.user_id, []).append(row)
+        totals[row.user_id] = row.total
+
+    return render_template('admin_users.html', users=pagination.items, pagination=pagination,
+                           search=search, sort=sort, direction=direction, recent=recent, totals=totals)
 
 
 @app.route('/admin/users/<int:user_id>/bookings')
-@login_required
+@role_required('admin', redirect_to='login')
 def view_user_bookings(user_id):
-    if current_user.role != 'admin':
-        return redirect(url_for('login'))
-
     user = User.query.get_or_404(user_id)
     bookings = Reservation.query.filter_by(user_id=user.id).all()
 
@@ -425,29 +479,73 @@ def view_user_bookings(user_id):
 
 
 @app.route('/admin/users/<int:user_id>/delete', methods=['POST'])
-@login_required
+@role_required('admin', redirect_to='login')
 def delete_user(user_id):
-    if current_user.role != 'admin':
-        return redirect(url_for('login'))
-
     user = User.query.get_or_404(user_id)
 
-    
+    events.record(events.user_deleted(user.id, rollups.remove_user(user.id)))
     Reservation.query.filter_by(user_id=user.id).delete()
+    remove_identifiers('user', user.id)
     db.session.delete(user)
     db.session.commit()
+    interval_index.invalidate()
+    chart_cache.invalidate(user_scope(user_id), GLOBAL)
     flash("User deleted", "info")
     return redirect(url_for('manage_users'))
 
 
+@app.route('/admin/bookings/export')
+@role_required('admin', redirect_to='login')
+@replica_reads
+def export_bookings():
+    fmt = request.args.get('format', 'csv')
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise ExportError(f"Export format must be one of {', '.join(EXPORT_FORMATS)}.")
+        start, end, lot_id = parse_export_filters(request.args)
+    except ExportError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('view_all_bookings'))
+
+    stmt = export_query(start, end, lot_id)
+    name = export_filename(fmt, start, end, lot_id)
+    if fmt == 'csv':
+        return Response(stream_with_context(iter_csv(stmt)), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={name}'})
+
+    # Parquet/Arrow need the whole file before it can be read, so spool it to disk, not memory
+    spool = tempfile.TemporaryFile()
+    try:
+        write_columnar(spool, fmt, stmt)
+    except ExportError as e:
+        spool.close()
+        flash(str(e), "danger")
+        return redirect(url_for('view_all_bookings'))
+    spool.seek(0)
+    return send_file(spool, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+
+
 @app.route('/admin/bookings')
-@login_required
+@role_required('admin', redirect_to='login')
+@replica_reads
 def view_all_bookings():
-    if current_user.role != 'admin':
-        flash("Unauthorized access", "danger")
-        return redirect(url_for('login'))
-
-    all_reservations = Reservation.query.join(User).join(ParkingSpot).join(ParkingLot).add_columns(
+    lots = ParkingLot.query.order_by(ParkingLot.location_name).all()
+    search = request.args.get('q', '').strip()
+    selected_lot_id = request.args.get('lot_id')
+    selected_status = request.args.get('status')
+    selected_user_id = request.args.get('user_id', type=int)
+    page, sort, direction, order = listing_args({
+        'user': User.full_name,
+        'lot': ParkingLot.location_name,
+        'start': Reservation.parking_time,
+        'end': Reservation.leaving_time,
+        'cost': Reservation.cost,
+        'status': Reservation.status,
+    }, 'start', 'desc')
+
+    query = Reservation.query.join(User).join(ParkingSpot).join(ParkingLot).with_entities(
+        Reservation.id,
         User.full_name.label('user_name'),
         ParkingSpot.spot_number.label('spot_number'),
         ParkingLot.location_name.label('lot_location'),
@@ -456,89 +554,73 @@ def view_all_bookings():
         Reservation.leaving_time,
         Reservation.cost,
         Reservation.status
-    ).all()
+    )
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(User.full_name.ilike(pattern) | Reservation.vehicle_number.ilike(pattern))
+    if selected_lot_id:
+        query = query.filter(ParkingSpot.lot_id == selected_lot_id)
+    if selected_status:
+        query = query.filter(Reservation.status == selected_status)
+    if selected_user_id:
+        query = query.filter(Reservation.user_id == selected_user_id)
+
+    pagination = query.order_by(order, Reservation.id).paginate(page=page, per_page=ADMIN_PAGE_SIZE, error_out=False)
 
-    return render_template('admin_bookings.html', bookings=all_reservations)
+    return render_template('admin_bookings.html', bookings=pagination.items, pagination=pagination, lots=lots,
+                           search=search, selected_lot_id=selected_lot_id, selected_status=selected_status,
+                           selected_user_id=selected_user_id, sort=sort, direction=direction)
 
 
 
 @app.route('/user/dashboard')
-@login_required
+@role_required('user')
 def user_dashboard():
-    if current_user.role != 'user':
-        return "Unauthorized", 403
-
     try:
-        user_id = current_user.id
-        user = db.session.get(User, user_id)
-        #user = User.query.get(user_id)
-        reservations = Reservation.query.filter_by(user_id=user_id).all()
-        active_booking = Reservation.query.filter_by(user_id=user_id,status='Booked').order_by(Reservation.parking_time.desc()).first()
+        user_id = int(current_user.id)
+        data = chart_cache.get_or_compute(user_scope(user_id), 'dashboard', lambda: user_dashboard_data(user_id))
+        return render_template('user_dashboard.html', **data)
         
+    except Exception as e:
+        app.logger.exception("Error in user_dashboard: %s", e)
+        return "Internal Server Error in user_dashboard", 500
 
-        # Auto-mark expired bookings
-        expired_bookings = Reservation.query.filter(
-        Reservation.user_id == user_id,
-        Reservation.status == 'Booked',
-        Reservation.leaving_time < datetime.now(timezone('Asia/Kolkata'))
-        ).all()
 
-        for booking in expired_bookings:
-            booking.status = 'Completed'
-            booking.spot.is_available = True
-            booking.spot.status = 'A' 
+def user_dashboard_data(user_id):
+    # Plain values only, so the result can be cached (and stored as JSON)
+    user = db.session.get(User, user_id)
+    active_booking = Reservation.query.filter_by(user_id=user_id,status='Booked').order_by(Reservation.parking_time.desc()).first()
 
-        db.session.commit()
-        
-        print("All Bookings:", reservations)
-        for r in reservations:
-            print(f"Booking ID {r.id} | Status: {r.status} | Start: {r.parking_time} | End: {r.leaving_time}")
-        print("System Time Now:", datetime.now())
-        print("Active Booking:", active_booking)
-        if active_booking:
-            print("Status:", active_booking.status)
-            print("Start:", active_booking.parking_time)
-            print("End:", active_booking.leaving_time)
- 
-        # Bookings over time
-        booking_stats = db.session.query(
-        func.date(Reservation.parking_time),
-        func.count()
-        ).filter_by(user_id=user_id).group_by(func.date(Reservation.parking_time)).all()
-
-        booking_dates = [str(row[0]) for row in booking_stats]
-        booking_counts = [row[1] for row in booking_stats]
-
-        # Cost per day
-        cost_stats = db.session.query(
-        func.date(Reservation.parking_time),
-        func.sum(Reservation.cost)
-        ).filter_by(user_id=user_id).group_by(func.date(Reservation.parking_time)).all()
-
-        cost_dates = [str(row[0]) for row in cost_stats]
-        daily_costs = [float(row[1]) for row in cost_stats]
-
-        # Latest booking
-        latest_booking = db.session.query(Reservation).filter_by(user_id=user_id).order_by(Reservation.parking_time.desc()).first()
-
-        return render_template('user_dashboard.html', user=user, reservations=reservations, active_booking=active_booking,
-            booking_dates=json.dumps(booking_dates),
-            booking_counts=json.dumps(booking_counts),
-            cost_dates=json.dumps(cost_dates),
-            daily_costs=json.dumps(daily_costs),
-            latest_booking=latest_booking
-        )
-        
-    except Exception as e:
-        print("Error in user_dashboard:", e)
-        return "Internal Server Error in user_dashboard", 500
+    # Latest booking
+    latest_booking = db.session.query(Reservation).filter_by(user_id=user_id).order_by(Reservation.parking_time.desc()).first()
+
+    return {
+        'user': {'full_name': user.full_name, 'email': user.email},
+        'active_booking': {'id': active_booking.id, 'status': active_booking.status} if active_booking else None,
+        'latest_booking': {
+            'spot_id': latest_booking.spot_id,
+            'parking_time': str(latest_booking.parking_time),
+            'cost': latest_booking.cost,
+        } if latest_booking else None,
+    }
+
+
+@app.route('/user/charts/<name>')
+@role_required('user', json=True)
+def user_chart(name):
+    if name not in USER_CHARTS:
+        return jsonify({'error': 'Unknown chart'}), 404
+    try:
+        start, end, granularity = charts.parse_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    user_id = int(current_user.id)
+    return chart_response(user_scope(user_id), charts.cache_name(name, start, end, granularity),
+                          lambda: USER_CHARTS[name](user_id, start, end, granularity))
 
 @app.route('/user/booking_history')
-@login_required
+@role_required('user')
 def booking_history():
-    if current_user.role != 'user':
-        return "Unauthorized", 403
-
     user_id = int(current_user.get_id().split(':')[1])
     reservations = Reservation.query.filter_by(user_id=user_id).all()
 
@@ -546,53 +628,85 @@ def booking_history():
 
 
 @app.route('/book', methods=['GET', 'POST'])
-@login_required
+@role_required('user')
 def book_slot():
-    if current_user.role != 'user':
-        return "Unauthorized", 403
-
     lots = ParkingLot.query.filter_by(status='Active').all()
-    active_lot_ids = [lot.id for lot in lots]
-    available_spots = ParkingSpot.query.filter(
-        ParkingSpot.is_available == True,
-        ParkingSpot.lot_id.in_(active_lot_ids)
-    ).all()
 
     if request.method == 'POST':
-        spot_id = request.form.get('spot_id')
+        lot_id = request.form.get('lot_id', type=int)
+        spot_number = request.form.get('spot_number', '').strip().upper()
         vehicle_number = request.form['vehicle_number']
-        # lot_id = int(request.form['lot_id'])  
         raw_start = request.form['start_time'].strip().upper()
         raw_end = request.form['end_time'].strip().upper()
+        raw_date = request.form.get('booking_date', '').strip()
+        now = now_local()
 
-        # Get today's date
-        today = date.today()
-
+        # Bookings are for today unless a date is given (advance booking)
         try:
-            start_time = datetime.strptime(f"{today} {raw_start}", "%Y-%m-%d %I:%M %p")
-            end_time = datetime.strptime(f"{today} {raw_end}", "%Y-%m-%d %I:%M %p")
+            day = datetime.strptime(raw_date, "%Y-%m-%d").date() if raw_date else now.date()
+            start_time = datetime.strptime(f"{day} {raw_start}", "%Y-%m-%d %I:%M %p")
+            end_time = datetime.strptime(f"{day} {raw_end}", "%Y-%m-%d %I:%M %p")
         except ValueError :
-            flash("Invalid time format. Please use format like '10:30 AM'", "danger")
+            flash("Invalid date or time format. Please use format like '10:30 AM'", "danger")
             return redirect(url_for('book_slot'))
         
         if end_time <= start_time:
             flash("End time must be after start time.", "warning")
             return redirect(url_for('book_slot'))
+
+        if end_time <= now:
+            flash("That time window has already passed.", "warning")
+            return redirect(url_for('book_slot'))
         
-        spot = db.session.get(ParkingSpot, spot_id)
-        lot = db.session.get(ParkingLot, spot.lot_id)
+        lot = db.session.get(ParkingLot, lot_id) if lot_id else None
+        if not lot:
+            flash("Invalid lot selected.", "danger")
+            return redirect(url_for('book_slot'))
 
         if lot.status != 'Active':
             flash("This parking lot is currently inactive. Please select another lot.", "danger")
             return redirect(url_for('book_slot'))
 
+        # A booking that has started occupies its spot now; an advance booking
+        # only holds the time window. Either way the spot must have no
+        # overlapping booking.
+        starts_now = start_time <= now
+        window_free = lambda candidate: interval_index.is_free(candidate, start_time, end_time)
+
+        # Claim the requested spot number, or auto-assign a free spot in the lot
+        if spot_number:
+            spot = ParkingSpot.query.filter_by(lot_id=lot.id, spot_number=spot_number).first()
+            if not spot or not window_free(spot.id) or not (
+                allocator.reserve(lot.id, spot.id) is not None if starts_now else lock_spot(spot.id)
+            ):
+                flash(f"Spot {spot_number} is not available for that time. Leave the spot number empty to auto-assign one.", "danger")
+                return redirect(url_for('book_slot'))
+        else:
+            if starts_now:
+                spot_id = allocator.reserve(lot.id, accept=window_free)
+            else:
+                candidates = interval_index.free_spots(bookable_spot_ids(lot.id), start_time, end_time)
+                spot_id = next((candidate for candidate in candidates if lock_spot(candidate)), None)
+            if spot_id is None:
+                flash("No free spots left in this lot for that time. Please select another lot or time.", "warning")
+                return redirect(url_for('book_slot'))
+            spot = db.session.get(ParkingSpot, spot_id)
+
+        # The index can lag bookings made by other processes; the table has the final say
+        if has_overlap(spot.id, start_time, end_time):
+            db.session.rollback()
+            if starts_now:
+                allocator.release(lot.id, spot.id)
+            interval_index.invalidate()
+            flash("That spot was just booked for an overlapping time. Please try again.", "warning")
+            return redirect(url_for('book_slot'))
 
         duration_hours = (end_time - start_time).total_seconds() / 3600
         cost = round(duration_hours * lot.price_per_hour, 2) or 0.0
         
         reservation = Reservation(
             user_id=current_user.id,
-            spot_id=spot_id,
+            spot_id=spot.id,
             vehicle_number=vehicle_number,
             parking_time=start_time,
             leaving_time=end_time,
@@ -601,20 +715,37 @@ def book_slot():
         )
 
         db.session.add(reservation)
+        rollups.record_booking(reservation, lot.id)
+        db.session.flush()
+        events.record(events.booking_created(reservation.id, spot.id, lot.id, current_user.id, vehicle_number,
+                                             start_time, end_time, cost, occupied=starts_now))
 
-        # Mark spot unavailable
-        spot = db.session.get(ParkingSpot, spot_id)
-        spot.is_available = False
-        spot.status = 'O'  # or 'B' for Booked
-
-        db.session.commit()
-        if not spot:
-            flash("Invalid spot selected.", "danger")
+        # The spot was already marked Occupied by the conditional claim above
+        try:
+            db.session.commit()
+        except OperationalError:
+            # SQLite lock contention: give the spot back and let the user retry
+            db.session.rollback()
+            if starts_now:
+                allocator.release(lot.id, spot.id)
+            flash("The booking system is busy. Please try again.", "warning")
             return redirect(url_for('book_slot'))
-        flash("Booking successful!", "success")
+        except Exception:
+            db.session.rollback()
+            if starts_now:
+                allocator.release(lot.id, spot.id)
+            raise
+        interval_index.add(reservation.id, spot.id, start_time, end_time)
+        expiry_scheduler.schedule(reservation.id, reservation.leaving_time, reservation.parking_time)
+        chart_cache.invalidate(user_scope(current_user.id), GLOBAL)
+        if starts_now:
+            availability_feed.publish([(lot.id, spot.id, 'A', 'O')])
+            flash(f"Booking successful! Your spot is {spot.spot_number}.", "success")
+        else:
+            flash(f"Advance booking confirmed for {start_time:%d %b %Y, %I:%M %p}. Your spot is {spot.spot_number}.", "success")
         return redirect(url_for('user_dashboard'))
 
-    return render_template('book_slot.html', lots=lots, spots=available_spots)
+    return render_template('book_slot.html', lots=lots, today=now_local().date())
 
 @app.route('/release/<int:reservation_id>', methods=['POST'])
 @login_required
@@ -630,19 +761,48 @@ def release_slot(reservation_id):
         flash("Already released", "warning")
         return redirect(url_for('user_dashboard'))
 
-    reservation.leaving_time = datetime.now()
+    owner_scope = user_scope(reservation.user_id)
+    if reservation.parking_time and reservation.parking_time > now_local():
+        # Cancelling an advance booking: the spot was never occupied and nothing is owed
+        reservation.status = 'Completed'
+        refund = -(reservation.cost or 0.0)
+        rollups.record_cost_change(reservation, reservation.spot.lot_id, refund)
+        reservation.cost = 0.0
+        events.record(events.spot_released(reservation.id, reservation.spot_id, reservation.spot.lot_id, reservation.user_id,
+                                           reservation.parking_time, 0.0, refund, freed=False, cancelled=True))
+        db.session.commit()
+        interval_index.remove(reservation_id)
+        chart_cache.invalidate(owner_scope, GLOBAL)
+        flash("Advance booking cancelled.", "info")
+        return redirect(url_for('user_dashboard'))
+
+    reservation.leaving_time = now_local()
     reservation.status = 'Completed'
 
     # Cost Calculation (in hours)
     duration = (reservation.leaving_time - reservation.parking_time).total_seconds() / 3600
     lot_price = reservation.spot.lot.price_per_hour
+    old_cost = reservation.cost or 0.0
     reservation.cost = round(duration * lot_price, 2)
-
-    # Update spot availability
-    reservation.spot.is_available = True
-    reservation.spot.status = 'A'
+    rollups.record_cost_change(reservation, reservation.spot.lot_id, reservation.cost - old_cost)
+
+    # Update spot availability (an advance booking whose start the expiry worker has not processed yet never occupied it)
+    spot = reservation.spot
+    lot_id, spot_id = spot.lot_id, spot.id
+    occupied = spot.status == 'O'
+    if occupied:
+        occupancy.move(lot_id, 'O', 'A')
+        spot.is_available = True
+        spot.status = 'A'
+    events.record(events.spot_released(reservation.id, spot_id, lot_id, reservation.user_id, reservation.parking_time,
+                                       reservation.cost, reservation.cost - old_cost, freed=occupied))
 
     db.session.commit()
+    interval_index.remove(reservation_id)
+    chart_cache.invalidate(owner_scope, GLOBAL)
+    if occupied:
+        allocator.release(lot_id, spot_id)
+        availability_feed.publish([(lot_id, spot_id, 'O', 'A')])
     flash(f"Slot released. Total cost: ₹{reservation.cost}", "success")
     return redirect(url_for('user_dashboard'))
 
@@ -656,75 +816,317 @@ def logout():
     return redirect(url_for('login'))
 
 
-@app.route('/api/lots')
-@login_required
-def api_lots():
-    if current_user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
+def api_listing(key, stmt, id_column, serialize):
+    """Keyset-paginated JSON (?after_id=&limit=) or a streamed NDJSON dump (?format=ndjson)."""
+    after_id, limit, ndjson = page_args(request.args)
+    stmt = paged(stmt, id_column, after_id)
 
-    lots = ParkingLot.query.all()
-    data = [{
-        'id': lot.id,
-        'location_name': lot.location_name,
-        'address': lot.address,
-        'pin_code': lot.pin_code,
-        'price': lot.price_per_hour
-    } for lot in lots]
+    if ndjson:
+        def generate():
+            rows = db.session.execute(stmt.execution_options(yield_per=API_STREAM_CHUNK))
+            for row in rows:
+                yield json.dumps(serialize(row)) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    rows = db.session.execute(stmt.limit(limit)).all()
+    data = [serialize(row) for row in rows]
+    next_after_id = data[-1]['id'] if len(data) == limit else None
 
-    return jsonify({'lots': data})
+    return jsonify({key: data, 'next_after_id': next_after_id})
+
+
+@app.route('/api/lots')
+@role_required('admin', json=True)
+@replica_reads
+def api_lots():
+    return api_listing(*lots_listing(request.args))
 
 @app.route('/api/spots')
-@login_required
+@role_required('admin', json=True)
+@replica_reads
 def api_spots():
-    if current_user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
+    return api_listing(*spots_listing(request.args))
 
-    lot_id = request.args.get('lot_id')
-    status = request.args.get('status')
+@app.route('/api/reservations')
+@role_required('admin', json=True)
+@replica_reads
+def api_reservations():
+    return api_listing(*reservations_listing(request.args))
 
-    query = ParkingSpot.query
-    if lot_id:
-        query = query.filter_by(lot_id=lot_id)
-    if status:
-        query = query.filter_by(status=status)
 
-    spots = query.all()
-    data = [{
-        'id': spot.id,
-        'spot_number': spot.spot_number,
-        'status': spot.status,
-        'lot_id': spot.lot_id
-    } for spot in spots]
+@app.route('/api/events')
+@role_required('admin', json=True)
+@replica_reads
+def api_events():
+    return api_listing(*events_listing(request.args))
 
-    return jsonify({'spots': data})
 
-@app.route('/api/reservations')
+@app.route('/api/bookings/bulk', methods=['POST'])
+@role_required('user', json=True)
+def bulk_book():
+    started = time.perf_counter()
+    try:
+        lot_id, vehicles, windows = parse_bulk_request(request.get_json(silent=True) or {}, now_local())
+        lot = db.session.get(ParkingLot, lot_id)
+        if not lot or lot.status != 'Active':
+            raise BulkBookingError("Parking lot not found or inactive.", 404)
+        booked, claimed = book_many(current_user.id, lot, vehicles, windows, now_local())
+        db.session.commit()
+    except BulkBookingError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
+    except OperationalError:
+        db.session.rollback()
+        return jsonify({'error': 'The booking system is busy. Please try again.'}), 503
+
+    allocator.discard_many(lot_id, claimed)
+    for res in booked:
+        interval_index.add(res['id'], res['spot_id'], res['parking_time'], res['leaving_time'])
+        expiry_scheduler.schedule(res['id'], res['leaving_time'], res['parking_time'])
+    availability_feed.publish((lot_id, spot_id, 'A', 'O') for spot_id in claimed)
+    chart_cache.invalidate(user_scope(current_user.id), GLOBAL)
+
+    elapsed = time.perf_counter() - started
+    return jsonify({
+        'reservations': [{
+            'id': res['id'],
+            'spot_id': res['spot_id'],
+            'spot_number': res['spot_number'],
+            'vehicle_number': res['vehicle_number'],
+            'parking_time': res['parking_time'].isoformat(),
+            'leaving_time': res['leaving_time'].isoformat(),
+            'cost': res['cost'],
+        } for res in booked],
+        'count': len(booked),
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'reservations_per_second': round(len(booked) / elapsed, 1) if elapsed else None,
+    }), 201
+
+
+@app.route('/api/stream/availability')
 @login_required
-def api_reservations():
-    if current_user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
+def availability_stream():
+    def resync():
+        with app.app_context():
+            return availability_snapshot()
+
+    # Subscribe before taking the snapshot so no change falls between the two
+    q = availability_feed.subscribe()
+    initial = availability_snapshot()
+    db.session.remove()  # the stream can stay open for hours; do not pin a connection
+    return Response(availability_feed.stream(q, initial, resync), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 
-    user_id = request.args.get('user_id')
-    query = Reservation.query
-    if user_id:
-        query = query.filter_by(user_id=user_id)
+@app.route('/admin/expiry/metrics')
+@role_required('admin', json=True)
+def expiry_metrics():
+    return jsonify(expiry_scheduler.metrics())
 
-    reservations = query.all()
-    data = [{
-        'id': res.id,
-        'user_id': res.user_id,
-        'spot_id': res.spot_id,
-        'parking_time': res.parking_time.isoformat(),
-        'leaving_time': res.leaving_time.isoformat(),
-        'status': res.status
-    } for res in reservations]
 
-    return jsonify({'reservations': data})
+# --- Analytics ---
+
+def analytics_report(args):
+    start, end, lot_id = analytics.parse_window(args)
+    name = f"analytics_{start:%Y%m%d%H}_{end:%Y%m%d%H}_{lot_id or 'all'}"
+    return chart_cache.get_or_compute(GLOBAL, name, lambda: analytics.report(start, end, lot_id))
+
+
+@app.route('/admin/analytics')
+@role_required('admin')
+def analytics_dashboard():
+    lots = ParkingLot.query.order_by(ParkingLot.location_name).all()
+    try:
+        report = analytics_report(request.args)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('analytics_dashboard'))
+    return render_template('admin_analytics.html', report=report, lots=lots,
+                           selected_lot_id=request.args.get('lot_id', ''))
+
+
+@app.route('/admin/analytics.json')
+@role_required('admin', json=True)
+def analytics_json():
+    try:
+        return jsonify(analytics_report(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/admin/perf', methods=['GET', 'POST'])
+@role_required('admin')
+def perf_dashboard():
+    if request.method == 'POST':
+        sql_profiler.reset()
+        flash("Profiler statistics cleared.", "info")
+        return redirect(url_for('perf_dashboard'))
+
+    return render_template('admin_perf.html', report=perf_snapshot())
+
+
+@app.route('/admin/perf.json')
+@role_required('admin', json=True)
+def perf_report():
+    return jsonify(perf_snapshot())
+
+
+def perf_snapshot():
+    report = sql_profiler.report()
+    report['identity_cache'] = identity_cache.stats()
+    report['availability_feed'] = availability_feed.stats()
+    report['chart_cache'] = chart_cache.stats()
+    report['replica'] = replica_sync.status() if replica_sync else None
+    return report
+
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Rebuild the daily booking/revenue rollup tables from reservation history."""
+    lot_rows, user_rows = rollups.rebuild()
+    # Replay would otherwise rebuild the old totals; start it from the rebuilt ones
+    events.take_snapshot()
+    chart_cache.clear()
+    print(f"Rebuilt {lot_rows} lot rollup row(s) and {user_rows} user rollup row(s).")
+
+
+@app.cli.command('export-reservations')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), help='Defaults to the file extension.')
+@click.option('--from', 'start', help='First parking day to include (YYYY-MM-DD).')
+@click.option('--to', 'end', help='Last parking day to include (YYYY-MM-DD).')
+@click.option('--lot', 'lot_id', type=int, help='Only reservations in this lot.')
+@click.option('--chunk', default=5000, show_default=True, help='Rows fetched per round trip.')
+def export_reservations_command(path, fmt, start, end, lot_id, chunk):
+    """Export reservation history to CSV, Parquet or Arrow and report rows/sec."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise click.UsageError(f"Cannot tell the format from {path!r}; pass --format.")
+    try:
+        start, end, lot_id = parse_export_filters({'from': start, 'to': end, 'lot_id': lot_id})
+        rows, seconds = export_to_file(path, fmt, export_query(start, end, lot_id), chunk)
+    except ExportError as e:
+        raise click.ClickException(str(e))
+    rate = rows / seconds if seconds else 0
+    print(f"Exported {rows} reservation(s) to {path} in {seconds:.2f}s ({rate:,.0f} rows/sec).")
+
+
+@app.cli.command('analytics')
+@click.option('--from', 'start', help='First day (YYYY-MM-DD); defaults to 30 days ago.')
+@click.option('--to', 'end', help='Last day (YYYY-MM-DD); defaults to today.')
+@click.option('--lot', 'lot_id', type=int, help='Only this lot.')
+def analytics_command(start, end, lot_id):
+    """Print occupancy, utilization and revenue per lot, with load/compute timings."""
+    try:
+        start, end, lot_id = analytics.parse_window({'from': start, 'to': end, 'lot_id': lot_id})
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    report = analytics.report(start, end, lot_id)
+    print(f"{report['window']['from']} - {report['window']['to']}: {report['reservations']} reservation(s), "
+          f"utilization {report['utilization']:.1%}, revenue {report['revenue']:.2f}, "
+          f"avg dwell {report['avg_dwell_hours']}h, peak hours {report['peak_hours']}")
+    for lot in report['lots']:
+        print(f"  {lot['location']}: {lot['reservations']} reservation(s), utilization {lot['utilization']:.1%}, "
+              f"revenue {lot['revenue']:.2f} ({lot['revenue_per_spot_hour']:.2f}/spot-hour)")
+    print(f"Loaded in {report['elapsed_ms']['load']} ms, computed in {report['elapsed_ms']['compute']} ms.")
+
+
+@app.cli.command('snapshot-events')
+def snapshot_events_command():
+    """Snapshot spot statuses and rollups so replay starts from the latest event."""
+    snapshot = events.take_snapshot()
+    print(f"Snapshot {snapshot.id} taken at event {snapshot.last_event_id}.")
+
+
+@app.cli.command('replay-events')
+@click.option('--check', is_flag=True, help='Only report differences from the tables.')
+def replay_events_command(check):
+    """Rebuild spot statuses, lot counters and rollups from the latest snapshot and the event log."""
+    started = time.perf_counter()
+    state = events.replay()
+    elapsed = time.perf_counter() - started
+    rate = state.events / elapsed if elapsed else 0
+    print(f"Replayed {state.events} event(s) after snapshot {state.snapshot_id or '-'} "
+          f"in {elapsed:.2f}s ({rate:,.0f} events/sec).")
+
+    spots, lot_rows, user_rows = events.compare(state)
+    print(f"Differences: {spots} spot(s), {lot_rows} lot rollup row(s), {user_rows} user rollup row(s).")
+    if check:
+        if spots or lot_rows or user_rows:
+            raise SystemExit(1)
+        return
+    if spots or lot_rows or user_rows:
+        changed, lot_rows, user_rows = events.write(state)
+        db.session.commit()
+        chart_cache.clear()
+        print(f"Rewrote {changed} spot(s), {lot_rows} lot and {user_rows} user rollup row(s).")
+
+
+@app.cli.command('check-lot-counts')
+@click.option('--repair', is_flag=True, help='Reset drifted counters from the spots table.')
+def check_lot_counts_command(repair):
+    """Compare each lot's occupancy counters with its spots (and optionally fix them)."""
+    drift = occupancy.find_drift()
+    for lot_id, stored, actual in drift:
+        print(f"lot {lot_id}: stored {stored}, actual {actual}")
+    if not drift:
+        print("All lot counters match their spots.")
+        return
+    if repair:
+        occupancy.recount([lot_id for lot_id, _, _ in drift])
+        db.session.commit()
+        chart_cache.invalidate(GLOBAL)
+        print(f"Repaired {len(drift)} lot(s).")
+    else:
+        raise SystemExit(1)
+
+
+@app.cli.command('expire-bookings')
+@click.option('--once', is_flag=True, help='Run a single expiry pass and exit.')
+@click.option('--interval', default=60, show_default=True, help='Seconds between database refreshes.')
+def expire_bookings_command(once, interval):
+    """Release bookings whose leaving time has passed (standalone expiry worker)."""
+    expiry_scheduler.refresh_interval = interval
+    if once:
+        expiry_scheduler.refresh()
+        released = expiry_scheduler.run_once()
+        print(f"Released {released} expired booking(s).")
+        return
+    try:
+        expiry_scheduler.loop()
+    except KeyboardInterrupt:
+        pass
+
+
+@app.cli.command('sync-replica')
+@click.option('--once', is_flag=True, help='Copy the primary once and exit.')
+def sync_replica_command(once):
+    """Keep the SQLite read replica (REPLICA_DATABASE_URL) in step with the primary."""
+    if replica_sync is None:
+        print("No SQLite replica configured (set REPLICA_DATABASE_URL).")
+        raise SystemExit(1)
+    if once:
+        replica_sync.sync()
+        print(f"Replica synced in {replica_sync.status()['last_duration_ms']} ms.")
+        return
+    try:
+        replica_sync.loop()
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+    # With the debug reloader, only start the worker in the serving child process
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        expiry_scheduler.start()
+        if replica_sync:
+            replica_sync.start()
+        event_snapshotter.start()
     app.run(debug=True)
 
 
@@ -0,0 +1,130 @@
+import json
+from contextlib import asynccontextmanager
+from functools import wraps
+from itsdangerous import BadSignature
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from app import app as flask_app
+from auth import IdentityCache
+from config import async_database_url, engine_options
+from models import Admin
+from api_queries import API_STREAM_CHUNK, page_args, paged, lots_listing, spots_listing, reservations_listing, events_listing
+
+# --- Async read API ---
+# Serves the /api/lots, /api/spots, /api/reservations and /api/events contracts from
+# api.yaml on an asyncio event loop, so thousands of polling clients wait on
+# the database without each holding a Flask worker thread. Queries and
+# serializers come from api_queries.py; the Flask session cookie is accepted
+# as-is, so logged-in admins can call either service.
+#
+#   uvicorn async_api:api --workers 4
+
+database_url = flask_app.config['SQLALCHEMY_DATABASE_URI']
+engine = create_async_engine(async_database_url(database_url),
+                             **engine_options(database_url, flask_app.config['DB_PROFILE']))
+
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine.sync_engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in flask_app.config['SQLITE_PRAGMAS'].items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+# --- Session auth ---
+
+session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+session_max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+identity_cache = IdentityCache()
+
+
+async def is_admin(request):
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return False
+    try:
+        session = session_serializer.loads(cookie, max_age=session_max_age)
+    except BadSignature:
+        return False
+
+    # Flask-Login stores the 'role:id' string from UnifiedUser.get_id
+    user_id = session.get('_user_id') or ''
+    role, _, admin_id = user_id.partition(':')
+    if role != 'admin' or not admin_id.isdigit():
+        return False
+    if identity_cache.get(user_id) is None:
+        async with engine.connect() as conn:
+            if await conn.scalar(select(Admin.id).where(Admin.id == int(admin_id))) is None:
+                return False
+        identity_cache.set(user_id, True)
+    return True
+
+
+def admin_only(handler):
+    @wraps(handler)
+    async def wrapped(request):
+        if not await is_admin(request):
+            return JSONResponse({'error': 'Unauthorized'}, status_code=403)
+        return await handler(request)
+    return wrapped
+
+
+# --- Endpoints ---
+
+async def api_listing(request, key, stmt, id_column, serialize):
+    after_id, limit, ndjson = page_args(request.query_params)
+    stmt = paged(stmt, id_column, after_id)
+
+    if ndjson:
+        async def generate():
+            async with engine.connect() as conn:
+                rows = await conn.stream(stmt.execution_options(yield_per=API_STREAM_CHUNK))
+                async for row in rows:
+                    yield json.dumps(serialize(row)) + '\n'
+
+        return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+    async with engine.connect() as conn:
+        rows = (await conn.execute(stmt.limit(limit))).all()
+    data = [serialize(row) for row in rows]
+    next_after_id = data[-1]['id'] if len(data) == limit else None
+
+    return JSONResponse({key: data, 'next_after_id': next_after_id})
+
+
+@admin_only
+async def api_lots(request):
+    return await api_listing(request, *lots_listing(request.query_params))
+
+
+@admin_only
+async def api_spots(request):
+    return await api_listing(request, *spots_listing(request.query_params))
+
+
+@admin_only
+async def api_reservations(request):
+    return await api_listing(request, *reservations_listing(request.query_params))
+
+
+@admin_only
+async def api_events(request):
+    return await api_listing(request, *events_listing(request.query_params))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+api = Starlette(routes=[
+    Route('/api/lots', api_lots),
+    Route('/api/spots', api_spots),
+    Route('/api/reservations', api_reservations),
+    Route('/api/events', api_events),
+], lifespan=lifespan)
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import flash, jsonify, redirect, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import and_, func, select
+from models import db, Admin, User, LoginIdentifier
+
+# --- Identity cache and role guard ---
+# Flask-Login reloads the principal on every request. The cache keeps the
+# resolved identity per 'role:id' session key for a short TTL so authenticated
+# requests usually need no database round-trip.
+
+
+class IdentityCache:
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, identity)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, identity):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            'size': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def role_required(role, json=False, redirect_to=None):
+    """login_required plus a role check on the cached identity (no database access).
+
+    Failures return a JSON 403 when ``json`` is set, flash and redirect when
+    ``redirect_to`` names an endpoint, and a plain 403 otherwise.
+    """
+    def decorator(view):
+        @wraps(view)
+        @login_required
+        def wrapped(*args, **kwargs):
+            if current_user.role != role:
+                if json:
+                    return jsonify({'error': 'Unauthorized'}), 403
+                if redirect_to:
+                    flash("Unauthorized access", "danger")
+                    return redirect(url_for(redirect_to))
+                return "Unauthorized", 403
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+# --- Login identifiers ---
+# Every name a principal can log in with is stored normalized in
+# login_identifiers, so login is a single primary-key lookup.
+
+
+def normalize_identifier(value):
+    return (value or '').strip().lower()
+
+
+def add_identifiers(role, principal_id, *identifiers):
+    for identifier in {normalize_identifier(i) for i in identifiers if i}:
+        db.session.add(LoginIdentifier(identifier=identifier, role=role, principal_id=principal_id))
+
+
+def remove_identifiers(role, principal_id):
+    LoginIdentifier.query.filter_by(role=role, principal_id=principal_id).delete()
+
+
+def identifiers_taken(*identifiers):
+    wanted = {normalize_identifier(i) for i in identifiers if i}
+    return set(db.session.scalars(
+        select(LoginIdentifier.identifier).where(LoginIdentifier.identifier.in_(wanted))
+    ))
+
+
+def find_principal(login_input):
+    """Resolve a login name to (role, principal_id, password_hash), or None."""
+    row = db.session.execute(
+        select(LoginIdentifier.role, LoginIdentifier.principal_id, func.coalesce(User.password, Admin.password))
+        .outerjoin(User, and_(LoginIdentifier.role == 'user', User.id == LoginIdentifier.principal_id))
+        .outerjoin(Admin, and_(LoginIdentifier.role == 'admin', Admin.id == LoginIdentifier.principal_id))
+        .where(LoginIdentifier.identifier == normalize_identifier(login_input))
+    ).first()
+    return tuple(row) if row else None
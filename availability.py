@@ -0,0 +1,102 @@
+import json
+import queue
+import threading
+from models import db, ParkingLot
+from allocator import allocator
+
+# --- Live availability feed ---
+# Routes that change a spot publish the change here after they commit, and
+# every open /api/stream/availability connection gets it as a Server-Sent
+# Event. Each event is serialized once and handed to the subscribers' queues,
+# so fanning out to hundreds of clients is a few hundred queue puts. A client
+# that falls too far behind has its backlog dropped and is sent a fresh
+# snapshot instead.
+
+RESYNC = object()
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def snapshot():
+    """Per-lot spot counts by status, as sent when a client connects."""
+    rows = db.session.query(
+        ParkingLot.id, ParkingLot.available_count, ParkingLot.occupied_count, ParkingLot.unavailable_count
+    ).all()
+    return {'lots': [{'lot_id': lot_id, 'A': free, 'O': occupied, 'U': unavailable}
+                     for lot_id, free, occupied, unavailable in rows]}
+
+
+class AvailabilityFeed:
+    def __init__(self, queue_size=256, keepalive=15):
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.resyncs = 0
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, changes):
+        """Send spot transitions to every subscriber.
+
+        changes: iterable of (lot_id, spot_id, old_status, new_status).
+        """
+        spots = [
+            {'lot_id': lot_id, 'spot_id': spot_id, 'from': old, 'to': new}
+            for lot_id, spot_id, old, new in changes
+        ]
+        if not spots:
+            return
+        free = {lot_id: allocator.free_count(lot_id) for lot_id in {s['lot_id'] for s in spots}}
+        message = sse('delta', {'spots': spots, 'free': free})
+
+        with self._lock:
+            self.published += 1
+            for q in self._subscribers:
+                try:
+                    q.put_nowait(message)
+                except queue.Full:
+                    with q.mutex:
+                        q.queue.clear()
+                    q.put_nowait(RESYNC)
+                    self.resyncs += 1
+
+    def resync_all(self):
+        """Ask every client to reload its snapshot (after lots are added, resized or removed)."""
+        with self._lock:
+            for q in self._subscribers:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(RESYNC)
+
+    def stream(self, q, initial, resync):
+        """Generator for one client: the initial snapshot, then deltas until it disconnects."""
+        try:
+            yield sse('snapshot', initial)
+            while True:
+                try:
+                    message = q.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield sse('snapshot', resync()) if message is RESYNC else message
+        finally:
+            self.unsubscribe(q)
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'published': self.published, 'resyncs': self.resyncs}
+
+
+availability_feed = AvailabilityFeed()
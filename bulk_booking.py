@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+from pytz import timezone
+from sqlalchemy import insert, select, update
+from models import db, ParkingSpot, Reservation
+from intervals import interval_index
+from expiry import OPEN_STATUSES
+import events
+import occupancy
+import rollups
+
+# --- Bulk and recurring bookings ---
+# A fleet booking reserves one spot per vehicle for every occurrence of a
+# time window, in one transaction: spots are picked from the interval index,
+# claimed or locked with one UPDATE, re-checked for overlaps with one query
+# per occurrence and inserted with a single multi-row INSERT. Any conflict
+# raises BulkBookingError and the caller rolls the whole request back.
+
+MAX_RESERVATIONS = 1000
+MAX_OCCURRENCES = 366
+REPEAT_PERIODS = {'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+
+
+class BulkBookingError(Exception):
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_time(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise BulkBookingError(f"Invalid time {value!r}; use ISO format like 2026-10-20T09:00.", 400)
+    if parsed.tzinfo is not None:
+        # Stored times are naive IST, like everywhere else in the app
+        parsed = parsed.astimezone(timezone('Asia/Kolkata')).replace(tzinfo=None)
+    return parsed
+
+
+def parse_request(payload, now):
+    """Validate a bulk booking body. Returns (lot_id, vehicles, windows)."""
+    if not isinstance(payload, dict):
+        raise BulkBookingError("The request body must be a JSON object.", 400)
+    try:
+        lot_id = int(payload.get('lot_id'))
+    except (TypeError, ValueError):
+        raise BulkBookingError("lot_id is required.", 400)
+
+    vehicles = payload.get('vehicles')
+    if not isinstance(vehicles, list) or not vehicles:
+        raise BulkBookingError("vehicles must be a non-empty list of vehicle numbers.", 400)
+    vehicles = [str(v).strip().upper() for v in vehicles]
+    if not all(vehicles) or len(set(vehicles)) != len(vehicles):
+        raise BulkBookingError("Vehicle numbers must be non-empty and unique.", 400)
+
+    start, end = _parse_time(payload.get('start')), _parse_time(payload.get('end'))
+    if end <= start:
+        raise BulkBookingError("end must be after start.", 400)
+    if end <= now:
+        raise BulkBookingError("That time window has already passed.", 400)
+
+    repeat = payload.get('repeat') or {'every': 'day', 'count': 1}
+    if not isinstance(repeat, dict):
+        raise BulkBookingError("repeat must be an object with every ('day' or 'week') and count.", 400)
+    period = REPEAT_PERIODS.get(repeat.get('every'))
+    try:
+        count = int(repeat.get('count', 1))
+    except (TypeError, ValueError):
+        count = 0
+    if period is None or not 1 <= count <= MAX_OCCURRENCES:
+        raise BulkBookingError(f"repeat needs every ('day' or 'week') and a count between 1 and {MAX_OCCURRENCES}.", 400)
+    if count > 1 and end - start > period:
+        raise BulkBookingError("A repeating window cannot be longer than its repeat period.", 400)
+    if len(vehicles) * count > MAX_RESERVATIONS:
+        raise BulkBookingError(f"At most {MAX_RESERVATIONS} reservations per request.", 400)
+
+    windows = [(start + period * i, end + period * i) for i in range(count)]
+    return lot_id, vehicles, windows
+
+
+def book_many(user_id, lot, vehicles, windows, now):
+    """Reserve a spot for every vehicle in every window, all or nothing.
+
+    Returns (reservations, claimed): the inserted rows as dicts, and the spot
+    ids occupied right away because their window has already started. The
+    caller commits, or rolls back on BulkBookingError.
+    """
+    spots = db.session.execute(
+        select(ParkingSpot.id, ParkingSpot.spot_number, ParkingSpot.status)
+        .where(ParkingSpot.lot_id == lot.id, ParkingSpot.status != 'U').order_by(ParkingSpot.id)
+    ).all()
+    spot_numbers = {spot.id: spot.spot_number for spot in spots}
+    bookable = [spot.id for spot in spots]
+    free_now = [spot.id for spot in spots if spot.status == 'A']
+
+    # Occurrences never overlap each other, so each one is assigned on its own
+    assignments = []  # (vehicle, spot_id, start, end)
+    claimed = []
+    for start, end in windows:
+        starts_now = start <= now
+        candidates = interval_index.free_spots(free_now if starts_now else bookable, start, end)
+        if len(candidates) < len(vehicles):
+            raise BulkBookingError(
+                f"Only {len(candidates)} spot(s) free for {start:%d %b %Y %I:%M %p} - {end:%I:%M %p}; "
+                f"{len(vehicles)} needed."
+            )
+        chosen = candidates[:len(vehicles)]
+        if starts_now:
+            claimed.extend(chosen)
+        assignments.extend((vehicle, spot_id, start, end) for vehicle, spot_id in zip(vehicles, chosen))
+
+    # Occupy the spots whose booking has started; row-lock the rest
+    if claimed:
+        result = db.session.execute(
+            update(ParkingSpot)
+            .where(ParkingSpot.id.in_(claimed), ParkingSpot.is_available == True, ParkingSpot.status == 'A')
+            .values(is_available=False, status='O')
+        )
+        if result.rowcount != len(claimed):
+            raise BulkBookingError("Some spots were just taken. Please try again.")
+        occupancy.adjust(lot.id, {'A': -len(claimed), 'O': len(claimed)})
+    held = sorted({spot_id for _, spot_id, _, _ in assignments} - set(claimed))
+    if held:
+        result = db.session.execute(
+            update(ParkingSpot).where(ParkingSpot.id.in_(held), ParkingSpot.status != 'U')
+            .values(status=ParkingSpot.status)
+        )
+        if result.rowcount != len(held):
+            raise BulkBookingError("Some spots were just taken out of service. Please try again.")
+
+    # The index can lag bookings made by other processes; the table has the final say
+    for start, end in windows:
+        window_spots = [spot_id for _, spot_id, s, _ in assignments if s == start]
+        clash = db.session.scalar(select(Reservation.spot_id).where(
+            Reservation.spot_id.in_(window_spots),
+            Reservation.status.in_(OPEN_STATUSES),
+            Reservation.parking_time < end,
+            Reservation.leaving_time > max(start, now),
+        ).limit(1))
+        if clash is not None:
+            raise BulkBookingError(f"Spot {spot_numbers[clash]} was just booked for an overlapping time. Please try again.")
+
+    rows = [{
+        'user_id': int(user_id),
+        'spot_id': spot_id,
+        'vehicle_number': vehicle,
+        'parking_time': start,
+        'leaving_time': end,
+        'cost': round((end - start).total_seconds() / 3600 * lot.price_per_hour, 2),
+        'status': 'Booked',
+    } for vehicle, spot_id, start, end in assignments]
+    ids = db.session.scalars(insert(Reservation).returning(Reservation.id, sort_by_parameter_order=True), rows).all()
+    rollups.record_bookings(user_id, lot.id, ((row['parking_time'], row['cost']) for row in rows))
+
+    for row, res_id in zip(rows, ids):
+        row['id'] = res_id
+        row['spot_number'] = spot_numbers[row['spot_id']]
+    events.record(*(events.booking_created(
+        row['id'], row['spot_id'], lot.id, user_id, row['vehicle_number'], row['parking_time'], row['leaving_time'],
+        row['cost'], occupied=row['parking_time'] <= now) for row in rows))
+    return rows, claimed
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+# --- Dashboard data cache ---
+# Caches the computed dashboard data per scope ('global' for the admin
+# dashboard, 'user:<id>' for each user) in an in-process LRU, optionally
+# backed by JSON files in CHART_CACHE_DIR so the cache survives restarts and
+# is shared between worker processes. Routes that change bookings, users or
+# lots drop exactly the scopes they affect, so a hit runs no SQL until a write
+# invalidates it. With a file store, a memory hit also checks (one stat) that
+# its file has not been removed or rewritten, which is how invalidations made
+# by another process (the expiry worker, another app worker) reach this one.
+# Without a file store they cannot; CHART_CACHE_TTL (off by default) bounds
+# how long such a process trusts its memory.
+
+GLOBAL = 'global'
+
+
+def user_scope(user_id):
+    return f"user:{int(user_id)}"
+
+
+class ChartCache:
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.directory = None
+        self.memory_ttl = None
+        self._entries = OrderedDict()  # (scope, name) -> (stored_at, file signature, value)
+        self._generations = {}  # scope -> invalidation count, so a compute racing an invalidation is not stored
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.file_hits = 0
+
+    def init_app(self, app):
+        self.directory = app.config.setdefault('CHART_CACHE_DIR', os.environ.get('CHART_CACHE_DIR'))
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        ttl = app.config.setdefault('CHART_CACHE_TTL', os.environ.get('CHART_CACHE_TTL'))
+        self.memory_ttl = float(ttl) if ttl else None
+
+    def _scope_dir(self, scope):
+        # One directory per scope, so invalidating a scope is a single rmtree
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_]', '-', scope))
+
+    def _path(self, scope, name):
+        return os.path.join(self._scope_dir(scope), name + '.json')
+
+    def _signature(self, scope, name):
+        # Every write is an os.replace, so a new file means a new inode
+        try:
+            stat = os.stat(self._path(scope, name))
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _read_file(self, scope, name):
+        signature = self._signature(scope, name)
+        try:
+            with open(self._path(scope, name)) as f:
+                return json.load(f), signature
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_file(self, scope, name, value):
+        directory = self._scope_dir(scope)
+        os.makedirs(directory, exist_ok=True)
+        path = self._path(scope, name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+        return self._signature(scope, name)
+
+    def get_or_compute(self, scope, name, compute):
+        """Return the cached value for (scope, name), computing and storing it on a miss."""
+        key = (scope, name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generations.get(scope, 0)
+        if entry is not None and (self.memory_ttl is None or now - entry[0] < self.memory_ttl) \
+                and (not self.directory or self._signature(scope, name) == entry[1]):
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return entry[2]
+
+        value, signature = self._read_file(scope, name) if self.directory else (None, None)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+                self.file_hits += 1
+        else:
+            value = compute()
+            with self._lock:
+                self.misses += 1
+                stale = self._generations.get(scope, 0) != generation
+            if stale:
+                return value
+            if self.directory:
+                signature = self._write_file(scope, name, value)
+
+        with self._lock:
+            if self._generations.get(scope, 0) != generation:
+                return value
+            self._entries[key] = (now, signature, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *scopes):
+        scopes = set(scopes)
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+            for key in [key for key in self._entries if key[0] in scopes]:
+                del self._entries[key]
+        if self.directory:
+            for scope in scopes:
+                shutil.rmtree(self._scope_dir(scope), ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            for scope, _ in self._entries:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+            self._entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            'size': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'file_hits': self.file_hits,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'file_store': self.directory,
+        }
+
+
+chart_cache = ChartCache()
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import time
+from datetime import date, timedelta
+from sqlalchemy import func
+from models import db, DailyLotStats, DailyUserStats, ParkingLot, User
+
+# --- Dashboard chart series ---
+# Each chart is read from the daily rollup tables for an optional date range
+# and folded into day/week/month buckets. The dashboards fetch these as JSON
+# after the page has rendered; app.py caches them per scope and answers
+# unchanged data with 304 Not Modified.
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def parse_range(args):
+    """Read ?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|week|month. Raises ValueError."""
+    start = date.fromisoformat(args['from']) if args.get('from') else None
+    end = date.fromisoformat(args['to']) if args.get('to') else None
+    granularity = args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if start and end and end < start:
+        raise ValueError("'to' must not be before 'from'")
+    return start, end, granularity
+
+
+def cache_name(chart, start=None, end=None, granularity=None):
+    parts = [chart, granularity, str(start or 'all'), str(end or 'all')]
+    return '_'.join(p for p in parts if p)
+
+
+def cache_entry(data):
+    """Wrap chart data with the validators used for conditional responses."""
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return {'data': data, 'etag': hashlib.sha1(body.encode()).hexdigest()[:20], 'generated_at': time.time()}
+
+
+def _bucket(day, granularity):
+    if granularity == 'week':
+        return str(day - timedelta(days=day.weekday()))  # Monday of the ISO week
+    if granularity == 'month':
+        return day.strftime('%Y-%m')
+    return str(day)
+
+
+def _fold(rows, granularity):
+    # rows: (day, value) ordered by day
+    buckets = {}
+    for day, value in rows:
+        label = _bucket(day, granularity)
+        buckets[label] = buckets.get(label, 0) + (value or 0)
+    return list(buckets), list(buckets.values())
+
+
+def _in_range(query, day_column, start, end):
+    if start:
+        query = query.filter(day_column >= start)
+    if end:
+        query = query.filter(day_column <= end)
+    return query
+
+
+def bookings_over_time(start, end, granularity):
+    rows = _in_range(db.session.query(DailyLotStats.day, func.sum(DailyLotStats.bookings)),
+                     DailyLotStats.day, start, end).group_by(DailyLotStats.day).order_by(DailyLotStats.day).all()
+    labels, counts = _fold(rows, granularity)
+    return {'labels': labels, 'counts': counts}
+
+
+def bookings_per_lot(start, end):
+    rows = _in_range(db.session.query(ParkingLot.location_name, func.sum(DailyLotStats.bookings))
+                     .join(ParkingLot, ParkingLot.id == DailyLotStats.lot_id),
+                     DailyLotStats.day, start, end).group_by(ParkingLot.id, ParkingLot.location_name).all()
+    return {'labels': [r[0] for r in rows], 'counts': [r[1] for r in rows]}
+
+
+def top_users(start, end, limit=5):
+    total_bookings = func.sum(DailyUserStats.bookings)
+    rows = _in_range(db.session.query(User.full_name, total_bookings)
+                     .join(DailyUserStats, DailyUserStats.user_id == User.id),
+                     DailyUserStats.day, start, end).group_by(User.id, User.full_name) \
+        .order_by(total_bookings.desc()).limit(limit).all()
+    return {'labels': [r[0] for r in rows], 'counts': [r[1] for r in rows]}
+
+
+def spot_status():
+    # Current state, from the per-lot counters; the date range does not apply
+    available, occupied, unavailable = db.session.query(
+        func.coalesce(func.sum(ParkingLot.available_count), 0),
+        func.coalesce(func.sum(ParkingLot.occupied_count), 0),
+        func.coalesce(func.sum(ParkingLot.unavailable_count), 0),
+    ).one()
+    return {'labels': ['Available', 'Occupied', 'Unavailable'], 'counts': [available, occupied, unavailable]}
+
+
+def _user_series(column, user_id, start, end, granularity):
+    rows = _in_range(db.session.query(DailyUserStats.day, column).filter(DailyUserStats.user_id == user_id),
+                     DailyUserStats.day, start, end).order_by(DailyUserStats.day).all()
+    return _fold(rows, granularity)
+
+
+def user_bookings(user_id, start, end, granularity):
+    labels, counts = _user_series(DailyUserStats.bookings, user_id, start, end, granularity)
+    return {'labels': labels, 'counts': counts}
+
+
+def user_costs(user_id, start, end, granularity):
+    labels, costs = _user_series(DailyUserStats.revenue, user_id, start, end, granularity)
+    return {'labels': labels, 'costs': [round(float(c), 2) for c in costs]}
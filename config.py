@@ -0,0 +1,68 @@
+import os
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# --- Database configuration ---
+# DATABASE_URL selects the engine (SQLite file by default, or e.g.
+# postgresql://...). DB_PROFILE picks the tuning:
+#   wal     - SQLite in WAL mode with synchronous=NORMAL, a busy timeout and
+#             memory-mapped reads, so readers no longer block the booking writes (default)
+#   default - stock driver settings
+# Server databases always get a pre-pinged, recycled connection pool.
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(basedir, 'instance', 'parking.db')
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def engine_options(url, profile):
+    if url.startswith('sqlite'):
+        if profile == 'default':
+            return {}
+        return {
+            'pool_pre_ping': True,
+            'connect_args': {'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000},
+        }
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+    }
+
+
+def configure_database(app):
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    profile = os.environ.get('DB_PROFILE', 'wal')
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url, profile)
+    app.config['DB_PROFILE'] = profile
+    app.config['SQLITE_PRAGMAS'] = {} if profile == 'default' else {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    }
+
+    @event.listens_for(Engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in app.config['SQLITE_PRAGMAS'].items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+def async_database_url(url):
+    """The same database through an asyncio driver (aiosqlite / asyncpg)."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
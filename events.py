@@ -0,0 +1,259 @@
+import json
+import os
+import threading
+from datetime import date
+from sqlalchemy import String, delete, func, insert, select, type_coerce, update
+from models import db, DailyLotStats, DailyUserStats, EventSnapshot, ParkingLot, ParkingSpot, ReservationEvent, User
+import occupancy
+
+# --- Reservation event log ---
+# Every booking, advance booking start, release, toggle and expiry appends an
+# event in the same transaction as the change itself, so the log is an audit
+# trail that never disagrees with the tables. Snapshots record spot statuses
+# and the daily rollups as of an event id; replay starts from the latest
+# snapshot and folds the events after it to rebuild that derived state.
+# Consumers that keep their own derived state can tail the log by id
+# (GET /api/events?after_id=).
+#
+# Event ids are the log order. SQLite serializes writers, so ids become
+# visible in order; with concurrent writers on other databases a tailing
+# consumer should re-read a short window behind its last id.
+
+BOOKING_CREATED = 'BookingCreated'
+BOOKING_STARTED = 'BookingStarted'
+SPOT_RELEASED = 'SpotReleased'
+SPOT_TOGGLED = 'SpotToggled'
+BOOKING_EXPIRED = 'BookingExpired'
+USER_DELETED = 'UserDeleted'
+
+REPLAY_CHUNK = 10000
+SNAPSHOT_KEEP = 3
+
+
+def _event(kind, reservation_id=None, spot_id=None, lot_id=None, user_id=None,
+           spot_status=None, day=None, amount=None, **data):
+    return {'kind': kind, 'reservation_id': reservation_id, 'spot_id': spot_id, 'lot_id': lot_id, 'user_id': user_id,
+            'spot_status': spot_status, 'day': day, 'amount': amount, 'data': data}
+
+
+def booking_created(reservation_id, spot_id, lot_id, user_id, vehicle_number, parking_time, leaving_time, cost, occupied):
+    # occupied: the booking had started, so its spot went A -> O
+    return _event(BOOKING_CREATED, reservation_id, spot_id, lot_id, int(user_id),
+                  spot_status='O' if occupied else None, day=parking_time.date(), amount=cost or 0.0,
+                  vehicle_number=vehicle_number, parking_time=parking_time.isoformat(), leaving_time=leaving_time.isoformat())
+
+
+def booking_started(reservation_id, spot_id, lot_id, user_id):
+    # An advance booking's window began and its spot went A -> O
+    return _event(BOOKING_STARTED, reservation_id, spot_id, lot_id, user_id, spot_status='O')
+
+
+def spot_released(reservation_id, spot_id, lot_id, user_id, parking_time, cost, cost_delta, freed, cancelled=False):
+    return _event(SPOT_RELEASED, reservation_id, spot_id, lot_id, user_id,
+                  spot_status='A' if freed else None, day=parking_time.date(), amount=cost_delta,
+                  cost=cost, cancelled=cancelled)
+
+
+def spot_toggled(spot_id, lot_id, old, new):
+    return _event(SPOT_TOGGLED, spot_id=spot_id, lot_id=lot_id, spot_status=new, old=old)
+
+
+def booking_expired(reservation_id, spot_id, lot_id, user_id, freed):
+    return _event(BOOKING_EXPIRED, reservation_id, spot_id, lot_id, user_id, spot_status='A' if freed else None)
+
+
+def user_deleted(user_id, lot_rows):
+    # lot_rows: (day, lot_id, bookings, revenue) taken out of the lot rollups
+    return _event(USER_DELETED, user_id=user_id, lots=[list(row) for row in lot_rows])
+
+
+def record(*entries):
+    """Append events to the log in the caller's transaction."""
+    from expiry import now_local
+
+    if entries:
+        occurred_at = now_local()
+        db.session.execute(insert(ReservationEvent), [dict(entry, occurred_at=occurred_at) for entry in entries])
+
+
+# --- Snapshots ---
+
+def current_state():
+    """Spot statuses and rollups as stored in the tables, in snapshot form."""
+    return {
+        'spots': {str(spot_id): status for spot_id, status in db.session.execute(select(ParkingSpot.id, ParkingSpot.status))},
+        'lot_stats': [[str(day), lot_id, bookings, revenue] for day, lot_id, bookings, revenue in db.session.execute(
+            select(DailyLotStats.day, DailyLotStats.lot_id, DailyLotStats.bookings, DailyLotStats.revenue))],
+        'user_stats': [[str(day), user_id, bookings, revenue] for day, user_id, bookings, revenue in db.session.execute(
+            select(DailyUserStats.day, DailyUserStats.user_id, DailyUserStats.bookings, DailyUserStats.revenue))],
+    }
+
+
+def take_snapshot():
+    """Store the current derived state with the id of the last event it includes. Returns the snapshot."""
+    from expiry import now_local
+
+    if db.engine.dialect.name != 'sqlite':
+        db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+    snapshot = EventSnapshot(last_event_id=0, created_at=now_local(), state={})
+    db.session.add(snapshot)
+    # On SQLite the INSERT takes the write lock, so no event can commit while the state is read
+    db.session.flush()
+    snapshot.last_event_id = db.session.scalar(select(func.coalesce(func.max(ReservationEvent.id), 0)))
+    snapshot.state = current_state()
+
+    keep = select(EventSnapshot.id).order_by(EventSnapshot.id.desc()).limit(SNAPSHOT_KEEP).scalar_subquery()
+    db.session.execute(delete(EventSnapshot).where(EventSnapshot.id.notin_(keep)))
+    db.session.commit()
+    return snapshot
+
+
+def events_since_snapshot():
+    last = db.session.scalar(select(func.max(EventSnapshot.last_event_id))) or 0
+    return db.session.scalar(select(func.count()).where(ReservationEvent.id > last))
+
+
+class EventSnapshotter:
+    """Takes a snapshot whenever `every` events have been logged since the last one."""
+
+    def __init__(self, app, every=None, interval=None):
+        self.app = app
+        self.every = every or int(app.config.setdefault('EVENT_SNAPSHOT_EVERY', os.environ.get('EVENT_SNAPSHOT_EVERY', 10000)))
+        self.interval = interval or float(app.config.setdefault('EVENT_SNAPSHOT_INTERVAL', os.environ.get('EVENT_SNAPSHOT_INTERVAL', 300)))
+        self._thread = None
+        self.last_snapshot = None
+
+    def run_once(self):
+        if events_since_snapshot() >= self.every:
+            snapshot = take_snapshot()
+            self.last_snapshot = {'id': snapshot.id, 'last_event_id': snapshot.last_event_id}
+            return True
+        return False
+
+    def loop(self, stop=None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            with self.app.app_context():
+                try:
+                    self.run_once()
+                except Exception:
+                    # e.g. "database is locked"; the events are still there for the next pass
+                    db.session.rollback()
+                    self.app.logger.exception("Event snapshot failed; retrying")
+            stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.loop, name='event-snapshots', daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# --- Replay ---
+
+class ReplayState:
+    def __init__(self, snapshot=None):
+        state = snapshot.state if snapshot else {}
+        self.snapshot_id = snapshot.id if snapshot else None
+        self.last_event_id = snapshot.last_event_id if snapshot else 0
+        self.events = 0
+        self.spots = {int(spot_id): status for spot_id, status in state.get('spots', {}).items()}
+        self.lot_stats = {(day, lot_id): [bookings, revenue] for day, lot_id, bookings, revenue in state.get('lot_stats', [])}
+        self.user_stats = {(day, user_id): [bookings, revenue] for day, user_id, bookings, revenue in state.get('user_stats', [])}
+
+    def _bump(self, stats, key, bookings, revenue):
+        entry = stats.get(key)
+        if entry is None:
+            stats[key] = [bookings, revenue]
+        else:
+            entry[0] += bookings
+            entry[1] += revenue
+
+    def apply(self, kind, spot_id, lot_id, user_id, spot_status, day, amount, raw_data):
+        if spot_status:
+            self.spots[spot_id] = spot_status
+        if kind == BOOKING_CREATED:
+            self._bump(self.lot_stats, (day, lot_id), 1, amount)
+            self._bump(self.user_stats, (day, user_id), 1, amount)
+        elif amount:
+            self._bump(self.lot_stats, (day, lot_id), 0, amount)
+            self._bump(self.user_stats, (day, user_id), 0, amount)
+        elif kind == USER_DELETED:
+            data = json.loads(raw_data) if isinstance(raw_data, str) else raw_data
+            for row_day, row_lot_id, bookings, revenue in data['lots']:
+                self._bump(self.lot_stats, (row_day, row_lot_id), -bookings, -revenue)
+            for key in [key for key in self.user_stats if key[1] == user_id]:
+                del self.user_stats[key]
+
+
+def replay(chunk=REPLAY_CHUNK):
+    """Fold the events after the latest snapshot into its state. Returns a ReplayState."""
+    snapshot = db.session.scalars(select(EventSnapshot).order_by(EventSnapshot.last_event_id.desc()).limit(1)).first()
+    state = ReplayState(snapshot)
+
+    # Replay reads only plain columns; `data` stays undecoded text unless an event needs it
+    stmt = select(ReservationEvent.id, ReservationEvent.kind, ReservationEvent.spot_id, ReservationEvent.lot_id,
+                  ReservationEvent.user_id, ReservationEvent.spot_status, type_coerce(ReservationEvent.day, String),
+                  ReservationEvent.amount, type_coerce(ReservationEvent.data, String)) \
+        .where(ReservationEvent.id > state.last_event_id).order_by(ReservationEvent.id)
+    result = db.session.connection().execute(stmt, execution_options={'stream_results': True, 'max_row_buffer': chunk})
+    try:
+        apply = state.apply
+        while rows := result.fetchmany(chunk):
+            for _, kind, spot_id, lot_id, user_id, spot_status, day, amount, raw_data in rows:
+                apply(kind, spot_id, lot_id, user_id, spot_status, day and str(day), amount, raw_data)
+            state.events += len(rows)
+            state.last_event_id = rows[-1][0]
+    finally:
+        result.close()
+    return state
+
+
+def _rollup_rows(stats, key_column, valid_keys):
+    # Rows for lots/users that still exist; a deleted lot's rollups went with it
+    return [{'day': date.fromisoformat(day), key_column: key, 'bookings': bookings, 'revenue': revenue}
+            for (day, key), (bookings, revenue) in stats.items()
+            if key in valid_keys and (bookings or abs(revenue) > 1e-9)]
+
+
+def compare(state):
+    """Differences between the replayed state and the tables: (spots, lot rollup rows, user rollup rows)."""
+    stored = current_state()
+    spots = sum(1 for spot_id, status in stored['spots'].items() if state.spots.get(int(spot_id), 'A') != status)
+
+    def differing(stored_rows, replayed):
+        stored_map = {(day, key): (bookings, round(revenue, 2)) for day, key, bookings, revenue in stored_rows
+                      if bookings or abs(revenue) > 1e-9}
+        replayed_map = {key: (bookings, round(revenue, 2)) for key, (bookings, revenue) in replayed.items()
+                        if key in stored_map or bookings or abs(revenue) > 1e-9}
+        return sum(1 for key in stored_map.keys() | replayed_map.keys() if stored_map.get(key) != replayed_map.get(key))
+
+    return spots, differing(stored['lot_stats'], state.lot_stats), differing(stored['user_stats'], state.user_stats)
+
+
+def write(state):
+    """Overwrite spot statuses, lot counters and rollups with the replayed state. The caller commits."""
+    current = dict(db.session.execute(select(ParkingSpot.id, ParkingSpot.status)).all())
+    # A spot created after the snapshot, and never touched since, is still Available
+    by_status = {}
+    for spot_id, status in current.items():
+        target = state.spots.get(spot_id, 'A')
+        if target != status:
+            by_status.setdefault(target, []).append(spot_id)
+    for status, spot_ids in by_status.items():
+        for i in range(0, len(spot_ids), 500):
+            db.session.execute(update(ParkingSpot).where(ParkingSpot.id.in_(spot_ids[i:i + 500]))
+                               .values(status=status, is_available=status != 'O'))
+    occupancy.recount()
+
+    lot_ids = set(db.session.scalars(select(ParkingLot.id)))
+    user_ids = set(db.session.scalars(select(User.id)))
+    lot_rows = _rollup_rows(state.lot_stats, 'lot_id', lot_ids)
+    user_rows = _rollup_rows(state.user_stats, 'user_id', user_ids)
+    db.session.execute(delete(DailyLotStats))
+    db.session.execute(delete(DailyUserStats))
+    if lot_rows:
+        db.session.execute(insert(DailyLotStats), lot_rows)
+    if user_rows:
+        db.session.execute(insert(DailyUserStats), user_rows)
+    return sum(len(spot_ids) for spot_ids in by_status.values()), len(lot_rows), len(user_rows)
@@ -0,0 +1,239 @@
+import heapq
+import threading
+import time
+from collections import deque
+from sqlalchemy import or_, select, update
+from models import db, ParkingSpot, Reservation, now_local
+from allocator import allocator
+from availability import availability_feed
+import events
+import occupancy
+from chart_cache import chart_cache, GLOBAL, user_scope
+
+# --- Background expiry of finished bookings ---
+# Keeps a min-heap of (leaving_time, reservation_id) for every open booking and
+# releases the ones that are due in batches, so request handlers never have to
+# scan for expired reservations themselves. A second heap of
+# (parking_time, reservation_id) holds advance bookings that have not started:
+# when one starts, its spot is marked Occupied just like a booking made on the
+# spot, so the lot counters, the availability feed and the allocator see it.
+
+OPEN_STATUSES = ('Booked', 'O')
+RETRY_DELAY = 1.0  # seconds before retrying a tick that failed
+
+
+class ExpiryScheduler:
+    def __init__(self, app, batch_size=500, refresh_interval=60):
+        self.app = app
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self._heap = []
+        self._starts = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_refresh = 0.0
+
+        # Metrics
+        self.ticks = deque(maxlen=100)
+        self.total_expired = 0
+        self.total_started = 0
+        self.max_lateness = 0.0
+
+    def refresh(self):
+        # Rebuild the heap from the (status, leaving_time) index
+        rows = db.session.query(Reservation.leaving_time, Reservation.id).filter(
+            Reservation.status.in_(OPEN_STATUSES),
+            Reservation.leaving_time.isnot(None)
+        ).order_by(Reservation.leaving_time).all()
+        heap = [(leaving_time, res_id) for leaving_time, res_id in rows]
+
+        # Bookings still to start, and started ones whose spot was never
+        # marked (they started while no worker was running)
+        now = now_local()
+        starts = db.session.query(Reservation.parking_time, Reservation.id).join(
+            ParkingSpot, ParkingSpot.id == Reservation.spot_id
+        ).filter(
+            Reservation.status.in_(OPEN_STATUSES),
+            Reservation.leaving_time > now,
+            or_(Reservation.parking_time > now, ParkingSpot.status == 'A')
+        ).order_by(Reservation.parking_time).all()
+        with self._lock:
+            self._heap = heap  # already sorted, so already a valid heap
+            self._starts = [(parking_time, res_id) for parking_time, res_id in starts]
+        self._last_refresh = time.monotonic()
+
+    def schedule(self, reservation_id, leaving_time, parking_time=None):
+        # Only the in-process worker keeps a live heap; a CLI worker picks new
+        # bookings up on its next refresh instead.
+        if self._thread is None or leaving_time is None:
+            return
+        with self._lock:
+            heapq.heappush(self._heap, (leaving_time, reservation_id))
+            is_next = self._heap[0][1] == reservation_id
+            if parking_time is not None and parking_time > now_local():
+                heapq.heappush(self._starts, (parking_time, reservation_id))
+                is_next = is_next or self._starts[0][1] == reservation_id
+        if is_next:
+            self._wakeup.set()
+
+    def next_due(self):
+        with self._lock:
+            return min([heap[0][0] for heap in (self._heap, self._starts) if heap], default=None)
+
+    def _pop_due(self, heap, now):
+        due = []
+        with self._lock:
+            while heap and heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(heap))
+        return due
+
+    def run_once(self, now=None):
+        """Release every booking whose leaving_time has passed. Returns the number released."""
+        now = now or now_local()
+        started = time.perf_counter()
+        released = 0
+        lateness = []
+
+        while True:
+            due = self._pop_due(self._heap, now)
+            if not due:
+                break
+            leaving_by_id = {res_id: leaving_time for leaving_time, res_id in due}
+
+            # Entries can be stale (released or re-timed since they were queued),
+            # so re-check against the table before releasing anything.
+            rows = db.session.query(
+                Reservation.id, Reservation.spot_id, Reservation.user_id, Reservation.leaving_time, ParkingSpot.lot_id,
+                ParkingSpot.status.label('spot_status')
+            ).join(ParkingSpot, ParkingSpot.id == Reservation.spot_id).filter(
+                Reservation.id.in_(leaving_by_id.keys()),
+                Reservation.status.in_(OPEN_STATUSES),
+                Reservation.leaving_time <= now
+            ).all()
+            if rows:
+                res_ids = [r.id for r in rows]
+                db.session.execute(
+                    update(Reservation).where(Reservation.id.in_(res_ids)).values(status='Completed')
+                )
+
+                # Free only spots these bookings occupy: an advance booking whose
+                # start has not been processed yet never marked its spot, which may
+                # meanwhile belong to the next booking.
+                held = set(db.session.scalars(select(Reservation.spot_id).where(
+                    Reservation.spot_id.in_({r.spot_id for r in rows}),
+                    Reservation.id.notin_(res_ids),
+                    Reservation.status.in_(OPEN_STATUSES),
+                    Reservation.parking_time <= now,
+                    Reservation.leaving_time > now,
+                )))
+                freed = {r.spot_id: r.lot_id for r in rows if r.spot_status == 'O' and r.spot_id not in held}
+                if freed:
+                    db.session.execute(
+                        update(ParkingSpot).where(ParkingSpot.id.in_(freed.keys())).values(is_available=True, status='A')
+                    )
+                    occupancy.move_many((lot_id, 'O', 'A') for lot_id in freed.values())
+                events.record(*(events.booking_expired(r.id, r.spot_id, r.lot_id, r.user_id, freed=r.spot_id in freed)
+                                for r in rows))
+                db.session.commit()
+                allocator.release_many((lot_id, spot_id) for spot_id, lot_id in freed.items())
+                availability_feed.publish((lot_id, spot_id, 'O', 'A') for spot_id, lot_id in freed.items())
+                chart_cache.invalidate(GLOBAL, *{user_scope(r.user_id) for r in rows})
+                released += len(rows)
+                lateness.extend((now - r.leaving_time).total_seconds() for r in rows)
+
+        booked_started = self.start_due(now)
+
+        if lateness:
+            self.total_expired += released
+            self.max_lateness = max(self.max_lateness, max(lateness))
+        self.total_started += booked_started
+        self.ticks.append({
+            'at': now.isoformat(),
+            'expired': released,
+            'started': booked_started,
+            'avg_lateness_seconds': round(sum(lateness) / len(lateness), 3) if lateness else 0.0,
+            'max_lateness_seconds': round(max(lateness), 3) if lateness else 0.0,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        })
+        return released
+
+    def start_due(self, now):
+        """Mark the spots of advance bookings whose window has started as Occupied. Returns the number started."""
+        started = 0
+        while True:
+            due = self._pop_due(self._starts, now)
+            if not due:
+                break
+            rows = db.session.query(
+                Reservation.id, Reservation.spot_id, Reservation.user_id, ParkingSpot.lot_id
+            ).join(ParkingSpot, ParkingSpot.id == Reservation.spot_id).filter(
+                Reservation.id.in_([res_id for _, res_id in due]),
+                Reservation.status.in_(OPEN_STATUSES),
+                Reservation.parking_time <= now,
+                Reservation.leaving_time > now
+            ).all()
+            if not rows:
+                continue
+
+            # Only spots still Available: a duplicate heap entry finds its spot already marked
+            occupied = set(db.session.scalars(
+                update(ParkingSpot).where(ParkingSpot.id.in_({r.spot_id for r in rows}), ParkingSpot.status == 'A')
+                .values(is_available=False, status='O').returning(ParkingSpot.id)
+            ))
+            rows = [r for r in rows if r.spot_id in occupied]
+            occupancy.move_many((r.lot_id, 'A', 'O') for r in rows)
+            events.record(*(events.booking_started(r.id, r.spot_id, r.lot_id, r.user_id) for r in rows))
+            db.session.commit()
+            for r in rows:
+                allocator.discard(r.lot_id, r.spot_id)
+            availability_feed.publish((r.lot_id, r.spot_id, 'A', 'O') for r in rows)
+            chart_cache.invalidate(GLOBAL, *{user_scope(r.user_id) for r in rows})
+            started += len(rows)
+        return started
+
+    def loop(self, stop=None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            failed = False
+            with self.app.app_context():
+                try:
+                    if time.monotonic() - self._last_refresh >= self.refresh_interval:
+                        self.refresh()
+                    self.run_once()
+                except Exception:
+                    # e.g. "database is locked": the batch popped off the heap is
+                    # lost, so rebuild the heap from the table on the next pass
+                    db.session.rollback()
+                    self.app.logger.exception("Booking expiry tick failed; retrying")
+                    self._last_refresh = 0.0
+                    failed = True
+
+            # Sleep until the next booking is due, a sooner one is scheduled, or the next refresh
+            timeout = RETRY_DELAY if failed else self.refresh_interval
+            next_due = self.next_due()
+            if next_due is not None:
+                timeout = min(timeout, max((next_due - now_local()).total_seconds(), 0.0))
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.loop, name='expiry-scheduler', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def metrics(self):
+        with self._lock:
+            pending = len(self._heap)
+            pending_starts = len(self._starts)
+            next_due = self._heap[0][0] if self._heap else None
+        return {
+            'pending': pending,
+            'pending_starts': pending_starts,
+            'next_due': next_due.isoformat() if next_due else None,
+            'total_expired': self.total_expired,
+            'total_started': self.total_started,
+            'max_lateness_seconds': round(self.max_lateness, 3),
+            'recent_ticks': [t for t in self.ticks if t['expired'] or t['started']][-20:],
+        }
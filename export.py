@@ -0,0 +1,149 @@
+import csv
+import io
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from sqlalchemy import select
+from models import db, User, ParkingLot, ParkingSpot, Reservation
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow export is optional
+    pa = pq = None
+
+# --- Reservation history export ---
+# Streams the reservation/user/spot/lot join in id order, EXPORT_CHUNK rows at
+# a time (yield_per uses a server-side cursor where the driver has one), so an
+# export holds one chunk in memory however many rows it covers. CSV is
+# streamed straight to the response; Parquet and Arrow files are written one
+# record batch per chunk and need the optional pyarrow package.
+
+EXPORT_CHUNK = 5000
+EXPORT_FORMATS = ('csv', 'parquet', 'arrow')
+
+COLUMNS = ('reservation_id', 'user_id', 'user_name', 'lot_id', 'lot_location', 'spot_number',
+           'vehicle_number', 'parking_time', 'leaving_time', 'cost', 'status')
+
+
+class ExportError(Exception):
+    pass
+
+
+def parse_filters(args):
+    """Read ?from=YYYY-MM-DD&to=YYYY-MM-DD&lot_id=N. Raises ExportError."""
+    try:
+        start = date.fromisoformat(args['from']) if args.get('from') else None
+        end = date.fromisoformat(args['to']) if args.get('to') else None
+        lot_id = int(args['lot_id']) if args.get('lot_id') else None
+    except ValueError:
+        raise ExportError("Use YYYY-MM-DD dates and a numeric lot id.")
+    if start and end and end < start:
+        raise ExportError("'to' must not be before 'from'.")
+    return start, end, lot_id
+
+
+def export_query(start=None, end=None, lot_id=None):
+    stmt = select(
+        Reservation.id, Reservation.user_id, User.full_name, ParkingSpot.lot_id, ParkingLot.location_name,
+        ParkingSpot.spot_number, Reservation.vehicle_number, Reservation.parking_time,
+        Reservation.leaving_time, Reservation.cost, Reservation.status,
+    ).join(User, User.id == Reservation.user_id) \
+        .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id) \
+        .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+    # Both ends are whole days of parking_time
+    if start:
+        stmt = stmt.where(Reservation.parking_time >= datetime.combine(start, dt_time.min))
+    if end:
+        stmt = stmt.where(Reservation.parking_time < datetime.combine(end + timedelta(days=1), dt_time.min))
+    if lot_id:
+        stmt = stmt.where(ParkingSpot.lot_id == lot_id)
+    return stmt.order_by(Reservation.id)
+
+
+def chunks(stmt, size=EXPORT_CHUNK):
+    # Core execution on the session's connection: rows as tuples, without the ORM loading layer
+    result = db.session.connection().execute(stmt, execution_options={'yield_per': size})
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def filename(fmt, start=None, end=None, lot_id=None):
+    parts = ['reservations', str(start or 'all'), str(end or 'all')]
+    if lot_id:
+        parts.append(f"lot{lot_id}")
+    return '_'.join(parts) + '.' + fmt
+
+
+# --- CSV ---
+# csv.writer str()s each value, which already gives 'YYYY-MM-DD HH:MM:SS' for datetimes
+
+def iter_csv(stmt, size=EXPORT_CHUNK):
+    """Yield the export as CSV text, one encoded chunk of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for partition in chunks(stmt, size):
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# --- Parquet / Arrow ---
+
+def arrow_schema():
+    return pa.schema([
+        ('reservation_id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('user_name', pa.string()),
+        ('lot_id', pa.int64()),
+        ('lot_location', pa.string()),
+        ('spot_number', pa.string()),
+        ('vehicle_number', pa.string()),
+        ('parking_time', pa.timestamp('us')),
+        ('leaving_time', pa.timestamp('us')),
+        ('cost', pa.float64()),
+        ('status', pa.string()),
+    ])
+
+
+def write_columnar(sink, fmt, stmt, size=EXPORT_CHUNK):
+    """Write the export to `sink` (a path or binary file) as Parquet or Arrow IPC. Returns the row count."""
+    if pa is None:
+        raise ExportError("Parquet and Arrow exports need pyarrow (pip install pyarrow).")
+    schema = arrow_schema()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    rows = 0
+    try:
+        for partition in chunks(stmt, size):
+            columns = list(zip(*partition))
+            writer.write_batch(pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            rows += len(partition)
+    finally:
+        writer.close()
+    return rows
+
+
+def export_to_file(path, fmt, stmt, size=EXPORT_CHUNK):
+    """Write the export to `path`. Returns (rows, seconds)."""
+    started = time.perf_counter()
+    if fmt == 'csv':
+        rows = 0
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for partition in chunks(stmt, size):
+                writer.writerows(partition)
+                rows += len(partition)
+    else:
+        rows = write_columnar(path, fmt, stmt, size)
+    return rows, time.perf_counter() - started
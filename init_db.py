@@ -1,14 +1,16 @@
-from app import app
+from app import app, password_hasher
 from models import db, Admin
-from werkzeug.security import generate_password_hash
+from auth import add_identifiers
 
 with app.app_context():
     db.create_all()
 
     # Create default admin
     if not Admin.query.first():
-        admin = Admin(username='Deva', password=generate_password_hash('deva2006'))
+        admin = Admin(username='Deva', password=password_hasher.hash('deva2006'))
         db.session.add(admin)
+        db.session.flush()
+        add_identifiers('admin', admin.id, admin.username)
         db.session.commit()
         print("Admin created.")
     else:
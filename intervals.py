@@ -0,0 +1,118 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import exists, select, update
+from models import db, ParkingSpot, Reservation
+from expiry import OPEN_STATUSES, now_local
+
+# --- Reservation interval index ---
+# Keeps every open booking as a (start, end, reservation_id) interval in a
+# sorted list per spot, so "is spot S free between T1 and T2" is a binary
+# search instead of a scan over reservation history. The index is rebuilt
+# from the open reservations every `refresh_interval` seconds and updated in
+# place by the booking routes. It only proposes candidates; the booking
+# transaction re-checks the database (has_overlap) before committing.
+#
+# Windows are clipped to the present: a booking that started in the past only
+# conflicts with bookings that are still running.
+
+
+class IntervalIndex:
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._spots = {}  # spot_id -> sorted list of (start, end, reservation_id)
+        self._reservations = {}  # reservation_id -> (spot_id, start, end)
+        self._lock = threading.Lock()
+        self._loaded_at = None
+
+    def load(self):
+        rows = db.session.execute(
+            select(Reservation.id, Reservation.spot_id, Reservation.parking_time, Reservation.leaving_time)
+            .where(Reservation.status.in_(OPEN_STATUSES), Reservation.leaving_time > now_local())
+            .order_by(Reservation.parking_time)
+        ).all()
+        spots, reservations = {}, {}
+        for res_id, spot_id, start, end in rows:
+            spots.setdefault(spot_id, []).append((start, end, res_id))
+            reservations[res_id] = (spot_id, start, end)
+        with self._lock:
+            self._spots = spots
+            self._reservations = reservations
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            self.load()
+
+    def add(self, reservation_id, spot_id, start, end):
+        self._ensure_fresh()
+        with self._lock:
+            if reservation_id in self._reservations:
+                return
+            insort(self._spots.setdefault(spot_id, []), (start, end, reservation_id))
+            self._reservations[reservation_id] = (spot_id, start, end)
+
+    def remove(self, reservation_id):
+        with self._lock:
+            entry = self._reservations.pop(reservation_id, None)
+            if entry is None:
+                return
+            spot_id, start, end = entry
+            intervals = self._spots.get(spot_id, [])
+            i = bisect_left(intervals, (start, end, reservation_id))
+            if i < len(intervals) and intervals[i][2] == reservation_id:
+                del intervals[i]
+
+    def _free(self, spot_id, start, end):
+        # Bookings on one spot never overlap, so only the last one starting
+        # before `end` can reach into the window.
+        intervals = self._spots.get(spot_id)
+        if not intervals:
+            return True
+        i = bisect_left(intervals, end, key=lambda interval: interval[0])
+        return i == 0 or intervals[i - 1][1] <= start
+
+    def is_free(self, spot_id, start, end):
+        self._ensure_fresh()
+        start = max(start, now_local())
+        with self._lock:
+            return self._free(spot_id, start, end)
+
+    def free_spots(self, spot_ids, start, end):
+        """The subset of `spot_ids` with no booking overlapping [start, end)."""
+        self._ensure_fresh()
+        start = max(start, now_local())
+        with self._lock:
+            return [spot_id for spot_id in spot_ids if self._free(spot_id, start, end)]
+
+
+def has_overlap(spot_id, start, end):
+    """Authoritative check against the reservations table."""
+    start = max(start, now_local())
+    return db.session.scalar(select(exists().where(
+        Reservation.spot_id == spot_id,
+        Reservation.status.in_(OPEN_STATUSES),
+        Reservation.parking_time < end,
+        Reservation.leaving_time > start,
+    )))
+
+
+def lock_spot(spot_id):
+    """Take the spot's row lock for the rest of the transaction. False if the spot is out of service."""
+    result = db.session.execute(
+        update(ParkingSpot).where(ParkingSpot.id == spot_id, ParkingSpot.status != 'U')
+        .values(status=ParkingSpot.status)
+    )
+    return result.rowcount == 1
+
+
+def bookable_spot_ids(lot_id):
+    return db.session.scalars(
+        select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id, ParkingSpot.status != 'U').order_by(ParkingSpot.id)
+    ).all()
+
+
+interval_index = IntervalIndex()
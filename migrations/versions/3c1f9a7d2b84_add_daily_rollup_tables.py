@@ -0,0 +1,54 @@
+"""Add daily booking/revenue rollup tables
+
+Revision ID: 3c1f9a7d2b84
+Revises: ee0fb053901e
+Create Date: 2026-10-17 10:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a7d2b84'
+down_revision = 'ee0fb053901e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_lot_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('lot_id', sa.Integer(), nullable=False),
+    sa.Column('bookings', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['lot_id'], ['parking_lots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'lot_id')
+    )
+    op.create_table('daily_user_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('bookings', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'user_id')
+    )
+
+    # Backfill from existing reservation history
+    op.execute(
+        "INSERT INTO daily_lot_stats (day, lot_id, bookings, revenue) "
+        "SELECT date(r.parking_time), s.lot_id, count(r.id), coalesce(sum(r.cost), 0) "
+        "FROM reservations r JOIN parking_spots s ON s.id = r.spot_id "
+        "GROUP BY date(r.parking_time), s.lot_id"
+    )
+    op.execute(
+        "INSERT INTO daily_user_stats (day, user_id, bookings, revenue) "
+        "SELECT date(r.parking_time), r.user_id, count(r.id), coalesce(sum(r.cost), 0) "
+        "FROM reservations r "
+        "GROUP BY date(r.parking_time), r.user_id"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_user_stats')
+    op.drop_table('daily_lot_stats')
@@ -0,0 +1,41 @@
+"""Add per-lot occupancy counters
+
+Revision ID: 4d8f2a6c1e95
+Revises: b7e1d2c4a690
+Create Date: 2026-10-17 15:42:07.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8f2a6c1e95'
+down_revision = 'b7e1d2c4a690'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_lots', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('available_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('occupied_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('unavailable_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from the existing spots
+    op.execute("""
+        UPDATE parking_lots SET
+            available_count = (SELECT COUNT(*) FROM parking_spots
+                               WHERE parking_spots.lot_id = parking_lots.id AND parking_spots.status = 'A'),
+            occupied_count = (SELECT COUNT(*) FROM parking_spots
+                              WHERE parking_spots.lot_id = parking_lots.id AND parking_spots.status = 'O'),
+            unavailable_count = (SELECT COUNT(*) FROM parking_spots
+                                 WHERE parking_spots.lot_id = parking_lots.id AND parking_spots.status = 'U')
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('parking_lots', schema=None) as batch_op:
+        batch_op.drop_column('unavailable_count')
+        batch_op.drop_column('occupied_count')
+        batch_op.drop_column('available_count')
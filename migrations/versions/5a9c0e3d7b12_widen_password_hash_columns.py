@@ -0,0 +1,44 @@
+"""Widen password hash columns for configurable hash methods
+
+Revision ID: 5a9c0e3d7b12
+Revises: 8e2d4b6a1f37
+Create Date: 2026-10-17 13:41:09.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9c0e3d7b12'
+down_revision = '8e2d4b6a1f37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=255),
+               existing_nullable=False)
+
+    with op.batch_alter_table('admins', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=255),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('admins', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=100),
+               existing_nullable=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=100),
+               existing_nullable=False)
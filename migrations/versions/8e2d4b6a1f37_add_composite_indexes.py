@@ -0,0 +1,49 @@
+"""Add composite indexes for hot query filters
+
+Revision ID: 8e2d4b6a1f37
+Revises: 3c1f9a7d2b84
+Create Date: 2026-10-17 11:03:18.551902
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2d4b6a1f37'
+down_revision = '3c1f9a7d2b84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_lots', schema=None) as batch_op:
+        batch_op.create_index('ix_parking_lots_status', ['status'], unique=False)
+
+    with op.batch_alter_table('parking_spots', schema=None) as batch_op:
+        batch_op.create_index('ix_parking_spots_lot_status', ['lot_id', 'status'], unique=False)
+        batch_op.create_index('ix_parking_spots_available_lot', ['is_available', 'lot_id'], unique=False)
+
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.create_index('ix_reservations_user_status', ['user_id', 'status'], unique=False)
+        batch_op.create_index('ix_reservations_status_leaving', ['status', 'leaving_time'], unique=False)
+        batch_op.create_index('ix_reservations_spot_id', ['spot_id'], unique=False)
+
+    with op.batch_alter_table('daily_user_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_daily_user_stats_user_day', ['user_id', 'day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('daily_user_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_daily_user_stats_user_day')
+
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservations_spot_id')
+        batch_op.drop_index('ix_reservations_status_leaving')
+        batch_op.drop_index('ix_reservations_user_status')
+
+    with op.batch_alter_table('parking_spots', schema=None) as batch_op:
+        batch_op.drop_index('ix_parking_spots_available_lot')
+        batch_op.drop_index('ix_parking_spots_lot_status')
+
+    with op.batch_alter_table('parking_lots', schema=None) as batch_op:
+        batch_op.drop_index('ix_parking_lots_status')
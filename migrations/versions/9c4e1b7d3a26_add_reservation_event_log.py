@@ -0,0 +1,63 @@
+"""Add reservation event log and snapshots
+
+Revision ID: 9c4e1b7d3a26
+Revises: 4d8f2a6c1e95
+Create Date: 2026-10-18 09:21:55.613042
+
+"""
+from datetime import datetime
+from alembic import op
+from pytz import timezone
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1b7d3a26'
+down_revision = '4d8f2a6c1e95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=True),
+    sa.Column('spot_id', sa.Integer(), nullable=True),
+    sa.Column('lot_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('spot_status', sa.String(length=1), nullable=True),
+    sa.Column('day', sa.Date(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=True),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    snapshots = op.create_table('event_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_event_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('state', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Baseline snapshot of the existing state, so replay does not need the history before the log
+    conn = op.get_bind()
+    state = {
+        'spots': {str(spot_id): status for spot_id, status in conn.execute(sa.text(
+            "SELECT id, status FROM parking_spots"))},
+        'lot_stats': [[str(day), lot_id, bookings, revenue] for day, lot_id, bookings, revenue in conn.execute(sa.text(
+            "SELECT day, lot_id, bookings, revenue FROM daily_lot_stats"))],
+        'user_stats': [[str(day), user_id, bookings, revenue] for day, user_id, bookings, revenue in conn.execute(sa.text(
+            "SELECT day, user_id, bookings, revenue FROM daily_user_stats"))],
+    }
+    op.bulk_insert(snapshots, [{
+        'last_event_id': 0,
+        'created_at': datetime.now(timezone('Asia/Kolkata')).replace(tzinfo=None),
+        'state': state,
+    }])
+
+
+def downgrade():
+    op.drop_table('event_snapshots')
+    op.drop_table('reservation_events')
@@ -0,0 +1,50 @@
+"""Add normalized login identifier lookup table
+
+Revision ID: b7e1d2c4a690
+Revises: 5a9c0e3d7b12
+Create Date: 2026-10-17 14:26:52.730415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1d2c4a690'
+down_revision = '5a9c0e3d7b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    login_identifiers = op.create_table('login_identifiers',
+    sa.Column('identifier', sa.String(length=120), nullable=False),
+    sa.Column('role', sa.String(length=10), nullable=False),
+    sa.Column('principal_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('identifier')
+    )
+    with op.batch_alter_table('login_identifiers', schema=None) as batch_op:
+        batch_op.create_index('ix_login_identifiers_principal', ['role', 'principal_id'], unique=False)
+
+    # Backfill: user emails and full names, then admin usernames. On a clash
+    # the first owner keeps the name, matching the old user-before-admin login order.
+    conn = op.get_bind()
+    rows = {}
+    for user_id, email, full_name in conn.execute(sa.text("SELECT id, email, full_name FROM users ORDER BY id")):
+        for name in (email, full_name):
+            rows.setdefault((name or '').strip().lower(), ('user', user_id))
+    for admin_id, username in conn.execute(sa.text("SELECT id, username FROM admins ORDER BY id")):
+        rows.setdefault((username or '').strip().lower(), ('admin', admin_id))
+    rows.pop('', None)
+
+    op.bulk_insert(login_identifiers, [
+        {'identifier': identifier, 'role': role, 'principal_id': principal_id}
+        for identifier, (role, principal_id) in rows.items()
+    ])
+
+
+def downgrade():
+    with op.batch_alter_table('login_identifiers', schema=None) as batch_op:
+        batch_op.drop_index('ix_login_identifiers_principal')
+
+    op.drop_table('login_identifiers')
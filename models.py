@@ -1,14 +1,22 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from pytz import timezone
+from replica import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def now_local():
+    # Booking times are stored as naive local (IST) datetimes
+    return datetime.now(timezone('Asia/Kolkata')).replace(tzinfo=None)
 
-db = SQLAlchemy()
 
 class Admin(db.Model):
     __tablename__ = 'admins'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)  # hashed
+    password = db.Column(db.String(255), nullable=False)  # hashed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class User(db.Model, UserMixin):
@@ -16,7 +24,7 @@ class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     full_name = db.Column(db.String(120),unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)  # hashed
+    password = db.Column(db.String(255), nullable=False)  # hashed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     reservations = db.relationship('Reservation', backref='user', lazy=True)
 
@@ -30,8 +38,16 @@ class ParkingLot(db.Model):
     max_spots = db.Column(db.Integer, nullable=False)
     status = db.Column(db.String(20), default='Active')  # Active or Inactive
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Spot counts by status, kept in step by occupancy.py
+    available_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    occupied_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    unavailable_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     spots = db.relationship('ParkingSpot',backref='lot',lazy=True,cascade='all, delete',passive_deletes=True)
 
+    __table_args__ = (
+        db.Index('ix_parking_lots_status', 'status'),
+    )
+
 class ParkingSpot(db.Model):
     __tablename__ = 'parking_spots'
     id = db.Column(db.Integer, primary_key=True)
@@ -41,14 +57,81 @@ class ParkingSpot(db.Model):
     reservation = db.relationship('Reservation', backref='spot', lazy=True)
     is_available = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        db.Index('ix_parking_spots_lot_status', 'lot_id', 'status'),
+        db.Index('ix_parking_spots_available_lot', 'is_available', 'lot_id'),
+    )
+
 class Reservation(db.Model):
     __tablename__ = 'reservations'
     id = db.Column(db.Integer, primary_key=True)
     spot_id = db.Column(db.Integer, db.ForeignKey('parking_spots.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     vehicle_number = db.Column(db.String(20))
-    parking_time = db.Column(db.DateTime, default=datetime.utcnow)
+    parking_time = db.Column(db.DateTime, default=now_local)
     leaving_time = db.Column(db.DateTime, nullable=True)
     cost = db.Column(db.Float, default=0.0)
     status = db.Column(db.String(20), default='Active')  # Active or Completed
 
+    __table_args__ = (
+        db.Index('ix_reservations_user_status', 'user_id', 'status'),
+        db.Index('ix_reservations_status_leaving', 'status', 'leaving_time'),
+        db.Index('ix_reservations_spot_id', 'spot_id'),
+    )
+
+
+class DailyLotStats(db.Model):
+    __tablename__ = 'daily_lot_stats'
+    day = db.Column(db.Date, primary_key=True)
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lots.id', ondelete='CASCADE'), primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+class DailyUserStats(db.Model):
+    __tablename__ = 'daily_user_stats'
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_daily_user_stats_user_day', 'user_id', 'day'),
+    )
+
+class LoginIdentifier(db.Model):
+    # Normalized login names (user email/full name, admin username) -> principal
+    __tablename__ = 'login_identifiers'
+    identifier = db.Column(db.String(120), primary_key=True)  # stripped + lowercased
+    role = db.Column(db.String(10), nullable=False)  # 'user' or 'admin'
+    principal_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_login_identifiers_principal', 'role', 'principal_id'),
+    )
+
+class ReservationEvent(db.Model):
+    # Append-only log of booking and spot state changes, written by events.py
+    # in the same transaction as the change. No foreign keys: entries outlive
+    # the rows they describe.
+    __tablename__ = 'reservation_events'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    reservation_id = db.Column(db.Integer)
+    spot_id = db.Column(db.Integer)
+    lot_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)
+    # What replay needs, as plain columns: the spot's new status, and the
+    # rollup day and revenue change
+    spot_status = db.Column(db.String(1))
+    day = db.Column(db.Date)
+    amount = db.Column(db.Float)
+    data = db.Column(db.JSON, nullable=False, default=dict)
+
+class EventSnapshot(db.Model):
+    # Spot statuses and rollups as of last_event_id, so replay starts here
+    __tablename__ = 'event_snapshots'
+    id = db.Column(db.Integer, primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    state = db.Column(db.JSON, nullable=False)
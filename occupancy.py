@@ -0,0 +1,67 @@
+from collections import Counter, defaultdict
+from sqlalchemy import func, select, update
+from models import db, ParkingLot, ParkingSpot
+
+# --- Per-lot occupancy counters ---
+# parking_lots carries available/occupied/unavailable counts so listings and
+# the dashboard never count spot rows. Every spot state change adjusts them
+# with an in-place UPDATE in the same transaction; `flask check-lot-counts`
+# finds and repairs any drift.
+
+COUNT_COLUMNS = {'A': 'available_count', 'O': 'occupied_count', 'U': 'unavailable_count'}
+
+
+def adjust(lot_id, deltas):
+    """Add {status: delta} to the lot's counters."""
+    values = {
+        COUNT_COLUMNS[status]: getattr(ParkingLot, COUNT_COLUMNS[status]) + delta
+        for status, delta in deltas.items() if delta
+    }
+    if values:
+        db.session.execute(update(ParkingLot).where(ParkingLot.id == lot_id).values(**values))
+
+
+def move(lot_id, old_status, new_status, count=1):
+    """Record `count` spots in the lot going from one status to another."""
+    if old_status != new_status:
+        adjust(lot_id, {old_status: -count, new_status: count})
+
+
+def move_many(changes):
+    # changes: iterable of (lot_id, old_status, new_status)
+    per_lot = defaultdict(Counter)
+    for lot_id, old_status, new_status in changes:
+        if old_status != new_status:
+            per_lot[lot_id][old_status] -= 1
+            per_lot[lot_id][new_status] += 1
+    for lot_id, deltas in per_lot.items():
+        adjust(lot_id, deltas)
+
+
+def _counted(status):
+    return select(func.count(ParkingSpot.id)).where(
+        ParkingSpot.lot_id == ParkingLot.id, ParkingSpot.status == status
+    ).scalar_subquery()
+
+
+def find_drift():
+    """Return [(lot_id, stored, actual)] for every lot whose counters disagree with its spots."""
+    columns = [getattr(ParkingLot, name) for name in COUNT_COLUMNS.values()]
+    rows = db.session.execute(
+        select(ParkingLot.id, *columns, *(_counted(status) for status in COUNT_COLUMNS))
+    ).all()
+    width = len(COUNT_COLUMNS)
+    drift = []
+    for row in rows:
+        stored, actual = tuple(row[1:1 + width]), tuple(row[1 + width:])
+        if stored != actual:
+            drift.append((row[0], dict(zip(COUNT_COLUMNS, stored)), dict(zip(COUNT_COLUMNS, actual))))
+    return drift
+
+
+def recount(lot_ids=None):
+    """Reset the counters from the spots table (all lots, or just `lot_ids`)."""
+    stmt = update(ParkingLot).values(**{name: _counted(status) for status, name in COUNT_COLUMNS.items()})
+    if lot_ids is not None:
+        stmt = stmt.where(ParkingLot.id.in_(lot_ids))
+    db.session.execute(stmt.execution_options(synchronize_session=False))
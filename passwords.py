@@ -0,0 +1,70 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# --- Password hashing ---
+# Hashing runs on a small bounded worker pool so a burst of logins cannot take
+# over every request thread; scrypt/pbkdf2 release the GIL, so the workers run
+# in parallel. The cost parameters come from PASSWORD_HASH_METHOD, and hashes
+# made with older parameters are upgraded the next time the user logs in.
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self._executor = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'))
+        app.config.setdefault('PASSWORD_HASH_WORKERS', int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2)))
+        app.config.setdefault('PASSWORD_HASH_QUEUE', int(os.environ.get('PASSWORD_HASH_QUEUE', 32)))
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5)))
+        self.app = app
+        # Werkzeug expands short methods ('pbkdf2', 'scrypt') with its default
+        # parameters, so take the prefix of a real hash to compare stored hashes with
+        self.hash_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+
+        workers = app.config['PASSWORD_HASH_WORKERS']
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Running + waiting jobs; anything beyond this is turned away instead of queueing forever
+        self._slots = threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE'])
+
+    @property
+    def method(self):
+        return self.app.config['PASSWORD_HASH_METHOD']
+
+    def _run(self, fn, *args):
+        timeout = self.app.config['PASSWORD_HASH_TIMEOUT']
+        if not self._slots.acquire(timeout=timeout):
+            raise HasherBusy()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.hash_prefix
+
+    def verify(self, stored_hash, password):
+        """Check a password. Returns (matches, new_hash); new_hash is set when the stored hash should be upgraded."""
+        if not stored_hash:
+            return False, None
+
+        def check_and_upgrade():
+            if not check_password_hash(stored_hash, password):
+                return False, None
+            if self.needs_rehash(stored_hash):
+                return True, generate_password_hash(password, self.method)
+            return True, None
+
+        return self._run(check_and_upgrade)
@@ -0,0 +1,112 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- Opt-in SQL profiler ---
+# Counts the statements each request runs, how long they took, the slowest
+# statements seen and statements repeated within one request (likely N+1
+# loops). Bookkeeping is a few counter updates per query, so it is cheap
+# enough to leave on in production (SQL_PROFILING=1).
+
+
+class SQLProfiler:
+    def __init__(self, app=None, slow_limit=20, repeat_threshold=10):
+        self.slow_limit = slow_limit
+        self.repeat_threshold = repeat_threshold
+        self._lock = threading.Lock()
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self._slowest = []  # min-heap of (seconds, statement, endpoint)
+            self.repeats = {}  # (endpoint, statement) -> worst repeat count in one request
+
+    def init_app(self, app):
+        self.app = app
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+
+    @property
+    def enabled(self):
+        return self.app.config.get('SQL_PROFILING', False)
+
+    def _start_request(self):
+        if self.enabled:
+            g.sql_profile = {'queries': 0, 'seconds': 0.0, 'statements': Counter(), 'started': time.perf_counter()}
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_profile' in g:
+            conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('profiler_started')
+        if not started or not has_request_context() or 'sql_profile' not in g:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        profile = g.sql_profile
+        profile['queries'] += 1
+        profile['seconds'] += elapsed
+        profile['statements'][statement] += 1
+
+        with self._lock:
+            entry = (elapsed, statement, request.endpoint)
+            if len(self._slowest) < self.slow_limit:
+                heapq.heappush(self._slowest, entry)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _finish_request(self, exc=None):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return
+        endpoint = request.endpoint or request.path
+        wall = time.perf_counter() - profile['started']
+
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'sql_seconds': 0.0, 'wall_seconds': 0.0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += profile['queries']
+            stats['max_queries'] = max(stats['max_queries'], profile['queries'])
+            stats['sql_seconds'] += profile['seconds']
+            stats['wall_seconds'] += wall
+
+            for statement, count in profile['statements'].items():
+                if count >= self.repeat_threshold:
+                    key = (endpoint, statement)
+                    self.repeats[key] = max(self.repeats.get(key, 0), count)
+
+    def report(self):
+        with self._lock:
+            endpoints = []
+            for name, stats in self.endpoints.items():
+                requests = stats['requests']
+                endpoints.append({
+                    'endpoint': name,
+                    'requests': requests,
+                    'avg_queries': round(stats['queries'] / requests, 2),
+                    'max_queries': stats['max_queries'],
+                    'avg_sql_ms': round(stats['sql_seconds'] / requests * 1000, 3),
+                    'avg_wall_ms': round(stats['wall_seconds'] / requests * 1000, 3),
+                    'total_sql_ms': round(stats['sql_seconds'] * 1000, 3),
+                })
+            slowest = [
+                {'ms': round(seconds * 1000, 3), 'endpoint': endpoint, 'statement': statement}
+                for seconds, statement, endpoint in sorted(self._slowest, reverse=True)
+            ]
+            repeats = [
+                {'endpoint': endpoint, 'statement': statement, 'count': count}
+                for (endpoint, statement), count in sorted(self.repeats.items(), key=lambda item: -item[1])
+            ]
+        endpoints.sort(key=lambda e: -e['total_sql_ms'])
+        return {'enabled': self.enabled, 'endpoints': endpoints, 'slowest': slowest, 'n_plus_one': repeats}
@@ -0,0 +1,59 @@
+from collections import Counter
+from sqlalchemy import Integer, delete, exists, func, insert
+from models import db, ParkingSpot, Reservation
+import occupancy
+
+# --- Bulk spot provisioning ---
+# Spots are created and retired with chunked set-based statements instead of
+# one ORM object per spot, so large lots can be provisioned in one request.
+
+CHUNK_SIZE = 5000
+
+_spot_no = func.cast(func.substr(ParkingSpot.spot_number, 2), Integer)
+
+
+def highest_spot_number(lot_id):
+    return db.session.query(func.max(_spot_no)).filter(ParkingSpot.lot_id == lot_id).scalar() or 0
+
+
+def provision_spots(lot_id, count, start_number=None):
+    """Insert `count` free spots into the lot, numbered after the highest existing one. Returns the new ids."""
+    if start_number is None:
+        start_number = highest_spot_number(lot_id) + 1
+
+    new_ids = []
+    stmt = insert(ParkingSpot).returning(ParkingSpot.id)
+    for offset in range(0, count, CHUNK_SIZE):
+        rows = [
+            {'lot_id': lot_id, 'spot_number': f"S{n}", 'status': 'A', 'is_available': True}
+            for n in range(start_number + offset, start_number + min(offset + CHUNK_SIZE, count))
+        ]
+        new_ids.extend(db.session.scalars(stmt, rows).all())
+    occupancy.adjust(lot_id, {'A': len(new_ids)})
+    return new_ids
+
+
+def retirable_spot_ids(lot_id, count):
+    # Highest-numbered spots that are not occupied and have no booking history
+    has_history = exists().where(Reservation.spot_id == ParkingSpot.id)
+    return db.session.scalars(
+        db.select(ParkingSpot.id)
+        .where(ParkingSpot.lot_id == lot_id, ParkingSpot.status != 'O', ~has_history)
+        .order_by(_spot_no.desc())
+        .limit(count)
+    ).all()
+
+
+def retire_spots(lot_id, count):
+    """Delete `count` spots from the lot. Returns the deleted ids, or None if not enough spots can be removed."""
+    spot_ids = retirable_spot_ids(lot_id, count)
+    if len(spot_ids) < count:
+        return None
+    removed = Counter()
+    for offset in range(0, len(spot_ids), CHUNK_SIZE):
+        chunk = spot_ids[offset:offset + CHUNK_SIZE]
+        removed.update(db.session.scalars(
+            delete(ParkingSpot).where(ParkingSpot.id.in_(chunk)).returning(ParkingSpot.status)
+        ).all())
+    occupancy.adjust(lot_id, {status: -count for status, count in removed.items()})
+    return spot_ids
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# --- Read-replica routing ---
+# Views wrapped in @replica_reads send their SELECTs to the 'replica' bind
+# (SQLALCHEMY_BINDS['replica']) when one is configured. Writes, flushes and
+# every other view stay on the primary. For local SQLite setups the replica
+# is a second file refreshed from the primary with the SQLite backup API.
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and _wants_replica():
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _wants_replica():
+    return has_app_context() and g.get('db_route') == REPLICA_BIND
+
+
+def replica_reads(view):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        sync = current_app.extensions.get('replica_sync')
+        if sync is not None:
+            sync.ensure_ready()
+        g.db_route = REPLICA_BIND
+        return view(*args, **kwargs)
+    return wrapped
+
+
+class SQLiteReplicaSync:
+    """Copies the primary SQLite file onto the replica file every `interval` seconds."""
+
+    def __init__(self, app, primary_url, replica_url, interval=5):
+        self.primary_path = make_url(primary_url).database
+        self.replica_path = make_url(replica_url).database
+        self.app = app
+        self.interval = interval
+        self.last_synced = None
+        self.last_duration = None
+        self._lock = threading.Lock()
+        self._thread = None
+        app.extensions['replica_sync'] = self
+
+    def sync(self):
+        with self._lock:
+            started = time.perf_counter()
+            source = sqlite3.connect(self.primary_path)
+            target = sqlite3.connect(self.replica_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.last_duration = time.perf_counter() - started
+            self.last_synced = time.time()
+
+    def ensure_ready(self):
+        # Copy once per process before the first routed read, so a new or stale replica file is never served
+        if self.last_synced is None:
+            self.sync()
+
+    def loop(self, stop=None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                # e.g. the primary is locked mid-copy; the replica keeps its last copy until the next pass
+                self.app.logger.exception("Replica sync failed; retrying")
+            stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.loop, name='replica-sync', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def status(self):
+        return {
+            'replica': self.replica_path,
+            'interval_seconds': self.interval,
+            'last_synced': self.last_synced,
+            'last_duration_ms': round(self.last_duration * 1000, 3) if self.last_duration else None,
+        }
+
+
+def configure_replica(app):
+    """Set up the replica bind from REPLICA_DATABASE_URL. Returns the SQLite sync job, if any."""
+    replica_url = os.environ.get('REPLICA_DATABASE_URL')
+    if not replica_url:
+        return None
+    app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = replica_url
+
+    primary_url = app.config['SQLALCHEMY_DATABASE_URI']
+    if primary_url.startswith('sqlite') and replica_url.startswith('sqlite'):
+        return SQLiteReplicaSync(app, primary_url, replica_url, float(os.environ.get('REPLICA_SYNC_INTERVAL', 5)))
+    return None
@@ -0,0 +1,93 @@
+from datetime import date
+from sqlalchemy import func, insert, update
+from models import db, DailyLotStats, DailyUserStats, ParkingSpot, Reservation
+
+# --- Daily booking/revenue rollups ---
+# One row per (day, lot) and (day, user). Booking and release routes bump
+# them incrementally so the dashboard charts never scan reservations.
+
+
+def _bump(model, key_col, key, day, bookings, revenue):
+    result = db.session.execute(
+        update(model)
+        .where(model.day == day, key_col == key)
+        .values(bookings=model.bookings + bookings, revenue=model.revenue + revenue)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(model).values(
+            {'day': day, key_col.key: key, 'bookings': bookings, 'revenue': revenue}
+        ))
+
+
+def record_booking(reservation, lot_id):
+    day = reservation.parking_time.date()
+    cost = reservation.cost or 0.0
+    _bump(DailyLotStats, DailyLotStats.lot_id, lot_id, day, 1, cost)
+    _bump(DailyUserStats, DailyUserStats.user_id, int(reservation.user_id), day, 1, cost)
+
+
+def record_bookings(user_id, lot_id, bookings):
+    # bookings: iterable of (parking_time, cost); one bump per day, not per booking
+    per_day = {}
+    for parking_time, cost in bookings:
+        count, revenue = per_day.get(parking_time.date(), (0, 0.0))
+        per_day[parking_time.date()] = (count + 1, revenue + (cost or 0.0))
+    for day, (count, revenue) in per_day.items():
+        _bump(DailyLotStats, DailyLotStats.lot_id, lot_id, day, count, revenue)
+        _bump(DailyUserStats, DailyUserStats.user_id, int(user_id), day, count, revenue)
+
+
+def record_cost_change(reservation, lot_id, delta):
+    if not delta:
+        return
+    day = reservation.parking_time.date()
+    _bump(DailyLotStats, DailyLotStats.lot_id, lot_id, day, 0, delta)
+    _bump(DailyUserStats, DailyUserStats.user_id, int(reservation.user_id), day, 0, delta)
+
+
+def remove_user(user_id):
+    # Take the user's reservations back out of the per-lot rollups before they are deleted
+    day = func.date(Reservation.parking_time)
+    rows = db.session.query(
+        day, ParkingSpot.lot_id, func.count(Reservation.id), func.coalesce(func.sum(Reservation.cost), 0.0)
+    ).join(ParkingSpot, ParkingSpot.id == Reservation.spot_id) \
+        .filter(Reservation.user_id == user_id).group_by(day, ParkingSpot.lot_id).all()
+
+    for day_str, lot_id, count, revenue in rows:
+        db.session.execute(
+            update(DailyLotStats)
+            .where(DailyLotStats.day == _as_date(day_str), DailyLotStats.lot_id == lot_id)
+            .values(bookings=DailyLotStats.bookings - count, revenue=DailyLotStats.revenue - revenue)
+        )
+    DailyUserStats.query.filter_by(user_id=user_id).delete()
+    return [(str(_as_date(day_str)), lot_id, count, revenue) for day_str, lot_id, count, revenue in rows]
+
+
+def rebuild():
+    # Backfill both rollup tables from the full reservation history
+    DailyLotStats.query.delete()
+    DailyUserStats.query.delete()
+
+    day = func.date(Reservation.parking_time)
+    lot_rows = db.session.query(
+        day, ParkingSpot.lot_id, func.count(Reservation.id), func.coalesce(func.sum(Reservation.cost), 0.0)
+    ).join(ParkingSpot, ParkingSpot.id == Reservation.spot_id).group_by(day, ParkingSpot.lot_id)
+    user_rows = db.session.query(
+        day, Reservation.user_id, func.count(Reservation.id), func.coalesce(func.sum(Reservation.cost), 0.0)
+    ).group_by(day, Reservation.user_id)
+
+    lot_stats = [{'day': _as_date(d), 'lot_id': k, 'bookings': c, 'revenue': r} for d, k, c, r in lot_rows]
+    user_stats = [{'day': _as_date(d), 'user_id': k, 'bookings': c, 'revenue': r} for d, k, c, r in user_rows]
+    if lot_stats:
+        db.session.execute(insert(DailyLotStats), lot_stats)
+    if user_stats:
+        db.session.execute(insert(DailyUserStats), user_stats)
+    db.session.commit()
+    return len(lot_stats), len(user_stats)
+
+
+def _as_date(value):
+    # func.date() comes back as a string on SQLite and a date elsewhere
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
@@ -0,0 +1,48 @@
+document.addEventListener("DOMContentLoaded", function () {
+  const percent = function (value) { return Math.round(value * 1000) / 10; };
+
+  if (document.getElementById("hourlyChart")) {
+    new Chart(document.getElementById("hourlyChart").getContext("2d"), {
+      type: "line",
+      data: {
+        labels: analyticsData.hourly.labels,
+        datasets: [{
+          label: "Occupancy (%)",
+          data: analyticsData.hourly.occupancy.map(percent),
+          borderColor: "rgba(54, 162, 235, 1)",
+          backgroundColor: "rgba(54, 162, 235, 0.2)",
+          fill: true,
+          pointRadius: 0,
+          tension: 0.2
+        }]
+      },
+      options: {
+        responsive: true,
+        scales: {
+          x: { ticks: { maxTicksLimit: 12 } },
+          y: { beginAtZero: true, suggestedMax: 100 }
+        }
+      }
+    });
+  }
+
+  if (document.getElementById("hourOfDayChart")) {
+    new Chart(document.getElementById("hourOfDayChart").getContext("2d"), {
+      type: "bar",
+      data: {
+        labels: analyticsData.hour_of_day.labels.map(function (h) { return String(h).padStart(2, "0") + ":00"; }),
+        datasets: [{
+          label: "Occupancy (%)",
+          data: analyticsData.hour_of_day.occupancy.map(percent),
+          backgroundColor: "#6c757d"
+        }]
+      },
+      options: {
+        responsive: true,
+        scales: {
+          y: { beginAtZero: true, suggestedMax: 100 }
+        }
+      }
+    });
+  }
+});
@@ -1,91 +1,138 @@
+// Chart data is fetched from /admin/charts/<name> after the page has painted.
+// Responses carry an ETag, so the browser revalidates and unchanged data comes
+// back as 304 Not Modified.
 document.addEventListener("DOMContentLoaded", function () {
-  if (document.getElementById("bookingChart")) {
-    const ctx = document.getElementById("bookingChart").getContext("2d");
-    new Chart(ctx, {
-      type: "line",
-      data: {
-        labels: bookingsData.dates,
-        datasets: [{
-          label: "Bookings Over Time",
-          data: bookingsData.counts,
-          borderColor: "rgba(54, 162, 235, 1)",
-          backgroundColor: "rgba(54, 162, 235, 0.2)",
-          fill: true,
-          tension: 0.3
-        }]
-      },
-      options: {
-        responsive: true,
-        scales: {
-          x: { title: { display: true, text: "Date" } },
-          y: { title: { display: true, text: "Number of Bookings" }, beginAtZero: true }
+  const filters = document.getElementById("chartFilters");
+  const charts = {};
+
+  const configs = {
+    bookingChart: function (data) {
+      return {
+        type: "line",
+        data: {
+          labels: data.labels,
+          datasets: [{
+            label: "Bookings Over Time",
+            data: data.counts,
+            borderColor: "rgba(54, 162, 235, 1)",
+            backgroundColor: "rgba(54, 162, 235, 0.2)",
+            fill: true,
+            tension: 0.3
+          }]
+        },
+        options: {
+          responsive: true,
+          scales: {
+            x: { title: { display: true, text: "Date" } },
+            y: { title: { display: true, text: "Number of Bookings" }, beginAtZero: true }
+          }
         }
-      }
-    });
-  }
+      };
+    },
 
-  if (document.getElementById("spotStatusChart")) {
-    const spotCtx = document.getElementById("spotStatusChart").getContext("2d");
-    new Chart(spotCtx, {
-      type: "doughnut",
-      data: {
-        labels: spotStatusData.labels,
-        datasets: [{
-          label: "Spot Status",
-          data: spotStatusData.counts,
-          backgroundColor: ["#28a745", "#dc3545"]
-        }]
-      },
-      options: {
-        responsive: true,
-        plugins: {
-          legend: { position: "bottom" }
+    spotStatusChart: function (data) {
+      return {
+        type: "doughnut",
+        data: {
+          labels: data.labels,
+          datasets: [{
+            label: "Spot Status",
+            data: data.counts,
+            backgroundColor: ["#28a745", "#dc3545", "#6c757d"]
+          }]
+        },
+        options: {
+          responsive: true,
+          plugins: {
+            legend: { position: "bottom" }
+          }
         }
-      }
-    });
-  }
+      };
+    },
 
-  if (document.getElementById("lotChart")) {
-    const lotCtx = document.getElementById("lotChart").getContext("2d");
-    new Chart(lotCtx, {
-      type: "bar",
-      data: {
-        labels: lotsData.lots,
-        datasets: [{
-          label: "Bookings Per Lot",
-          data: lotsData.counts,
-          backgroundColor: "#6c757d"
-        }]
-      },
-      options: {
-        responsive: true,
-        indexAxis: "y",
-        scales: {
-          x: { beginAtZero: true }
+    lotChart: function (data) {
+      return {
+        type: "bar",
+        data: {
+          labels: data.labels,
+          datasets: [{
+            label: "Bookings Per Lot",
+            data: data.counts,
+            backgroundColor: "#6c757d"
+          }]
+        },
+        options: {
+          responsive: true,
+          indexAxis: "y",
+          scales: {
+            x: { beginAtZero: true }
+          }
         }
-      }
-    });
+      };
+    },
+
+    topUsersChart: function (data) {
+      return {
+        type: "bar",
+        data: {
+          labels: data.labels,
+          datasets: [{
+            label: "User Booking Count",
+            data: data.counts,
+            backgroundColor: "#007bff"
+          }]
+        },
+        options: {
+          responsive: true,
+          indexAxis: "y",
+          scales: {
+            x: { beginAtZero: true }
+          }
+        }
+      };
+    }
+  };
+
+  function query() {
+    const params = new URLSearchParams();
+    if (filters) {
+      new FormData(filters).forEach(function (value, key) {
+        if (value) params.set(key, value);
+      });
+    }
+    return params.toString();
   }
 
-  if (document.getElementById("topUsersChart")) {
-    const topUsersCtx = document.getElementById("topUsersChart").getContext("2d");
-    new Chart(topUsersCtx, {
-      type: "bar",
-      data: {
-        labels: bookingsData.top_users,
-        datasets: [{
-          label: "User Booking Count",
-          data: bookingsData.user_booking_counts,
-          backgroundColor: "#007bff"
-        }]
-      },
-      options: {
-        responsive: true,
-        indexAxis: "y",
-        scales: {
-          x: { beginAtZero: true }
+  function load(id) {
+    const canvas = document.getElementById(id);
+    if (!canvas) return;
+    const qs = query();
+    fetch(canvas.dataset.url + (qs ? "?" + qs : ""), { credentials: "same-origin" })
+      .then(function (response) {
+        if (!response.ok) throw new Error(response.status);
+        return response.json();
+      })
+      .then(function (data) {
+        const config = configs[id](data);
+        if (charts[id]) {
+          charts[id].data.labels = config.data.labels;
+          charts[id].data.datasets[0].data = config.data.datasets[0].data;
+          charts[id].update();
+        } else {
+          charts[id] = new Chart(canvas.getContext("2d"), config);
         }
-      }
+      })
+      .catch(function (err) {
+        console.warn("Could not load " + id, err);
+      });
+  }
+
+  Object.keys(configs).forEach(load);
+
+  if (filters) {
+    filters.addEventListener("change", function () {
+      // Spot status is a current snapshot; the date range does not apply to it
+      ["bookingChart", "lotChart", "topUsersChart"].forEach(load);
     });
   }
 });
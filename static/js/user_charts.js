@@ -1,33 +1,85 @@
+// Chart data is fetched from /user/charts/<name> after the page has painted.
+// Responses carry an ETag, so the browser revalidates and unchanged data comes
+// back as 304 Not Modified.
 document.addEventListener("DOMContentLoaded", function () {
-  const bookingsCtx = document.getElementById('bookingsChart').getContext('2d');
-  new Chart(bookingsCtx, {
-    type: 'line',
-    data: {
-      labels: bookingDates,
-      datasets: [{
-        label: 'Bookings',
-        data: bookingCounts,
-        backgroundColor: 'rgba(54, 162, 235, 0.2)',
-        borderColor: 'rgb(54, 162, 235)',
-        borderWidth: 2,
-        fill: true,
-        tension: 0.3
-      }]
+  const filters = document.getElementById("chartFilters");
+  const charts = {};
+
+  const configs = {
+    bookingsChart: function (data) {
+      return {
+        type: 'line',
+        data: {
+          labels: data.labels,
+          datasets: [{
+            label: 'Bookings',
+            data: data.counts,
+            backgroundColor: 'rgba(54, 162, 235, 0.2)',
+            borderColor: 'rgb(54, 162, 235)',
+            borderWidth: 2,
+            fill: true,
+            tension: 0.3
+          }]
+        }
+      };
+    },
+
+    costChart: function (data) {
+      return {
+        type: 'bar',
+        data: {
+          labels: data.labels,
+          datasets: [{
+            label: '₹ Spent',
+            data: data.costs,
+            backgroundColor: 'rgba(255, 99, 132, 0.5)',
+            borderColor: 'rgb(255, 99, 132)',
+            borderWidth: 1
+          }]
+        }
+      };
     }
-  });
+  };
 
-  const costCtx = document.getElementById('costChart').getContext('2d');
-  new Chart(costCtx, {
-    type: 'bar',
-    data: {
-      labels: costDates,
-      datasets: [{
-        label: '₹ Spent',
-        data: dailyCosts,
-        backgroundColor: 'rgba(255, 99, 132, 0.5)',
-        borderColor: 'rgb(255, 99, 132)',
-        borderWidth: 1
-      }]
+  function query() {
+    const params = new URLSearchParams();
+    if (filters) {
+      new FormData(filters).forEach(function (value, key) {
+        if (value) params.set(key, value);
+      });
     }
-  });
+    return params.toString();
+  }
+
+  function load(id) {
+    const canvas = document.getElementById(id);
+    if (!canvas) return;
+    const qs = query();
+    fetch(canvas.dataset.url + (qs ? '?' + qs : ''), { credentials: 'same-origin' })
+      .then(function (response) {
+        if (!response.ok) throw new Error(response.status);
+        return response.json();
+      })
+      .then(function (data) {
+        const config = configs[id](data);
+        if (charts[id]) {
+          charts[id].data.labels = config.data.labels;
+          charts[id].data.datasets[0].data = config.data.datasets[0].data;
+          charts[id].update();
+        } else {
+          charts[id] = new Chart(canvas.getContext('2d'), config);
+        }
+      })
+      .catch(function (err) {
+        console.warn('Could not load ' + id, err);
+      });
+  }
+
+  Object.keys(configs).forEach(load);
+
+  if (filters) {
+    filters.addEventListener('change', function () {
+      Object.keys(configs).forEach(load);
+    });
+  }
 });
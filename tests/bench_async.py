@@ -0,0 +1,124 @@
+"""The async read API against the Flask app at 100 to 1,000 open connections.
+
+    python tests/bench_async.py [--connections 100,250,500,1000] [--requests 5000] [--path /api/spots?limit=100]
+
+Seeds a lot, then serves the same database twice: async_api.py under
+uvicorn, and the Flask app on werkzeug's threaded server (HTTP/1.1
+keep-alive, a thread per connection). For each connection count, that many
+pollers, each on its own kept-alive connection, poll --path with an admin
+session cookie, and the script
+prints req/s, p50/p99 and failed requests for each server. Both servers run
+one process; the load generator shares the machine with them.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench_booking import PASSWORD, bench_app, make_admin, make_lot, percentiles, serve_errors
+
+SERVERS = {'async (uvicorn)': 8701, 'flask (threaded)': 8702}
+
+
+def serve(name):
+    """Server process: serve this database until killed."""
+    app = bench_app()
+    port = SERVERS[name]
+    if name.startswith('async'):
+        import uvicorn
+        import async_api
+
+        uvicorn.run(async_api.api, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+    else:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        serve_errors(app)
+        WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+        server = make_server('127.0.0.1', port, app, threaded=True)
+        server.socket.listen(4096)
+        server.serve_forever()
+
+
+def start_server(name):
+    process = subprocess.Popen([sys.executable, *sys.argv], env={**os.environ, 'BENCH_ROLE': name},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{SERVERS[name]}'
+    for _ in range(200):
+        try:
+            httpx.get(url + '/api/lots')
+            return process, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit(f"{name} did not start")
+
+
+async def load(url, path, cookies, connections, requests):
+    """`connections` pollers, each holding one pooled connection, share `requests` GETs.
+
+    Returns (latencies, failures, seconds).
+    """
+    latencies, failures = [], 0
+    per_poller = max(requests // connections, 1)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(base_url=url, cookies=cookies, limits=limits, timeout=120) as http:
+        async def poller():
+            nonlocal failures
+            for _ in range(per_poller):
+                started = time.perf_counter()
+                try:
+                    ok = (await http.get(path)).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(poller() for _ in range(connections)))
+        return latencies, failures, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--connections', type=lambda value: [int(count) for count in value.split(',')],
+                        default=[100, 250, 500, 1000], help='Comma-separated connection counts.')
+    parser.add_argument('--requests', type=int, default=5000, help='Requests per connection count and server.')
+    parser.add_argument('--path', default='/api/spots?limit=100', help='Endpoint polled.')
+    parser.add_argument('--spots', type=int, default=2000, help='Spots in the seeded lot.')
+    args = parser.parse_args()
+
+    role = os.environ.get('BENCH_ROLE')
+    if role:
+        return serve(role)
+
+    app = bench_app()
+    make_lot(app, args.spots)
+    make_admin(app)
+    login = app.test_client()
+    assert login.post('/login', data={'login_input': 'admin', 'password': PASSWORD}).status_code == 302
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    cookies = {cookie_name: login.get_cookie(cookie_name).value}
+
+    for name in SERVERS:
+        process, url = start_server(name)
+        try:
+            asyncio.run(load(url, args.path, cookies, 10, 100))  # warm up
+            for connections in args.connections:
+                latencies, failures, elapsed = asyncio.run(load(url, args.path, cookies, connections, args.requests))
+                p50, p99 = percentiles(latencies) if latencies else ('-', '-')
+                print(f"{name:<17} {connections:>5} connections: {len(latencies) / elapsed:,.0f} req/s, "
+                      f"p50 {p50} ms, p99 {p99} ms, {failures} failed")
+        finally:
+            process.kill()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""Booking benchmarks.
+
+    python tests/bench_booking.py concurrent [--bookings 200] [--spots 50] [--threads 16]
+    python tests/bench_booking.py lot-sizes [--sizes 1000,10000,100000,1000000] [--bookings 200]
+    python tests/bench_booking.py intervals [--reservations 1000000] [--spots 1000] [--lookups 10000]
+
+concurrent fires one POST /book per user, in parallel, at a single lot through
+the Flask test client and prints throughput, p50/p99 latency and the number
+of double-booked spots (which must be 0). tests/test_concurrent_booking.py
+runs the same harness as a test.
+
+lot-sizes books one spot after another in lots of growing size. The allocator
+hands spots out of an in-memory free set, so the latency should stay flat.
+
+intervals fills the interval index with open reservations and times its
+is_free/free_spots lookups against the has_overlap query on the table.
+
+Every run uses a throwaway SQLite database. The other tests/bench_*.py
+scripts share the helpers below.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'secret123'
+FAST_HASH = 'pbkdf2:sha256:1000'
+
+
+def bench_app(fast_hashes=True, **env):
+    """Import the app on a throwaway SQLite database, after setting `env` ({dir} is the database directory).
+
+    app.py reads its configuration at import time, so this works once per
+    process; run_variants compares configurations in fresh interpreters.
+    Child processes inherit BENCH_DATABASE_DIR and open the same database.
+    """
+    directory = os.environ.get('BENCH_DATABASE_DIR') or tempfile.mkdtemp(prefix='parking-bench-')
+    os.environ['BENCH_DATABASE_DIR'] = directory
+    sys.path.insert(0, ROOT)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'bench.db')
+    if fast_hashes:
+        os.environ.setdefault('PASSWORD_HASH_METHOD', FAST_HASH)
+    for name, value in env.items():
+        os.environ[name] = value.format(dir=directory)
+    from app import app
+    from models import db
+
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def serve_errors(app):
+    """Answer unhandled errors (e.g. "database is locked") with a 500, as a server would, instead of raising them."""
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    app.logger.disabled = True
+
+
+def run_variants(names):
+    """Re-run this script once per variant name in a fresh interpreter; the child reads BENCH_VARIANT."""
+    for name in names:
+        subprocess.run([sys.executable, *sys.argv], env={**os.environ, 'BENCH_VARIANT': name}, check=True)
+
+
+def percentiles(seconds, unit=1000):
+    """(p50, p99) of a list of durations, in ms by default (unit=1e6 for µs)."""
+    seconds = np.asarray(seconds)
+    return round(float(np.percentile(seconds, 50)) * unit, 1), round(float(np.percentile(seconds, 99)) * unit, 1)
+
+
+def make_lot(app, spots, location='Load'):
+    """A lot with `spots` free spots. Returns its id."""
+    from models import db, ParkingLot
+    from provisioning import provision_spots
+
+    with app.app_context():
+        lot = ParkingLot(location_name=location, address='Somewhere', pin_code='600001', price_per_hour=10, max_spots=spots)
+        db.session.add(lot)
+        db.session.flush()
+        provision_spots(lot.id, spots, start_number=1)
+        db.session.commit()
+        return lot.id
+
+
+def make_users(app, count, tag='load'):
+    """`count` users with the bench password. Returns their (id, email) pairs."""
+    from sqlalchemy import insert, select
+    from werkzeug.security import generate_password_hash
+    from models import db, User
+    from auth import add_identifiers
+
+    with app.app_context():
+        password = generate_password_hash(PASSWORD, app.config.get('PASSWORD_HASH_METHOD') or FAST_HASH)
+        db.session.execute(insert(User), [{'full_name': f'{tag} user {i}', 'email': f'{tag}{i}@example.com',
+                                           'password': password} for i in range(count)])
+        rows = db.session.execute(select(User.id, User.email, User.full_name)
+                                  .where(User.email.like(f'{tag}%@example.com')).order_by(User.id)).all()
+        for user_id, email, full_name in rows:
+            add_identifiers('user', user_id, email, full_name)
+        db.session.commit()
+    return [(user_id, email) for user_id, email, _ in rows]
+
+
+def make_admin(app):
+    """The admin account, with the bench password."""
+    from werkzeug.security import generate_password_hash
+    from models import db, Admin
+    from auth import add_identifiers
+
+    with app.app_context():
+        admin = Admin(username='admin', password=generate_password_hash(PASSWORD, app.config['PASSWORD_HASH_METHOD']))
+        db.session.add(admin)
+        db.session.flush()
+        add_identifiers('admin', admin.id, 'admin')
+        db.session.commit()
+
+
+def make_clients(app, count, tag='load'):
+    """`count` new users, each logged in on its own test client."""
+    clients = []
+    for _, email in make_users(app, count, tag):
+        client = app.test_client()
+        response = client.post('/login', data={'login_input': email, 'password': PASSWORD})
+        assert response.status_code == 302, f'login failed for {email}'
+        clients.append(client)
+    return clients
+
+
+def book(client, lot_id, vehicle_number):
+    """Book the rest of today. Returns (booked, seconds)."""
+    started = time.perf_counter()
+    response = client.post('/book', data={'lot_id': str(lot_id), 'vehicle_number': vehicle_number,
+                                          'start_time': '12:00 AM', 'end_time': '11:59 PM'})
+    # Success redirects to the dashboard; every refusal goes back to the booking form
+    return response.headers.get('Location', '').endswith('/user/dashboard'), time.perf_counter() - started
+
+
+# --- concurrent ---
+
+def prepare(app, spots, users):
+    """A lot with `spots` free spots and `users` logged-in test clients. Returns (lot_id, clients)."""
+    return make_lot(app, spots), make_clients(app, users)
+
+
+def fire(clients, lot_id, threads):
+    """One booking per client for the rest of today, `threads` at a time. Returns (booked, latencies, elapsed)."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda args: book(args[1], lot_id, f'TN09LD{args[0]:04d}'), enumerate(clients)))
+    elapsed = time.perf_counter() - started
+    return sum(ok for ok, _ in results), [latency for _, latency in results], elapsed
+
+
+def check(app, lot_id):
+    """Open reservations, spots sharing one, occupied spots and the lot's occupied counter."""
+    from sqlalchemy import func, select
+    from models import db, ParkingLot, ParkingSpot, Reservation
+    from expiry import OPEN_STATUSES
+
+    with app.app_context():
+        per_spot = db.session.execute(
+            select(Reservation.spot_id, func.count())
+            .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+            .where(ParkingSpot.lot_id == lot_id, Reservation.status.in_(OPEN_STATUSES))
+            .group_by(Reservation.spot_id)).all()
+        occupied = db.session.scalar(select(func.count()).select_from(ParkingSpot)
+                                     .where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'O'))
+        counter = db.session.get(ParkingLot, lot_id).occupied_count
+    return {
+        'open': sum(count for _, count in per_spot),
+        'double_booked': sum(1 for _, count in per_spot if count > 1),
+        'occupied': occupied,
+        'counter': counter,
+    }
+
+
+def run(app, bookings, spots, threads):
+    lot_id, clients = prepare(app, spots, bookings)
+    booked, latencies, elapsed = fire(clients, lot_id, threads)
+    p50, p99 = percentiles(latencies)
+    return {
+        'bookings': bookings,
+        'spots': spots,
+        'threads': threads,
+        'booked': booked,
+        'throughput': round(bookings / elapsed, 1),
+        'p50_ms': p50,
+        'p99_ms': p99,
+        **check(app, lot_id),
+    }
+
+
+def concurrent_command(args):
+    app = bench_app()
+    result = run(app, args.bookings, args.spots, args.threads)
+    print(f"{result['bookings']} bookings at {result['spots']} spots, {result['threads']} threads: "
+          f"{result['booked']} booked, {result['throughput']} req/s, "
+          f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"{result['double_booked']} double-booked spot(s)")
+    if result['double_booked'] or not (result['open'] == result['booked'] == result['occupied'] == result['counter']):
+        print(f"Inconsistent: {result}")
+        raise SystemExit(1)
+
+
+# --- lot-sizes ---
+
+def lot_sizes_command(args):
+    app = bench_app()
+    from allocator import allocator
+
+    for size in args.sizes:
+        started = time.perf_counter()
+        lot_id = make_lot(app, size, location=f'Lot {size}')
+        provisioned = time.perf_counter() - started
+        clients = make_clients(app, args.bookings + 1, tag=f'size{size}-')
+        allocator.invalidate()
+        # The first booking after a reload pays for reading every free spot; report it apart
+        _, first = book(clients[0], lot_id, f'TN{size}X')
+        results = [book(client, lot_id, f'TN{size}N{n}') for n, client in enumerate(clients[1:])]
+        p50, p99 = percentiles([latency for _, latency in results])
+        print(f"{size:>8} spots: provisioned in {provisioned:.1f} s, first booking {first * 1000:.1f} ms, "
+              f"then {sum(ok for ok, _ in results)} bookings p50 {p50} ms, p99 {p99} ms")
+
+
+# --- intervals ---
+
+def intervals_command(args):
+    app = bench_app()
+    from sqlalchemy import insert
+    from models import db, ParkingSpot, Reservation
+    from expiry import now_local
+    from intervals import IntervalIndex, has_overlap
+
+    lot_id = make_lot(app, args.spots)
+    user_id = make_users(app, 1)[0][0]
+    per_spot = args.reservations // args.spots
+    with app.app_context():
+        spot_ids = db.session.scalars(db.select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id)).all()
+        # Back-to-back one-hour bookings on every spot, starting in the next hour
+        base = now_local().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        rows = ({'user_id': user_id, 'spot_id': spot_id, 'vehicle_number': 'TN01BN0001', 'cost': 10.0,
+                 'status': 'Booked', 'parking_time': base + timedelta(hours=h),
+                 'leaving_time': base + timedelta(hours=h + 1)}
+                for h in range(per_spot) for spot_id in spot_ids)
+        started = time.perf_counter()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == 50000:
+                db.session.execute(insert(Reservation), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(Reservation), batch)
+        db.session.commit()
+        print(f"Inserted {per_spot * len(spot_ids)} reservations in {time.perf_counter() - started:.1f} s")
+
+        index = IntervalIndex(refresh_interval=float('inf'))
+        started = time.perf_counter()
+        index.load()
+        print(f"Loaded the index in {time.perf_counter() - started:.1f} s")
+
+        rng = random.Random(1)
+
+        def window():
+            start = base + timedelta(minutes=rng.randrange(per_spot * 60))
+            return start, start + timedelta(minutes=rng.choice((30, 60, 120)))
+
+        def timed(call, count):
+            latencies = []
+            for _ in range(count):
+                spot_id, (start, end) = rng.choice(spot_ids), window()
+                started = time.perf_counter()
+                call(spot_id, start, end)
+                latencies.append(time.perf_counter() - started)
+            return percentiles(latencies, unit=1e6)
+
+        for name, call, count in [
+            ('index.is_free', index.is_free, args.lookups),
+            ('has_overlap (table)', has_overlap, min(args.lookups, 2000)),
+            (f'index.free_spots over {len(spot_ids)} spots',
+             lambda spot_id, start, end: index.free_spots(spot_ids, start, end), min(args.lookups, 1000)),
+        ]:
+            p50, p99 = timed(call, count)
+            print(f"{name}: p50 {p50} µs, p99 {p99} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    concurrent = commands.add_parser('concurrent', help='Parallel bookings at one lot.')
+    concurrent.add_argument('--bookings', type=int, default=200, help='Parallel booking requests (one user each).')
+    concurrent.add_argument('--spots', type=int, default=50, help='Spots in the lot.')
+    concurrent.add_argument('--threads', type=int, default=16, help='Requests in flight at once.')
+    concurrent.set_defaults(handler=concurrent_command)
+
+    sizes = commands.add_parser('lot-sizes', help='Booking latency as the lot grows.')
+    sizes.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                       default=[1000, 10000, 100000, 1000000], help='Comma-separated lot sizes.')
+    sizes.add_argument('--bookings', type=int, default=200, help='Bookings timed per lot.')
+    sizes.set_defaults(handler=lot_sizes_command)
+
+    intervals = commands.add_parser('intervals', help='Interval index lookups against the table.')
+    intervals.add_argument('--reservations', type=int, default=1000000, help='Open reservations to index.')
+    intervals.add_argument('--spots', type=int, default=1000, help='Spots they are spread over.')
+    intervals.add_argument('--lookups', type=int, default=10000, help='Lookups timed.')
+    intervals.set_defaults(handler=intervals_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Concurrent readers and writers under DB_PROFILE=default and DB_PROFILE=wal.
+
+    python tests/bench_db_profile.py [--history 50000] [--readers 4] [--writers 8] [--bookings 300]
+
+Seeds a reservation history, then books spots from --writers threads while
+--readers worker processes page through the admin dashboards and API
+listings on the same SQLite file. Runs once with stock driver settings
+(rollback journal) and once with the wal profile, each in a fresh
+interpreter and database, and prints booking throughput, p50/p99, failed
+bookings (a "database is locked" answers 500) and the dashboard request
+rate for each.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_booking import (bench_app, book, make_admin, make_clients, make_lot, percentiles, run_variants,
+                           serve_errors)
+from bench_replica import read_dashboards, seed_history, start_readers, stop_readers
+
+VARIANTS = {
+    'default': {'DB_PROFILE': 'default'},
+    'wal': {'DB_PROFILE': 'wal'},
+}
+
+
+def run_variant(name, args):
+    app = bench_app(**VARIANTS[name])
+
+    lot_id = make_lot(app, args.bookings + 50)
+    seed_history(app, make_lot(app, 500, location='History'), args.history)
+    make_admin(app)
+    bookers = make_clients(app, args.bookings)
+    serve_errors(app)
+
+    readers = start_readers(args.readers)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.writers) as pool:
+        results = list(pool.map(lambda n: book(bookers[n], lot_id, f'TN07DB{n:04d}'), range(len(bookers))))
+    elapsed = time.perf_counter() - started
+    dashboard_requests, dashboard_errors = stop_readers(readers)
+
+    booked = sum(ok for ok, _ in results)
+    p50, p99 = percentiles([latency for _, latency in results])
+    print(f"{name:<8} {booked / elapsed:.1f} bookings/s, p50 {p50} ms, p99 {p99} ms, "
+          f"{len(results) - booked} failed; {dashboard_requests / elapsed:.0f} dashboard req/s, "
+          f"{dashboard_errors} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--history', type=int, default=50000, help='Completed reservations to seed.')
+    parser.add_argument('--readers', type=int, default=4, help='Worker processes reading dashboards.')
+    parser.add_argument('--writers', type=int, default=8, help='Booking threads.')
+    parser.add_argument('--bookings', type=int, default=300, help='Bookings timed.')
+    args = parser.parse_args()
+
+    variant = os.environ.get('BENCH_VARIANT')
+    if variant is None:
+        run_variants(VARIANTS)
+    elif os.environ.get('BENCH_ROLE') == 'reader':
+        read_dashboards(VARIANTS[variant])
+    else:
+        run_variant(variant, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Request rate with the identity cache on and off.
+
+    python tests/bench_identity.py [--users 50] [--requests 5000] [--threads 8]
+
+Logged-in users poll a cheap authenticated endpoint (a cached user chart,
+answered 304 through If-None-Match), so loading the session's identity is a
+large share of each request. Runs once with the identity cache and once with
+it disabled (maxsize 0), and prints req/s, p50/p99 and the SQL statements run
+per request for each.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from bench_booking import bench_app, make_clients, percentiles
+
+CHART = '/user/charts/bookings'
+
+
+def poll(client, etag, count):
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        assert client.get(CHART, headers={'If-None-Match': etag}).status_code == 304
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def measure(clients, etags, requests, threads):
+    per_client = requests // len(clients)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = pool.map(poll, clients, etags, [per_client] * len(clients))
+        latencies = [latency for result in results for latency in result]
+    return len(latencies), time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=50, help='Logged-in users polling.')
+    parser.add_argument('--requests', type=int, default=5000, help='Requests timed per variant.')
+    parser.add_argument('--threads', type=int, default=8, help='Requests in flight at once.')
+    args = parser.parse_args()
+
+    app = bench_app()
+    import app as app_module
+    from models import db
+
+    clients = make_clients(app, args.users)
+    etags = [client.get(CHART).headers['ETag'] for client in clients]
+    with app.app_context():
+        engine = db.engine
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *_: statements.append(None))
+
+    cache = app_module.identity_cache
+    for name, maxsize in (('identity cache on', cache.maxsize), ('identity cache off', 0)):
+        cache.clear()
+        cache.maxsize = maxsize
+        measure(clients, etags, len(clients), args.threads)  # warm up
+        statements.clear()
+        count, elapsed, latencies = measure(clients, etags, args.requests, args.threads)
+        p50, p99 = percentiles(latencies)
+        print(f"{name:<18} {count / elapsed:,.0f} req/s, p50 {p50} ms, p99 {p99} ms, "
+              f"{len(statements) / count:.2f} SQL statements/request")
+
+
+if __name__ == '__main__':
+    main()
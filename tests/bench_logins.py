@@ -0,0 +1,50 @@
+"""Login throughput at the configured password hashing pool size.
+
+    python tests/bench_logins.py [--logins 200] [--threads 16]
+
+Logs users in through POST /login from --threads request threads at once,
+with the real PASSWORD_HASH_METHOD (scrypt by default) and the
+PASSWORD_HASH_WORKERS pool, and prints logins/sec in total and per core,
+p50/p99 latency and how many logins were turned away with 503.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_booking import PASSWORD, bench_app, make_users, percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--logins', type=int, default=200, help='Logins timed (one user each).')
+    parser.add_argument('--threads', type=int, default=16, help='Requests in flight at once.')
+    args = parser.parse_args()
+
+    app = bench_app(fast_hashes=False)
+    users = make_users(app, args.logins)
+
+    def login(email):
+        started = time.perf_counter()
+        status = app.test_client().post('/login', data={'login_input': email, 'password': PASSWORD}).status_code
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        results = list(pool.map(login, [email for _, email in users]))
+    elapsed = time.perf_counter() - started
+
+    logged_in = [latency for status, latency in results if status == 302]
+    busy = sum(status == 503 for status, _ in results)
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    cores = min(workers, os.cpu_count() or 1)
+    p50, p99 = percentiles(logged_in)
+    print(f"{app.config['PASSWORD_HASH_METHOD']}, {workers} hash worker(s) on {os.cpu_count()} core(s), "
+          f"{args.threads} threads: {len(logged_in) / elapsed:.1f} logins/s ({len(logged_in) / elapsed / cores:.1f} per core), "
+          f"p50 {p50} ms, p99 {p99} ms, {busy} turned away")
+    if len(logged_in) + busy != len(results):
+        raise SystemExit(f"Unexpected responses: {sorted({status for status, _ in results})}")
+
+
+if __name__ == '__main__':
+    main()
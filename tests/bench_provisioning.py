@@ -0,0 +1,56 @@
+"""Lot provisioning through the admin routes.
+
+    python tests/bench_provisioning.py [--sizes 10000,100000,1000000] [--resize 10]
+
+For each size, creates a lot with POST /admin/add_lot, grows it by --resize
+percent and shrinks it back with POST /admin/edit_lot, and prints how long
+each request took and the spots per second it inserted or retired. Spots are
+written with chunked set-based statements (provisioning.py), so the time
+should grow linearly with the lot.
+"""
+import argparse
+import time
+
+from bench_booking import PASSWORD, bench_app, make_admin
+
+
+def timed_post(client, path, spots):
+    started = time.perf_counter()
+    response = client.post(path, data={'location': 'Bench', 'address': 'Somewhere', 'pincode': '600001',
+                                       'price': '10', 'max_spots': str(spots)})
+    assert response.status_code == 302 and 'edit_lot' not in response.headers['Location'], response.headers
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[10000, 100000, 1000000], help='Comma-separated lot sizes.')
+    parser.add_argument('--resize', type=int, default=10, help='Percent to grow and then shrink each lot by.')
+    args = parser.parse_args()
+
+    app = bench_app()
+    from sqlalchemy import func, select
+    from models import db, ParkingLot, ParkingSpot
+
+    make_admin(app)
+    client = app.test_client()
+    assert client.post('/login', data={'login_input': 'admin', 'password': PASSWORD}).status_code == 302
+
+    for size in args.sizes:
+        step = size * args.resize // 100
+        created = timed_post(client, '/admin/add_lot', size)
+        with app.app_context():
+            lot_id = db.session.scalar(select(func.max(ParkingLot.id)))
+        grown = timed_post(client, f'/admin/edit_lot/{lot_id}', size + step)
+        shrunk = timed_post(client, f'/admin/edit_lot/{lot_id}', size)
+        with app.app_context():
+            assert db.session.scalar(select(func.count()).where(ParkingSpot.lot_id == lot_id)) == size
+
+        print(f"{size:>8} spots: created in {created:.2f} s ({size / created:,.0f} spots/s), "
+              f"+{step} in {grown:.2f} s ({step / grown:,.0f} spots/s), "
+              f"-{step} in {shrunk:.2f} s ({step / shrunk:,.0f} spots/s)")
+
+
+if __name__ == '__main__':
+    main()
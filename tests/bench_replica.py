@@ -0,0 +1,127 @@
+"""Booking latency under dashboard traffic, with and without the read replica.
+
+    python tests/bench_replica.py [--history 100000] [--readers 4] [--bookings 300]
+
+Seeds a reservation history, then books spots one after another while
+`--readers` worker processes page through the replica-routed admin and API
+listings (/admin/bookings, /api/reservations, /api/lots) on the same database.
+Runs three variants, each in a fresh interpreter: bookings alone, bookings
+plus dashboard traffic on the primary, and the same with REPLICA_DATABASE_URL
+set. Prints booking p50/p99 and the dashboard request rate for each.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bench_booking import (PASSWORD, bench_app, book, make_admin, make_clients, make_lot, make_users, percentiles,
+                           run_variants, serve_errors)
+
+VARIANTS = {
+    'bookings only': {},
+    'dashboards on the primary': {},
+    'dashboards on the replica': {'REPLICA_DATABASE_URL': 'sqlite:///{dir}/replica.db'},
+}
+DASHBOARD_PATHS = ['/admin/bookings', '/admin/bookings?page=3', '/api/reservations?limit=200', '/api/lots']
+
+
+def seed_history(app, lot_id, reservations):
+    from sqlalchemy import insert, select
+    from models import db, ParkingSpot, Reservation
+
+    user_ids = [user_id for user_id, _ in make_users(app, 200, tag='history')]
+    with app.app_context():
+        spot_ids = db.session.scalars(select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id)).all()
+        start = datetime(2026, 1, 1, 8)
+        rows = [{'user_id': user_ids[n % len(user_ids)], 'spot_id': spot_ids[n % len(spot_ids)],
+                 'vehicle_number': f'TN{n:08d}', 'parking_time': start + timedelta(hours=n // len(spot_ids)),
+                 'leaving_time': start + timedelta(hours=n // len(spot_ids), minutes=50),
+                 'cost': 10.0, 'status': 'Completed'} for n in range(reservations)]
+        for offset in range(0, len(rows), 50000):
+            db.session.execute(insert(Reservation), rows[offset:offset + 50000])
+        db.session.commit()
+
+
+def read_dashboards(env):
+    """Reader process: page through the dashboards until stdin closes, then print the request and error counts."""
+    app = bench_app(**env)
+    serve_errors(app)
+    client = app.test_client()
+    assert client.post('/login', data={'login_input': 'admin', 'password': PASSWORD}).status_code == 302
+    stop = threading.Event()
+    threading.Thread(target=lambda: (sys.stdin.read(), stop.set()), daemon=True).start()
+    print('ready', flush=True)
+    count = errors = 0
+    while not stop.is_set():
+        errors += client.get(DASHBOARD_PATHS[count % len(DASHBOARD_PATHS)]).status_code != 200
+        count += 1
+    print(count, errors, flush=True)
+
+
+def start_readers(count):
+    """Start `count` reader processes (this script again, with BENCH_ROLE=reader) and wait until they are reading."""
+    readers = [subprocess.Popen([sys.executable, *sys.argv], env={**os.environ, 'BENCH_ROLE': 'reader'},
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+               for _ in range(count)]
+    for reader in readers:
+        assert reader.stdout.readline().strip() == 'ready'
+    return readers
+
+
+def stop_readers(readers):
+    """Stop the readers. Returns the dashboard requests they made and how many of them failed."""
+    requests = errors = 0
+    for reader in readers:
+        reader.stdin.close()
+        count, failed = reader.stdout.read().split()[-2:]
+        requests, errors = requests + int(count), errors + int(failed)
+        reader.wait()
+    return requests, errors
+
+
+def run_variant(name, args):
+    app = bench_app(**VARIANTS[name])
+    import app as app_module
+
+    lot_id = make_lot(app, args.bookings + 50)
+    seed_history(app, make_lot(app, 500, location='History'), args.history)
+    make_admin(app)
+    bookers = make_clients(app, args.bookings)
+    if app_module.replica_sync is not None:
+        app_module.replica_sync.sync()
+        app_module.replica_sync.start()
+
+    readers = start_readers(0 if name == 'bookings only' else args.readers)
+    started = time.perf_counter()
+    results = [book(client, lot_id, f'TN07RP{n:04d}') for n, client in enumerate(bookers)]
+    elapsed = time.perf_counter() - started
+    dashboard_requests, dashboard_errors = stop_readers(readers)
+
+    p50, p99 = percentiles([latency for _, latency in results])
+    dashboards = f", {dashboard_requests / elapsed:.0f} dashboard req/s" if readers else ''
+    if dashboard_errors:
+        dashboards += f" ({dashboard_errors} failed)"
+    print(f"{name:<27} {sum(ok for ok, _ in results)} bookings: p50 {p50} ms, p99 {p99} ms{dashboards}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--history', type=int, default=100000, help='Completed reservations to seed.')
+    parser.add_argument('--readers', type=int, default=4, help='Worker processes reading dashboards.')
+    parser.add_argument('--bookings', type=int, default=300, help='Bookings timed.')
+    args = parser.parse_args()
+
+    variant = os.environ.get('BENCH_VARIANT')
+    if variant is None:
+        run_variants(VARIANTS)
+    elif os.environ.get('BENCH_ROLE') == 'reader':
+        read_dashboards(VARIANTS[variant])
+    else:
+        run_variant(variant, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+# The app modules live at the repository root, and app.py reads DATABASE_URL
+# at import time, so both are set up before any test imports them.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='parking-tests-'), 'test.db')
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'  # cheap hashes keep logins fast
+for name in ('REPLICA_DATABASE_URL', 'CHART_CACHE_DIR', 'SQL_PROFILING'):
+    os.environ.pop(name, None)
+
+PASSWORD = 'secret123'
+
+
+@pytest.fixture
+def app():
+    """The Flask app on an empty database, with every in-process cache reset."""
+    import app as app_module
+    from models import db
+    from allocator import allocator
+    from intervals import interval_index
+    from chart_cache import chart_cache
+
+    flask_app = app_module.app
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+    allocator.invalidate()
+    interval_index.invalidate()
+    chart_cache.clear()
+    app_module.identity_cache.clear()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def make_admin(app):
+    from werkzeug.security import generate_password_hash
+    from models import db, Admin
+    from auth import add_identifiers
+
+    def make_admin(username='admin'):
+        with app.app_context():
+            admin = Admin(username=username, password=generate_password_hash(PASSWORD, os.environ['PASSWORD_HASH_METHOD']))
+            db.session.add(admin)
+            db.session.flush()
+            add_identifiers('admin', admin.id, username)
+            db.session.commit()
+            return admin.id
+    return make_admin
+
+
+@pytest.fixture
+def make_user(app):
+    from werkzeug.security import generate_password_hash
+    from models import db, User
+    from auth import add_identifiers
+
+    def make_user(email='user@example.com', full_name='Test User'):
+        with app.app_context():
+            user = User(full_name=full_name, email=email,
+                        password=generate_password_hash(PASSWORD, os.environ['PASSWORD_HASH_METHOD']))
+            db.session.add(user)
+            db.session.flush()
+            add_identifiers('user', user.id, email, full_name)
+            db.session.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def login(app):
+    def login(identifier):
+        client = app.test_client()
+        response = client.post('/login', data={'login_input': identifier, 'password': PASSWORD})
+        assert response.status_code == 302, response.data[:300]
+        return client
+    return login
+
+
+@pytest.fixture
+def admin_client(make_admin, login):
+    make_admin()
+    return login('admin')
+
+
+@pytest.fixture
+def user_client(make_user, login):
+    make_user()
+    return login('user@example.com')
+
+
+@pytest.fixture
+def make_lot(app, admin_client):
+    """Create a lot through the admin route. Returns its id."""
+    from models import ParkingLot
+
+    def make_lot(spots, location='Lot', price=10):
+        response = admin_client.post('/admin/add_lot', data={
+            'location': location, 'address': 'Somewhere', 'pincode': '600001',
+            'price': str(price), 'max_spots': str(spots)})
+        assert response.status_code == 302
+        with app.app_context():
+            return ParkingLot.query.filter_by(location_name=location).order_by(ParkingLot.id.desc()).first().id
+    return make_lot
+
+
+def book(client, lot_id, vehicle_number, **form):
+    """Book for the whole of today (which has already started) unless times are given."""
+    data = {'lot_id': str(lot_id), 'vehicle_number': vehicle_number, 'start_time': '12:00 AM', 'end_time': '11:59 PM'}
+    data.update(form)
+    return client.post('/book', data=data)
+
+
+def resize_lot(client, lot_id, spots, location='Lot', price=10):
+    """Set a lot's spot count through the admin edit form."""
+    return client.post(f'/admin/edit_lot/{lot_id}', data={
+        'location': location, 'address': 'Somewhere', 'pincode': '600001',
+        'price': str(price), 'max_spots': str(spots)})
+
+
+def seed_reservations(app, lot_id, user_id, count):
+    """Insert `count` completed hour-apart reservations for the user, spread over the lot's spots."""
+    from sqlalchemy import insert, select
+    from models import db, ParkingSpot, Reservation
+
+    with app.app_context():
+        spot_ids = db.session.scalars(select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id)).all()
+        start = datetime(2026, 1, 1, 8)
+        db.session.execute(insert(Reservation), [
+            {'user_id': user_id, 'spot_id': spot_ids[n % len(spot_ids)], 'vehicle_number': f'TN{n:08d}',
+             'parking_time': start + timedelta(hours=n), 'leaving_time': start + timedelta(hours=n, minutes=30),
+             'cost': 10.0, 'status': 'Completed'} for n in range(count)])
+        db.session.commit()
+
+
+@pytest.fixture
+def utc_host():
+    """Run the process clock on UTC, far from the IST booking times."""
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = 'UTC'
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+
+@contextmanager
+def recorded_sql(app):
+    """Collect (statement, parameters) for every SQL statement run on the primary engine."""
+    from models import db
+
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
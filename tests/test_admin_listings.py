@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from conftest import recorded_sql
+from models import db, ParkingLot, Reservation, User
+from provisioning import provision_spots
+import occupancy
+
+
+def seed(app, tag, users, reservations_per_user, spots):
+    with app.app_context():
+        lot = ParkingLot(location_name=f'Lot {tag}', address='Somewhere', pin_code='600001', price_per_hour=10, max_spots=spots)
+        db.session.add(lot)
+        db.session.flush()
+        spot_ids = provision_spots(lot.id, spots, start_number=1)
+        occupancy.recount([lot.id])
+        db.session.execute(insert(User), [{'full_name': f'{tag} user {i}', 'email': f'{tag}{i}@example.com', 'password': 'x'}
+                                          for i in range(users)])
+        user_ids = db.session.scalars(select(User.id).where(User.email.like(f'{tag}%'))).all()
+        start = datetime(2026, 1, 1, 9)
+        db.session.execute(insert(Reservation), [
+            {'user_id': user_id, 'spot_id': spot_ids[(n + i) % spots], 'vehicle_number': f'TN{n:04d}{i:03d}',
+             'parking_time': start + timedelta(days=i), 'leaving_time': start + timedelta(days=i, hours=2),
+             'cost': 20.0, 'status': 'Completed'}
+            for n, user_id in enumerate(user_ids) for i in range(reservations_per_user)])
+        db.session.commit()
+
+
+def statements_for(app, client, path):
+    client.get(path)  # warm the identity and allocator caches
+    with recorded_sql(app) as statements:
+        assert client.get(path).status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('path', ['/admin/bookings', '/admin/users', '/admin/spots'])
+def test_admin_listing_queries_do_not_grow_with_rows(app, admin_client, path):
+    seed(app, 'small', users=3, reservations_per_user=2, spots=5)
+    small = statements_for(app, admin_client, path)
+
+    seed(app, 'large', users=150, reservations_per_user=40, spots=400)
+    large = statements_for(app, admin_client, path)
+
+    assert large == small
+    assert large <= 6
+
+
+def test_users_page_lists_only_recent_reservations(app, admin_client):
+    seed(app, 'fleet', users=1, reservations_per_user=300, spots=10)
+    page = admin_client.get('/admin/users').get_data(as_text=True)
+
+    assert page.count('<td>2026-') == 2 * 5  # start and end column of five reservations
+    assert 'Showing the 5 most recent of 300 reservations.' in page
+    with app.app_context():
+        user_id = db.session.scalar(select(User.id))
+    bookings = admin_client.get(f'/admin/bookings?user_id={user_id}').get_data(as_text=True)
+    assert '300 result(s)' in bookings
@@ -0,0 +1,90 @@
+from datetime import datetime, time, timedelta
+
+from conftest import book
+from expiry import ExpiryScheduler, now_local
+from models import db, ParkingLot, ParkingSpot, Reservation, ReservationEvent
+import events
+
+
+def tomorrow_at(hour):
+    return datetime.combine(now_local().date() + timedelta(days=1), time(hour))
+
+
+def book_tomorrow(client, lot_id, vehicle_number, **form):
+    return book(client, lot_id, vehicle_number, booking_date=str(tomorrow_at(0).date()),
+                start_time='09:00 AM', end_time='11:00 AM', **form)
+
+
+def lot_counts(lot_id):
+    lot = db.session.get(ParkingLot, lot_id)
+    return lot.available_count, lot.occupied_count, lot.unavailable_count
+
+
+def test_spot_is_occupied_when_the_window_starts_and_freed_when_it_ends(app, make_lot, user_client):
+    lot_id = make_lot(2)
+    assert book_tomorrow(user_client, lot_id, 'TN01AA1111').headers['Location'].endswith('/user/dashboard')
+
+    scheduler = ExpiryScheduler(app)
+    with app.app_context():
+        reservation = Reservation.query.one()
+        assert reservation.spot.status == 'A'
+        assert lot_counts(lot_id) == (2, 0, 0)
+
+        scheduler.refresh()
+        scheduler.run_once(now=tomorrow_at(8))
+        assert db.session.get(ParkingSpot, reservation.spot_id).status == 'A'
+
+        scheduler.run_once(now=tomorrow_at(9) + timedelta(minutes=1))
+        db.session.expire_all()
+        assert db.session.get(ParkingSpot, reservation.spot_id).status == 'O'
+        assert lot_counts(lot_id) == (1, 1, 0)
+        assert scheduler.metrics()['total_started'] == 1
+        assert db.session.query(ReservationEvent.kind).order_by(ReservationEvent.id.desc()).first()[0] == events.BOOKING_STARTED
+        assert events.compare(events.replay()) == (0, 0, 0)
+
+        scheduler.run_once(now=tomorrow_at(11) + timedelta(minutes=1))
+        db.session.expire_all()
+        assert db.session.get(ParkingSpot, reservation.spot_id).status == 'A'
+        assert lot_counts(lot_id) == (2, 0, 0)
+
+
+def test_refresh_marks_bookings_that_started_while_no_worker_ran(app, make_lot, make_user):
+    lot_id = make_lot(1)
+    user_id = make_user()
+    with app.app_context():
+        spot = ParkingSpot.query.filter_by(lot_id=lot_id).one()
+        now = now_local()
+        db.session.add(Reservation(user_id=user_id, spot_id=spot.id, vehicle_number='TN01AA1111', cost=10.0,
+                                   parking_time=now - timedelta(minutes=5), leaving_time=now + timedelta(hours=1),
+                                   status='Booked'))
+        db.session.commit()
+
+        scheduler = ExpiryScheduler(app)
+        scheduler.refresh()
+        scheduler.run_once()
+        db.session.expire_all()
+        assert db.session.get(ParkingSpot, spot.id).status == 'O'
+        assert lot_counts(lot_id) == (0, 1, 0)
+
+
+def test_full_lot_takes_advance_bookings(app, make_lot, user_client):
+    lot_id = make_lot(1)
+    assert book(user_client, lot_id, 'TN01AA1111').headers['Location'].endswith('/user/dashboard')
+
+    page = user_client.get('/book').get_data(as_text=True)
+    assert 'full now (advance booking only)' in page
+    assert book(user_client, lot_id, 'TN01AA2222').headers['Location'].endswith('/book')
+    # Today's booking runs until 11:59 PM, so tomorrow's window is free
+    assert book_tomorrow(user_client, lot_id, 'TN01AA2222').headers['Location'].endswith('/user/dashboard')
+
+
+def test_spot_with_upcoming_booking_cannot_be_made_unavailable(app, make_lot, user_client, admin_client):
+    lot_id = make_lot(1)
+    assert book_tomorrow(user_client, lot_id, 'TN01AA1111').headers['Location'].endswith('/user/dashboard')
+    with app.app_context():
+        spot_id = ParkingSpot.query.filter_by(lot_id=lot_id).one().id
+
+    admin_client.get(f'/admin/spots/{spot_id}/toggle')
+    with app.app_context():
+        assert db.session.get(ParkingSpot, spot_id).status == 'A'
+        assert lot_counts(lot_id) == (1, 0, 0)
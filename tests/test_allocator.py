@@ -0,0 +1,53 @@
+from sqlalchemy import update
+
+from conftest import book
+from models import db, ParkingSpot
+import occupancy
+
+
+def set_spots_elsewhere(app, lot_id, status):
+    # Spot changes made by another process (the expiry worker, another app
+    # worker, replay-events) never pass through this process's allocator
+    with app.app_context():
+        db.session.execute(update(ParkingSpot).where(ParkingSpot.lot_id == lot_id)
+                           .values(status=status, is_available=status == 'A'))
+        occupancy.recount()
+        db.session.commit()
+
+
+def test_spot_freed_by_another_process_can_be_booked(app, make_lot, user_client):
+    lot_id = make_lot(1)
+    set_spots_elsewhere(app, lot_id, 'O')
+    assert book(user_client, lot_id, 'TN01AA1111').headers['Location'].endswith('/book')
+
+    set_spots_elsewhere(app, lot_id, 'A')
+    assert book(user_client, lot_id, 'TN01AA2222').headers['Location'].endswith('/user/dashboard')
+
+
+def test_spot_number_freed_by_another_process_can_be_booked(app, make_lot, user_client):
+    lot_id = make_lot(2)
+    set_spots_elsewhere(app, lot_id, 'O')
+    assert book(user_client, lot_id, 'TN01AA1111', spot_number='S1').headers['Location'].endswith('/book')
+
+    set_spots_elsewhere(app, lot_id, 'A')
+    assert book(user_client, lot_id, 'TN01AA2222', spot_number='S1').headers['Location'].endswith('/user/dashboard')
+
+
+def test_claim_checks_candidates_outside_the_lock(app, make_lot):
+    from allocator import allocator
+
+    lot_id = make_lot(3)
+    seen = []
+
+    def accept(spot_id):
+        # accept may load the interval index from the database
+        assert not allocator._lock.locked()
+        seen.append(spot_id)
+        return len(seen) == 3
+
+    with app.app_context():
+        chosen = allocator.claim(lot_id, accept)
+        assert chosen == seen[-1]
+        assert allocator.free_count(lot_id) == 2  # the two rejected spots are back on the list
+        assert allocator.claim(lot_id, lambda spot_id: False) is None
+        assert allocator.free_count(lot_id) == 2
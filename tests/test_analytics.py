@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import analytics
+
+
+def brute_force(starts, ends, hours):
+    curve = np.zeros(hours)
+    for start, end in zip(starts, ends):
+        for hour in range(hours):
+            curve[hour] += max(0.0, min(end, hour + 1) - max(start, hour))
+    return curve
+
+
+@pytest.mark.parametrize('starts, ends', [
+    ([0.5], [2.5]),  # a single booking crossing two hour boundaries
+    ([0.0, 1.25, 3.0], [2.0, 4.75, 6.0]),  # only multi-hour bookings, some on whole hours
+    ([0.25, 2.5], [0.75, 2.75]),  # only bookings within one hour
+    ([0.25, 1.5, 0.0], [0.75, 5.25, 6.0]),
+])
+def test_hourly_occupancy_matches_per_hour_sum(starts, ends):
+    starts, ends = np.array(starts, dtype=float), np.array(ends, dtype=float)
+    curve = analytics.hourly_occupancy(starts, ends, 6)
+    assert curve.dtype == np.float64
+    np.testing.assert_allclose(curve, brute_force(starts, ends, 6))
+
+
+def test_hourly_occupancy_empty():
+    curve = analytics.hourly_occupancy(np.array([]), np.array([]), 4)
+    np.testing.assert_array_equal(curve, np.zeros(4))
+
+
+def test_compute_with_only_multi_hour_bookings(monkeypatch):
+    start = datetime(2026, 3, 1)
+    monkeypatch.setattr(analytics, 'now_local', lambda: datetime(2026, 3, 5))
+    columns = {
+        'lot_id': np.array([1, 1], dtype=np.int64),
+        'parking_time': np.array([start + timedelta(hours=9), start + timedelta(hours=13, minutes=30)], dtype='datetime64[us]'),
+        'leaving_time': np.array([start + timedelta(hours=11), start + timedelta(hours=15)], dtype='datetime64[us]'),
+        'cost': np.array([20.0, 15.0]),
+        'completed': np.array([True, True]),
+    }
+    report = analytics.compute(columns, start, start + timedelta(days=1), {1: 2})
+
+    assert report['occupied_hours'] == 3.5
+    assert report['revenue'] == 35.0
+    assert report['hourly']['occupancy'][9:16] == [0.5, 0.5, 0.0, 0.0, 0.25, 0.5, 0.0]
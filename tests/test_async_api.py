@@ -0,0 +1,68 @@
+import pytest
+from starlette.testclient import TestClient
+
+from conftest import book, seed_reservations
+
+PATHS = [
+    '/api/lots',
+    '/api/spots?limit=7',
+    '/api/spots?status=A&after_id=3',
+    '/api/reservations?limit=15',
+    '/api/reservations?user_id={user_id}&limit=1000',
+    '/api/events?limit=5',
+]
+
+
+@pytest.fixture
+def async_client(app):
+    import async_api
+
+    async_api.identity_cache.clear()
+    with TestClient(async_api.api) as client:
+        yield client
+
+
+def signed_in(async_client, app, flask_client):
+    cookie = app.config['SESSION_COOKIE_NAME']
+    async_client.cookies.set(cookie, flask_client.get_cookie(cookie).value)
+    return async_client
+
+
+@pytest.fixture
+def history(app, make_lot, make_user, user_client):
+    lot_id = make_lot(20)
+    make_lot(4, location='Other')
+    user_id = make_user('ann@example.com', 'Ann')
+    seed_reservations(app, lot_id, user_id, 30)
+    book(user_client, lot_id, 'TN01AA0001')  # logs a BookingCreated event
+    return user_id
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_async_json_matches_flask(app, admin_client, async_client, history, path):
+    path = path.format(user_id=history)
+    expected = admin_client.get(path)
+    assert expected.status_code == 200
+
+    response = signed_in(async_client, app, admin_client).get(path)
+    assert response.status_code == 200
+    assert response.json() == expected.get_json()
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_async_ndjson_matches_flask(app, admin_client, async_client, history, path):
+    path = path.format(user_id=history) + ('&' if '?' in path else '?') + 'format=ndjson'
+    expected = admin_client.get(path).get_data(as_text=True)
+
+    response = signed_in(async_client, app, admin_client).get(path)
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert response.text == expected
+    assert expected
+
+
+def test_async_api_is_admin_only(app, user_client, async_client):
+    assert async_client.get('/api/lots').status_code == 403
+    assert signed_in(async_client, app, user_client).get('/api/lots').status_code == 403
+    async_client.cookies.set(app.config['SESSION_COOKIE_NAME'], 'forged')
+    assert async_client.get('/api/lots').status_code == 403
@@ -0,0 +1,68 @@
+import json
+
+from conftest import book, resize_lot
+from availability import AvailabilityFeed, availability_feed
+
+
+def frames(response):
+    """Yield each Server-Sent Event of a streamed response as (event, data); comments as (None, text)."""
+    for chunk in response.iter_encoded():
+        text = chunk.decode()
+        if text.startswith(':'):
+            yield None, text.strip()
+            continue
+        event, data = text.strip().split('\n')
+        yield event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+
+def test_stream_sends_a_snapshot_then_the_booking(app, make_lot, admin_client, user_client):
+    lot_id, other_lot_id = make_lot(3), make_lot(2, location='Other')
+    response = admin_client.get('/api/stream/availability', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    stream = frames(response)
+
+    assert next(stream) == ('snapshot', {'lots': [{'lot_id': lot_id, 'A': 3, 'O': 0, 'U': 0},
+                                                  {'lot_id': other_lot_id, 'A': 2, 'O': 0, 'U': 0}]})
+    assert availability_feed.stats()['subscribers'] == 1
+
+    book(user_client, lot_id, 'TN01AA1111')
+    event, data = next(stream)
+    assert event == 'delta'
+    [change] = data['spots']
+    assert change['lot_id'] == lot_id and (change['from'], change['to']) == ('A', 'O')
+    assert data['free'] == {str(lot_id): 2}
+
+    # Resizing a lot asks every client to reload its snapshot
+    assert resize_lot(admin_client, other_lot_id, 4, location='Other').status_code == 302
+    assert next(stream) == ('snapshot', {'lots': [{'lot_id': lot_id, 'A': 2, 'O': 1, 'U': 0},
+                                                  {'lot_id': other_lot_id, 'A': 4, 'O': 0, 'U': 0}]})
+
+    response.close()
+    assert availability_feed.stats()['subscribers'] == 0
+
+
+def test_stream_needs_a_login(app):
+    assert app.test_client().get('/api/stream/availability').status_code == 302
+
+
+def test_slow_subscriber_is_resynced_not_blocked(app, make_lot):
+    lot_id = make_lot(5)
+    feed = AvailabilityFeed(queue_size=2, keepalive=0.01)
+    q = feed.subscribe()
+    with app.app_context():
+        for spot_id in range(5):
+            feed.publish([(lot_id, spot_id, 'A', 'O')])
+    assert feed.stats() == {'subscribers': 1, 'published': 5, 'resyncs': 2}
+
+    stream = feed.stream(q, {'lots': []}, lambda: {'lots': ['fresh']})
+    assert next(stream) == 'event: snapshot\ndata: {"lots":[]}\n\n'
+    # Each overflow dropped the backlog for one resync, which reloads the snapshot
+    assert next(stream) == 'event: snapshot\ndata: {"lots":["fresh"]}\n\n'
+    with app.app_context():
+        feed.publish([(lot_id, 9, 'O', 'A')])
+    assert next(stream).startswith(f'event: delta\ndata: {{"spots":[{{"lot_id":{lot_id},"spot_id":9,')
+    assert next(stream) == ': keepalive\n\n'
+    stream.close()
+    assert feed.stats()['subscribers'] == 0
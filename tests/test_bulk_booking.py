@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+import pytest
+
+from expiry import now_local
+
+
+@pytest.mark.parametrize('body', [
+    [1],
+    'fleet',
+    {'lot_id': 1, 'vehicles': ['TN01AA1111'], 'start': 'S', 'end': 'E', 'repeat': 'day'},
+    {'lot_id': 1, 'vehicles': ['TN01AA1111'], 'start': 'S', 'end': 'E', 'repeat': [7]},
+])
+def test_malformed_body_is_a_bad_request(user_client, make_lot, body):
+    make_lot(2)
+    start = now_local() + timedelta(days=1)
+    if isinstance(body, dict):
+        body = dict(body, start=start.isoformat(timespec='minutes'), end=(start + timedelta(hours=2)).isoformat(timespec='minutes'))
+    response = user_client.post('/api/bookings/bulk', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_recurring_booking_is_all_or_nothing(app, user_client, make_lot):
+    from models import Reservation
+
+    lot_id = make_lot(2)
+    start = (now_local() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    body = {'lot_id': lot_id, 'vehicles': ['TN01AA1111', 'TN01AA2222'],
+            'start': start.isoformat(), 'end': (start + timedelta(hours=2)).isoformat(),
+            'repeat': {'every': 'day', 'count': 3}}
+    assert user_client.post('/api/bookings/bulk', json=body).status_code == 201
+
+    # One more vehicle than the lot has spots: nothing is booked
+    body['vehicles'] = ['TN01AA3333', 'TN01AA4444', 'TN01AA5555']
+    body['start'] = (start + timedelta(hours=4)).isoformat()
+    body['end'] = (start + timedelta(hours=6)).isoformat()
+    assert user_client.post('/api/bookings/bulk', json=body).status_code == 409
+    with app.app_context():
+        assert Reservation.query.count() == 6
@@ -0,0 +1,77 @@
+from flask import Flask
+
+import chart_cache as chart_cache_module
+from chart_cache import ChartCache, GLOBAL, user_scope
+from conftest import recorded_sql
+
+
+def make_cache(monkeypatch, clock, **config):
+    app = Flask(__name__)
+    app.config.update(config)
+    cache = ChartCache()
+    cache.init_app(app)
+    monkeypatch.setattr(chart_cache_module.time, 'monotonic', lambda: clock[0])
+    return cache
+
+
+def test_memory_entries_last_until_invalidated(monkeypatch):
+    clock = [1000.0]
+    cache = make_cache(monkeypatch, clock)
+    values = iter(['before', 'after'])
+    compute = lambda: next(values)
+
+    assert cache.memory_ttl is None
+    assert cache.get_or_compute(GLOBAL, 'dashboard', compute) == 'before'
+    clock[0] += 86400
+    assert cache.get_or_compute(GLOBAL, 'dashboard', compute) == 'before'
+    cache.invalidate(GLOBAL)
+    assert cache.get_or_compute(GLOBAL, 'dashboard', compute) == 'after'
+
+
+def test_memory_ttl_is_opt_in(monkeypatch):
+    # For several processes without a file store, whose invalidations never reach each other
+    clock = [1000.0]
+    cache = make_cache(monkeypatch, clock, CHART_CACHE_TTL='60')
+    values = iter(['before', 'after'])
+    compute = lambda: next(values)
+
+    assert cache.get_or_compute(GLOBAL, 'dashboard', compute) == 'before'
+    clock[0] += 59
+    assert cache.get_or_compute(GLOBAL, 'dashboard', compute) == 'before'
+    clock[0] += 2
+    assert cache.get_or_compute(GLOBAL, 'dashboard', compute) == 'after'
+
+
+def test_invalidate_drops_only_its_scope(monkeypatch):
+    cache = make_cache(monkeypatch, [0.0])
+    cache.get_or_compute(user_scope(1), 'dashboard', lambda: 1)
+    cache.get_or_compute(user_scope(2), 'dashboard', lambda: 2)
+    cache.invalidate(user_scope(1))
+
+    assert cache.get_or_compute(user_scope(1), 'dashboard', lambda: 'fresh') == 'fresh'
+    assert cache.get_or_compute(user_scope(2), 'dashboard', lambda: 'fresh') == 2
+
+
+def test_file_store_shares_entries_between_processes(monkeypatch, tmp_path):
+    clock = [0.0]
+    first = make_cache(monkeypatch, clock, CHART_CACHE_DIR=str(tmp_path))
+    second = make_cache(monkeypatch, clock, CHART_CACHE_DIR=str(tmp_path))
+    assert first.get_or_compute(GLOBAL, 'dashboard', lambda: {'n': 1}) == {'n': 1}
+    assert second.get_or_compute(GLOBAL, 'dashboard', lambda: {'n': 2}) == {'n': 1}
+
+    # The other process's invalidation shows up at once, even after it has stored a newer value
+    second.invalidate(GLOBAL)
+    assert first.get_or_compute(GLOBAL, 'dashboard', lambda: {'n': 3}) == {'n': 3}
+    second.invalidate(GLOBAL)
+    assert second.get_or_compute(GLOBAL, 'dashboard', lambda: {'n': 4}) == {'n': 4}
+    assert first.get_or_compute(GLOBAL, 'dashboard', lambda: {'n': 5}) == {'n': 4}
+
+
+def test_dashboard_hits_run_no_sql(app, admin_client, make_lot):
+    make_lot(3)
+    admin_client.get('/admin/dashboard')
+    admin_client.get('/admin/charts/lots')
+    with recorded_sql(app) as statements:
+        assert admin_client.get('/admin/dashboard').status_code == 200
+        assert admin_client.get('/admin/charts/lots').status_code == 200
+    assert statements == []
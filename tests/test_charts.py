@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from conftest import book
+from models import db, DailyLotStats
+
+
+def test_unchanged_chart_answers_304(admin_client, user_client, make_lot):
+    lot_id = make_lot(2)
+    first = admin_client.get('/admin/charts/lots')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    again = admin_client.get('/admin/charts/lots', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert admin_client.get('/admin/charts/lots', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+    # A booking changes the data, so the old validator no longer matches
+    book(user_client, lot_id, 'TN01AA1111')
+    changed = admin_client.get('/admin/charts/lots', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+    user_chart = user_client.get('/user/charts/bookings')
+    assert user_client.get('/user/charts/bookings', headers={'If-None-Match': user_chart.headers['ETag']}).status_code == 304
+
+
+@pytest.mark.parametrize('granularity, labels, counts', [
+    ('day', ['2026-03-30', '2026-04-01', '2026-04-06'], [1, 2, 4]),
+    ('week', ['2026-03-30', '2026-04-06'], [3, 4]),
+    ('month', ['2026-03', '2026-04'], [1, 6]),
+])
+def test_bookings_chart_folds_by_granularity(app, admin_client, make_lot, granularity, labels, counts):
+    lot_id = make_lot(1)
+    with app.app_context():
+        db.session.execute(insert(DailyLotStats), [
+            {'day': date(2026, 3, 30), 'lot_id': lot_id, 'bookings': 1, 'revenue': 10.0},
+            {'day': date(2026, 4, 1), 'lot_id': lot_id, 'bookings': 2, 'revenue': 20.0},
+            {'day': date(2026, 4, 6), 'lot_id': lot_id, 'bookings': 4, 'revenue': 40.0},
+            {'day': date(2026, 5, 1), 'lot_id': lot_id, 'bookings': 8, 'revenue': 80.0},
+        ])
+        db.session.commit()
+
+    response = admin_client.get(f'/admin/charts/bookings?from=2026-03-01&to=2026-04-30&granularity={granularity}')
+    assert response.status_code == 200
+    assert response.get_json() == {'labels': labels, 'counts': counts}
+
+
+@pytest.mark.parametrize('query, message', [
+    ('granularity=year', 'granularity must be one of day, week, month'),
+    ('from=2026-13-01', ''),
+    ('from=yesterday', ''),
+    ('from=2026-04-02&to=2026-04-01', "'to' must not be before 'from'"),
+])
+def test_bad_chart_range_is_a_bad_request(admin_client, user_client, query, message):
+    for client, path in ((admin_client, '/admin/charts/bookings'), (user_client, '/user/charts/costs')):
+        response = client.get(f'{path}?{query}')
+        assert response.status_code == 400
+        assert message in response.get_json()['error']
+
+
+def test_unknown_chart_is_not_found(admin_client, user_client):
+    assert admin_client.get('/admin/charts/revenue').status_code == 404
+    assert user_client.get('/user/charts/revenue').status_code == 404
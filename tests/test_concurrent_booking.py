@@ -0,0 +1,15 @@
+import pytest
+
+from bench_booking import run
+
+
+@pytest.mark.parametrize('bookings, spots', [(40, 10), (30, 30)])
+def test_parallel_bookings_never_share_a_spot(app, bookings, spots):
+    result = run(app, bookings, spots, threads=8)
+
+    assert result['throughput'] > 0
+    assert 0 < result['p50_ms'] <= result['p99_ms']
+    assert result['double_booked'] == 0
+    # Every spot claimed by a booking is occupied once, and none is lost to contention
+    assert result['booked'] == result['open'] == result['occupied'] == result['counter']
+    assert result['booked'] == min(bookings, spots)
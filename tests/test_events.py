@@ -0,0 +1,111 @@
+import threading
+from datetime import timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+
+from conftest import book
+from expiry import now_local
+from models import db, DailyLotStats, ParkingLot, ParkingSpot, Reservation
+import events
+import occupancy
+
+
+def test_snapshot_loop_survives_a_failed_snapshot(app, monkeypatch):
+    snapshotter = events.EventSnapshotter(app, every=1, interval=0.01)
+    stop = threading.Event()
+    calls = []
+
+    def locked_once():
+        calls.append(True)
+        if len(calls) == 1:
+            raise OperationalError('INSERT INTO event_snapshots', {}, Exception('database is locked'))
+        stop.set()
+        return False
+
+    monkeypatch.setattr(snapshotter, 'run_once', locked_once)
+    thread = threading.Thread(target=snapshotter.loop, args=(stop,), daemon=True)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(calls) == 2
+
+
+def reservation_id(app, vehicle_number):
+    with app.app_context():
+        return db.session.scalar(select(Reservation.id).where(Reservation.vehicle_number == vehicle_number))
+
+
+def replayed_differences(app):
+    with app.app_context():
+        state = events.replay()
+        return state, events.compare(state)
+
+
+def test_replay_after_a_snapshot_matches_the_tables(app, admin_client, make_lot, make_user, login):
+    lot_id, other_lot_id = make_lot(3), make_lot(2, location='Other', price=25)
+    make_user('ann@example.com', 'Ann')
+    bob_id = make_user('bob@example.com', 'Bob')
+    ann, bob = login('ann@example.com'), login('bob@example.com')
+    tomorrow = now_local() + timedelta(days=1)
+
+    book(ann, lot_id, 'TN01AA0001')
+    book(bob, other_lot_id, 'TN01AA0002')
+    book(ann, lot_id, 'TN01AA0003', booking_date=str(tomorrow.date()), start_time='09:00 AM', end_time='11:00 AM')
+    with app.app_context():
+        free_spot_id = db.session.scalar(select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id,
+                                                                      ParkingSpot.status == 'A'))
+    admin_client.get(f'/admin/spots/{free_spot_id}/toggle')
+
+    # Replaying the whole log with no snapshot rebuilds the same state
+    state, differences = replayed_differences(app)
+    assert (state.snapshot_id, state.events) == (None, 4)
+    assert differences == (0, 0, 0)
+
+    with app.app_context():
+        snapshot = events.take_snapshot()
+        assert snapshot.last_event_id == state.last_event_id
+
+    ann.post(f"/release/{reservation_id(app, 'TN01AA0001')}")
+    ann.post(f"/release/{reservation_id(app, 'TN01AA0003')}")  # cancels the advance booking
+    admin_client.get(f'/admin/spots/{free_spot_id}/toggle')
+    start = (tomorrow + timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+    assert bob.post('/api/bookings/bulk', json={
+        'lot_id': lot_id, 'vehicles': ['TN02BB0001'], 'start': start.isoformat(),
+        'end': (start + timedelta(hours=2)).isoformat()}).status_code == 201
+    admin_client.post(f'/admin/users/{bob_id}/delete')
+
+    # Only the events after the snapshot are folded in
+    state, differences = replayed_differences(app)
+    assert state.snapshot_id == snapshot.id
+    assert state.events == 5
+    assert differences == (0, 0, 0)
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['replay-events', '--check'])
+    assert result.exit_code == 0
+    assert 'Differences: 0 spot(s), 0 lot rollup row(s), 0 user rollup row(s).' in result.output
+
+
+def test_replay_repairs_tables_that_drifted(app, make_lot, user_client):
+    lot_id = make_lot(2)
+    book(user_client, lot_id, 'TN01AA0001')
+    with app.app_context():
+        events.take_snapshot()
+        db.session.execute(update(ParkingSpot).values(status='A', is_available=True))
+        db.session.execute(update(DailyLotStats).values(revenue=DailyLotStats.revenue + 5))
+        db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['replay-events', '--check'])
+    assert result.exit_code == 1
+    assert 'Differences: 1 spot(s), 1 lot rollup row(s), 0 user rollup row(s).' in result.output
+
+    result = runner.invoke(args=['replay-events'])
+    assert result.exit_code == 0
+    assert 'Rewrote 1 spot(s)' in result.output
+    assert replayed_differences(app)[1] == (0, 0, 0)
+    with app.app_context():
+        assert occupancy.find_drift() == []
+        assert db.session.scalar(select(ParkingLot.occupied_count).where(ParkingLot.id == lot_id)) == 1
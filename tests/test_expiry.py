@@ -0,0 +1,62 @@
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy.exc import OperationalError
+
+import expiry
+from expiry import ExpiryScheduler, now_local
+from models import db, ParkingSpot, Reservation
+import occupancy
+
+
+def test_loop_survives_a_failed_tick(app, make_lot, make_user, monkeypatch):
+    lot_id = make_lot(1)
+    user_id = make_user()
+    with app.app_context():
+        spot = ParkingSpot.query.filter_by(lot_id=lot_id).one()
+        spot.status, spot.is_available = 'O', False
+        occupancy.recount()
+        now = now_local()
+        reservation = Reservation(user_id=user_id, spot_id=spot.id, vehicle_number='TN01AA1111', cost=10.0,
+                                  parking_time=now - timedelta(hours=2), leaving_time=now - timedelta(minutes=1),
+                                  status='O')
+        db.session.add(reservation)
+        db.session.commit()
+        reservation_id, spot_id = reservation.id, spot.id
+
+    # The first tick hits a locked database after popping the due booking off the heap
+    record = expiry.events.record
+    failures = []
+
+    def locked_once(*entries):
+        if not failures:
+            failures.append(True)
+            raise OperationalError('INSERT INTO reservation_events', {}, Exception('database is locked'))
+        return record(*entries)
+
+    monkeypatch.setattr(expiry.events, 'record', locked_once)
+    monkeypatch.setattr(expiry, 'RETRY_DELAY', 0.01)
+    scheduler = ExpiryScheduler(app)
+    stop = threading.Event()
+    thread = threading.Thread(target=scheduler.loop, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        status = None
+        while time.monotonic() < deadline:
+            with app.app_context():
+                status = db.session.get(Reservation, reservation_id).status
+                db.session.remove()
+            if status == 'Completed':
+                break
+            time.sleep(0.02)
+    finally:
+        stop.set()
+        scheduler._wakeup.set()
+        thread.join(5)
+
+    assert failures
+    assert status == 'Completed'
+    with app.app_context():
+        assert db.session.get(ParkingSpot, spot_id).status == 'A'
@@ -0,0 +1,122 @@
+import csv
+import io
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from models import db, ParkingSpot, Reservation
+import export
+from export import ExportError, parse_filters
+
+
+def seed(app, lot_id, other_lot_id, user_id):
+    with app.app_context():
+        spots = {lot: db.session.scalars(select(ParkingSpot.id).where(ParkingSpot.lot_id == lot)).all()
+                 for lot in (lot_id, other_lot_id)}
+        start = datetime(2026, 4, 1, 9)
+        db.session.execute(insert(Reservation), [
+            {'user_id': user_id, 'spot_id': spots[lot][n % 2], 'vehicle_number': f'TN{n:08d}',
+             'parking_time': start + timedelta(hours=5 * n), 'leaving_time': start + timedelta(hours=5 * n + 2),
+             'cost': 20.0 + n, 'status': 'Completed'}
+            for n, lot in enumerate([lot_id, other_lot_id] * 12)])
+        db.session.commit()
+
+
+def csv_rows(response):
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert tuple(rows[0]) == export.COLUMNS
+    return rows[1:]
+
+
+@pytest.fixture
+def history(app, make_lot, make_user):
+    lot_id, other_lot_id = make_lot(2), make_lot(2, location='Other')
+    seed(app, lot_id, other_lot_id, make_user('ann@example.com', 'Ann'))
+    return lot_id, other_lot_id
+
+
+def test_csv_export_filters_by_day_and_lot(app, admin_client, history):
+    lot_id, _ = history
+    everything = csv_rows(admin_client.get('/admin/bookings/export'))
+    assert len(everything) == 24
+    assert [int(row[0]) for row in everything] == sorted(int(row[0]) for row in everything)
+    assert everything[0][2] == 'Ann' and everything[0][7] == '2026-04-01 09:00:00'
+
+    # Both ends are whole days: 2026-04-02 and 2026-04-03 cover parking times 04-02 00:00 to 04-03 23:59
+    response = admin_client.get(f'/admin/bookings/export?from=2026-04-02&to=2026-04-03&lot_id={lot_id}')
+    assert 'reservations_2026-04-02_2026-04-03_lot' in response.headers['Content-Disposition']
+    rows = csv_rows(response)
+    assert rows == [row for row in everything
+                    if row[3] == str(lot_id) and '2026-04-02' <= row[7][:10] <= '2026-04-03']
+    assert rows
+
+    # Chunk boundaries do not change the output
+    with app.app_context():
+        assert ''.join(export.iter_csv(export.export_query(), size=5)) == \
+            admin_client.get('/admin/bookings/export').get_data(as_text=True)
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_columnar_export_matches_csv(admin_client, history, fmt):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    lot_id, _ = history
+    expected = csv_rows(admin_client.get(f'/admin/bookings/export?lot_id={lot_id}'))
+    response = admin_client.get(f'/admin/bookings/export?format={fmt}&lot_id={lot_id}')
+    assert response.status_code == 200
+    assert f'reservations_all_all_lot{lot_id}.{fmt}' in response.headers['Content-Disposition']
+
+    source = pa.BufferReader(response.data)
+    table = pq.read_table(source) if fmt == 'parquet' else pa.ipc.open_file(source).read_all()
+    assert table.schema == export.arrow_schema()
+    rows = [[str(value) for value in row.values()] for row in table.to_pylist()]
+    assert rows == expected
+
+
+def test_export_command_writes_every_format(app, history, tmp_path):
+    formats = ['csv'] + (['parquet', 'arrow'] if export.pa is not None else [])
+    runner = app.test_cli_runner()
+    for fmt in formats:
+        path = tmp_path / f'history.{fmt}'
+        result = runner.invoke(args=['export-reservations', str(path), '--from', '2026-04-01', '--to', '2026-04-01',
+                                     '--chunk', '2'])
+        assert result.exit_code == 0, result.output
+        assert 'Exported 3 reservation(s)' in result.output  # 09:00, 14:00 and 19:00 on 04-01
+        assert path.stat().st_size > 0
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'from': '2026-04-31'}, 'YYYY-MM-DD'),
+    ({'to': 'yesterday'}, 'YYYY-MM-DD'),
+    ({'lot_id': 'north'}, 'numeric lot id'),
+    ({'from': '2026-04-02', 'to': '2026-04-01'}, "'to' must not be before 'from'"),
+])
+def test_bad_filters_raise_export_error(args, message):
+    with pytest.raises(ExportError, match=message):
+        parse_filters(args)
+
+
+def test_valid_filters_are_parsed():
+    assert parse_filters({}) == (None, None, None)
+    assert parse_filters({'from': '2026-04-01', 'to': '2026-04-01', 'lot_id': '3'}) == \
+        (date(2026, 4, 1), date(2026, 4, 1), 3)
+
+
+def test_bad_export_requests_redirect_with_the_error(app, admin_client, history, tmp_path, monkeypatch):
+    for query in ('format=xlsx', 'from=2026-02-30', 'from=2026-04-02&to=2026-04-01'):
+        response = admin_client.get(f'/admin/bookings/export?{query}')
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/admin/bookings')
+
+    result = app.test_cli_runner().invoke(args=['export-reservations', str(tmp_path / 'out.csv'), '--from', 'soon'])
+    assert result.exit_code != 0
+    assert 'YYYY-MM-DD' in result.output
+
+    # Without pyarrow the columnar formats fail the same way instead of erroring
+    monkeypatch.setattr(export, 'pa', None)
+    assert admin_client.get('/admin/bookings/export?format=parquet').status_code == 302
+    with app.app_context(), pytest.raises(ExportError, match='pyarrow'):
+        export.write_columnar(io.BytesIO(), 'arrow', export.export_query())
@@ -0,0 +1,51 @@
+import app as app_module
+from models import db, User
+
+
+def cached(key):
+    return app_module.identity_cache._entries.get(key)
+
+
+def test_deleting_a_user_logs_their_sessions_out(app, admin_client, make_user, login):
+    user_id = make_user('ann@example.com', 'Ann')
+    ann = login('ann@example.com')
+    assert ann.get('/user/dashboard').status_code == 200
+    assert cached(f'user:{user_id}') is not None
+
+    admin_client.post(f'/admin/users/{user_id}/delete')
+    assert cached(f'user:{user_id}') is None
+    response = ann.get('/user/dashboard')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_editing_a_user_drops_the_cached_identity(app, make_user, make_admin, login):
+    user_id = make_user('ann@example.com', 'Ann')
+    admin_id = make_admin()
+    ann, admin = login('ann@example.com'), login('admin')
+    ann.get('/user/dashboard')
+    admin.get('/admin/users')
+    assert cached(f'user:{user_id}') is not None and cached(f'admin:{admin_id}') is not None
+
+    with app.app_context():
+        db.session.get(User, user_id).full_name = 'Ann Smith'
+        db.session.commit()
+    assert cached(f'user:{user_id}') is None
+    assert cached(f'admin:{admin_id}') is not None
+
+    # The next request reloads it from the table
+    assert ann.get('/user/dashboard').status_code == 200
+    assert cached(f'user:{user_id}') is not None
+
+
+def test_a_rolled_back_edit_only_costs_a_reload(app, make_user, login):
+    user_id = make_user('ann@example.com', 'Ann')
+    ann = login('ann@example.com')
+    ann.get('/user/dashboard')
+
+    with app.app_context():
+        db.session.get(User, user_id).full_name = 'Ann Smith'
+        db.session.flush()
+        db.session.rollback()
+    assert cached(f'user:{user_id}') is None
+    assert ann.get('/user/dashboard').status_code == 200
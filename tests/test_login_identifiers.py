@@ -0,0 +1,80 @@
+import importlib.util
+import os
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, text
+
+from conftest import PASSWORD, ROOT
+from models import db, LoginIdentifier, User
+
+
+@pytest.mark.parametrize('identifier, dashboard', [
+    ('  USER@Example.COM ', '/user/dashboard'),
+    ('test USER', '/user/dashboard'),
+    (' Admin', '/admin/dashboard'),
+])
+def test_login_ignores_case_and_surrounding_spaces(app, make_admin, make_user, identifier, dashboard):
+    make_admin()
+    make_user()
+    response = app.test_client().post('/login', data={'login_input': identifier, 'password': PASSWORD})
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(dashboard)
+
+
+def register(app, email, full_name):
+    return app.test_client().post('/register', data={
+        'full_name': full_name, 'email': email, 'password': PASSWORD, 'confirm_password': PASSWORD})
+
+
+@pytest.mark.parametrize('email, full_name, message', [
+    ('USER@example.com', 'Someone Else', b'Email already registered'),
+    ('other@example.com', '  TEST user ', b'That name is already taken'),
+    ('other@example.com', 'ADMIN', b'That name is already taken'),
+])
+def test_register_refuses_a_normalized_collision(app, make_admin, make_user, email, full_name, message):
+    make_admin()
+    make_user()
+    response = register(app, email, full_name)
+    assert response.status_code == 200
+    assert message in response.data
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(User)) == 1
+
+
+def test_register_stores_normalized_identifiers(app):
+    assert register(app, 'New.Person@Example.com', ' New Person ').status_code == 302
+    with app.app_context():
+        rows = db.session.execute(db.select(LoginIdentifier.identifier, LoginIdentifier.role)).all()
+    assert sorted(rows) == [('new person', 'user'), ('new.person@example.com', 'user')]
+
+
+def load_migration(name):
+    path = os.path.join(ROOT, 'migrations', 'versions', name)
+    spec = importlib.util.spec_from_file_location(name[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_migration_backfills_normalized_identifiers(tmp_path):
+    migration = load_migration('b7e1d2c4a690_add_login_identifiers.py')
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT, full_name TEXT)"))
+        conn.execute(text("CREATE TABLE admins (id INTEGER PRIMARY KEY, username TEXT)"))
+        conn.execute(text("INSERT INTO users VALUES (1, 'Ann@Example.com', ' Ann Lee '), (2, 'bob@example.com', 'Root')"))
+        # 'root' clashes with user 2's full name: the user keeps it, as the old login checked users first
+        conn.execute(text("INSERT INTO admins VALUES (1, 'ROOT'), (2, ' Admin ')"))
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+        rows = conn.execute(text("SELECT identifier, role, principal_id FROM login_identifiers ORDER BY identifier")).all()
+
+    assert [tuple(row) for row in rows] == [
+        ('admin', 'admin', 2),
+        ('ann lee', 'user', 1),
+        ('ann@example.com', 'user', 1),
+        ('bob@example.com', 'user', 2),
+        ('root', 'user', 2),
+    ]
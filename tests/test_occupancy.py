@@ -0,0 +1,55 @@
+from sqlalchemy import select, update
+
+from conftest import book
+from models import db, ParkingLot, ParkingSpot, Reservation
+import occupancy
+
+
+def counters(app, lot_id):
+    with app.app_context():
+        lot = db.session.get(ParkingLot, lot_id)
+        assert occupancy.find_drift() == []
+        return lot.available_count, lot.occupied_count, lot.unavailable_count
+
+
+def test_counters_follow_book_release_and_toggle(app, make_lot, admin_client, user_client):
+    lot_id = make_lot(3)
+    assert counters(app, lot_id) == (3, 0, 0)
+
+    assert book(user_client, lot_id, 'TN01AA1111').headers['Location'].endswith('/user/dashboard')
+    assert counters(app, lot_id) == (2, 1, 0)
+
+    with app.app_context():
+        reservation_id = db.session.scalar(select(Reservation.id))
+        spot_id = db.session.scalar(select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A')
+                                    .order_by(ParkingSpot.id))
+    admin_client.get(f'/admin/spots/{spot_id}/toggle')
+    assert counters(app, lot_id) == (1, 1, 1)
+
+    user_client.post(f'/release/{reservation_id}')
+    assert counters(app, lot_id) == (2, 0, 1)
+
+    admin_client.get(f'/admin/spots/{spot_id}/toggle')
+    assert counters(app, lot_id) == (3, 0, 0)
+
+
+def test_check_lot_counts_reports_and_repairs_drift(app, make_lot):
+    lot_id = make_lot(4)
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['check-lot-counts'])
+    assert result.exit_code == 0
+    assert 'All lot counters match their spots.' in result.output
+
+    with app.app_context():
+        db.session.execute(update(ParkingLot).where(ParkingLot.id == lot_id).values(available_count=1, occupied_count=3))
+        db.session.commit()
+        assert occupancy.find_drift() == [(lot_id, {'A': 1, 'O': 3, 'U': 0}, {'A': 4, 'O': 0, 'U': 0})]
+
+    result = runner.invoke(args=['check-lot-counts'])
+    assert result.exit_code == 1
+    assert f"lot {lot_id}: stored {{'A': 1, 'O': 3, 'U': 0}}, actual {{'A': 4, 'O': 0, 'U': 0}}" in result.output
+
+    result = runner.invoke(args=['check-lot-counts', '--repair'])
+    assert result.exit_code == 0
+    assert 'Repaired 1 lot(s).' in result.output
+    assert counters(app, lot_id) == (4, 0, 0)
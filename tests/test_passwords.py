@@ -0,0 +1,27 @@
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from passwords import PasswordHasher
+
+
+def hasher_for(method):
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_METHOD=method, PASSWORD_HASH_WORKERS=1)
+    return PasswordHasher(app)
+
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha256:1000', 'scrypt', 'scrypt:16384:8:1'])
+def test_hash_with_configured_method_is_not_rehashed(method):
+    hasher = hasher_for(method)
+    stored = hasher.hash('secret123')
+    assert not hasher.needs_rehash(stored)
+    assert hasher.verify(stored, 'secret123') == (True, None)
+
+
+def test_hash_with_other_parameters_is_upgraded():
+    hasher = hasher_for('pbkdf2:sha256:2000')
+    matches, new_hash = hasher.verify(generate_password_hash('secret123', 'pbkdf2:sha256:1000'), 'secret123')
+    assert matches
+    assert new_hash.startswith('pbkdf2:sha256:2000$')
+    assert not hasher.needs_rehash(new_hash)
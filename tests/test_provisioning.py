@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from conftest import book, resize_lot
+from models import db, ParkingLot, ParkingSpot, Reservation
+import occupancy
+
+
+def spot_numbers(app, lot_id):
+    with app.app_context():
+        return sorted(int(number[1:]) for number in db.session.scalars(
+            select(ParkingSpot.spot_number).where(ParkingSpot.lot_id == lot_id)))
+
+
+def lot_state(app, lot_id):
+    with app.app_context():
+        assert occupancy.find_drift() == []
+        lot = db.session.get(ParkingLot, lot_id)
+        return lot.max_spots, lot.available_count, lot.occupied_count
+
+
+def test_growing_numbers_new_spots_after_the_highest(app, admin_client, make_lot, make_user):
+    lot_id = make_lot(5)
+    assert spot_numbers(app, lot_id) == [1, 2, 3, 4, 5]
+
+    # S5 has booking history, so shrinking retires the highest spots below it
+    user_id = make_user('ann@example.com', 'Ann')
+    with app.app_context():
+        spot_id = db.session.scalar(select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id,
+                                                                 ParkingSpot.spot_number == 'S5'))
+        db.session.add(Reservation(user_id=user_id, spot_id=spot_id, vehicle_number='TN01AA0001', cost=10.0,
+                                   parking_time=datetime(2026, 1, 1, 9), leaving_time=datetime(2026, 1, 1, 10),
+                                   status='Completed'))
+        db.session.commit()
+    assert resize_lot(admin_client, lot_id, 3).status_code == 302
+    assert spot_numbers(app, lot_id) == [1, 2, 5]
+    assert lot_state(app, lot_id) == (3, 3, 0)
+
+    assert resize_lot(admin_client, lot_id, 6).status_code == 302
+    assert spot_numbers(app, lot_id) == [1, 2, 5, 6, 7, 8]
+    assert lot_state(app, lot_id) == (6, 6, 0)
+
+
+def test_shrinking_past_occupied_spots_is_refused(app, admin_client, user_client, make_lot):
+    lot_id = make_lot(3)
+    book(user_client, lot_id, 'TN01AA0001')
+    assert lot_state(app, lot_id) == (3, 2, 1)
+
+    response = resize_lot(admin_client, lot_id, 0)
+    assert response.headers['Location'].endswith(f'/admin/edit_lot/{lot_id}')
+    assert b'Cannot shrink the lot that far' in admin_client.get(response.headers['Location']).data
+    assert spot_numbers(app, lot_id) == [1, 2, 3]
+    assert lot_state(app, lot_id) == (3, 2, 1)
+
+    assert resize_lot(admin_client, lot_id, 1).status_code == 302
+    with app.app_context():
+        assert db.session.scalars(select(ParkingSpot.status).where(ParkingSpot.lot_id == lot_id)).all() == ['O']
+    assert lot_state(app, lot_id) == (1, 0, 1)
+
+
+def test_allocator_follows_resizes(app, admin_client, make_lot, make_user, login):
+    lot_id = make_lot(2)
+    assert resize_lot(admin_client, lot_id, 1).status_code == 302
+    assert resize_lot(admin_client, lot_id, 3).status_code == 302
+
+    clients = []
+    for n in range(4):
+        make_user(f'user{n}@example.com', f'User {n}')
+        clients.append(login(f'user{n}@example.com'))
+    booked = [book(client, lot_id, f'TN01AA000{n}').headers['Location'].endswith('/user/dashboard')
+              for n, client in enumerate(clients)]
+    # Only the three spots that exist now can be handed out, retired ones never
+    assert booked == [True, True, True, False]
+    with app.app_context():
+        assert sorted(db.session.scalars(select(ParkingSpot.spot_number).join(Reservation))) == ['S1', 'S2', 'S3']
+    assert lot_state(app, lot_id) == (3, 0, 3)
@@ -0,0 +1,114 @@
+import re
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from conftest import book, recorded_sql
+from expiry import ExpiryScheduler, now_local
+from models import db, ParkingSpot, Reservation
+
+# --- Query-plan regression check ---
+# Drives the routes through the test client, records every statement they
+# actually run, and EXPLAINs each one on SQLite. A full table scan in a
+# filtered query means an index was dropped or a route stopped matching one.
+
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(\w+)')
+
+
+def drive_routes(app, admin_client, user_client, user_id, lot_id, other_lot_id, statements):
+    tomorrow = str(now_local().date() + timedelta(days=1))
+
+    user_client.get('/book')
+    book(user_client, lot_id, 'TN01AA1111')
+    book(user_client, lot_id, 'TN01AA2222', spot_number='S2')
+    book(user_client, other_lot_id, 'TN01AA3333', booking_date=tomorrow, start_time='09:00 AM', end_time='11:00 AM')
+    start = (now_local() + timedelta(days=2)).replace(hour=9, minute=0, second=0, microsecond=0)
+    user_client.post('/api/bookings/bulk', json={'lot_id': lot_id, 'vehicles': ['TN02BB1111', 'TN02BB2222'],
+                                                 'start': start.isoformat(), 'end': (start + timedelta(hours=2)).isoformat(),
+                                                 'repeat': {'every': 'day', 'count': 3}})
+    user_client.get('/user/dashboard')
+    for chart in ('bookings', 'costs'):
+        user_client.get(f'/user/charts/{chart}')
+    user_client.get('/user/booking_history')
+    mark = len(statements)  # the test's own lookups are not route queries
+    with app.app_context():
+        started = db.session.scalar(select(Reservation.id).where(Reservation.vehicle_number == 'TN01AA1111'))
+        advance = db.session.scalar(select(Reservation.id).where(Reservation.vehicle_number == 'TN01AA3333'))
+        spot_id = db.session.scalar(select(ParkingSpot.id).where(ParkingSpot.lot_id == other_lot_id,
+                                                                 ParkingSpot.spot_number == 'S2'))
+    del statements[mark:]
+    user_client.post(f'/release/{started}')
+    user_client.post(f'/release/{advance}')
+
+    admin_client.get('/admin/dashboard')
+    for chart in ('bookings', 'lots', 'top-users', 'spot-status'):
+        admin_client.get(f'/admin/charts/{chart}')
+    admin_client.get('/admin/lots')
+    admin_client.get('/admin/spots')
+    admin_client.get(f'/admin/spots?lot_id={lot_id}&status=A')
+    admin_client.get(f'/admin/spots/{spot_id}/toggle')
+    admin_client.post(f'/admin/add_spots/{other_lot_id}', data={'count': '2'})
+    admin_client.post(f'/admin/edit_lot/{other_lot_id}', data={'location': 'South', 'address': 'Somewhere',
+                                                               'pincode': '600001', 'price': '12', 'max_spots': '3'})
+    admin_client.get('/admin/users')
+    admin_client.get('/admin/users?q=fleet')
+    admin_client.get('/admin/bookings')
+    admin_client.get(f'/admin/bookings?q=TN01&lot_id={lot_id}&status=Booked&user_id={user_id}')
+    admin_client.get('/admin/bookings/export?format=csv').get_data()
+    admin_client.get('/admin/analytics.json')
+    admin_client.get('/admin/expiry/metrics')
+    for path in ('/api/lots', f'/api/spots?lot_id={lot_id}&status=A', f'/api/reservations?user_id={user_id}',
+                 '/api/events?kind=BookingCreated', '/api/spots?format=ndjson'):
+        admin_client.get(path).get_data()
+
+    scheduler = ExpiryScheduler(app)
+    with app.app_context():
+        scheduler.refresh()
+        scheduler.run_once(now=start + timedelta(days=5))
+
+    admin_client.post(f'/admin/users/{user_id}/delete')
+    admin_client.post(f'/admin/delete_lot/{other_lot_id}')
+
+
+def explain(app, statement, parameters):
+    if parameters and isinstance(parameters[0], (list, tuple)):  # executemany: one row is enough
+        parameters = parameters[0]
+    with app.app_context():
+        conn = db.engine.raw_connection()
+    try:
+        return [row[-1] for row in conn.cursor().execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()]
+    finally:
+        conn.close()
+
+
+def filtered_by_equality(statement, table):
+    # A lookup on `table` (col = ? / col IN (...)) in any WHERE clause. Unfiltered
+    # listings, LIKE searches and range-only reads scan by nature and are not flagged.
+    for clause in re.split(r'\bWHERE\b', statement)[1:]:
+        clause = re.split(r'\b(?:GROUP BY|ORDER BY|LIMIT)\b|\) AS ', clause)[0]
+        if re.search(rf'\b{table}\.\w+ (?:=|IN \()', clause):
+            return True
+    return False
+
+
+def test_route_queries_use_indexes(app, admin_client, make_user, login, make_lot):
+    lot_id = make_lot(4, location='North')
+    other_lot_id = make_lot(2, location='South')
+    user_id = make_user('fleet@example.com', 'Fleet Owner')
+    user_client = login('fleet@example.com')
+    with recorded_sql(app) as statements:
+        drive_routes(app, admin_client, user_client, user_id, lot_id, other_lot_id, statements)
+
+    checked, failures = set(), []
+    for statement, parameters in statements:
+        if not re.match(r'\s*(SELECT|UPDATE|DELETE)\b', statement) or statement in checked:
+            continue
+        checked.add(statement)
+        plan = explain(app, statement, parameters)
+        for line in plan:
+            scan = FULL_SCAN.match(line)
+            if scan and filtered_by_equality(statement, scan.group(1)):
+                failures.append(f"{line}\n    {' '.join(statement.split())}")
+
+    assert len(checked) > 50  # the routes really ran
+    assert not failures, '\n'.join(failures)
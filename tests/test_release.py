@@ -0,0 +1,25 @@
+import pytest
+
+from conftest import book
+from expiry import now_local
+from models import db, Reservation
+
+
+def test_release_stamps_local_leaving_time(app, user_client, make_lot, utc_host):
+    lot_id = make_lot(2)
+    start = now_local()
+    if (start.hour, start.minute) == (23, 59):
+        pytest.skip('no window left today')
+    # The window starts this minute, so a UTC leaving time would land hours before it
+    response = book(user_client, lot_id, 'TN01AB1234', start_time=start.strftime('%I:%M %p'))
+    assert response.headers['Location'].endswith('/user/dashboard')
+    with app.app_context():
+        reservation_id = db.session.scalar(db.select(Reservation.id))
+
+    assert user_client.post(f'/release/{reservation_id}').status_code == 302
+
+    with app.app_context():
+        reservation = db.session.get(Reservation, reservation_id)
+        assert reservation.status == 'Completed'
+        assert reservation.leaving_time >= reservation.parking_time
+        assert reservation.cost >= 0
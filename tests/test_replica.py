@@ -0,0 +1,32 @@
+import sqlite3
+import threading
+
+from flask import Flask
+
+from replica import SQLiteReplicaSync
+
+
+def test_loop_survives_a_failed_sync(tmp_path, monkeypatch):
+    primary = tmp_path / 'primary.db'
+    sqlite3.connect(primary).execute('CREATE TABLE t (x)').connection.close()
+    replica_sync = SQLiteReplicaSync(Flask(__name__), f"sqlite:///{primary}", f"sqlite:///{tmp_path / 'replica.db'}", interval=0.01)
+
+    stop = threading.Event()
+    sync = replica_sync.sync
+    calls = []
+
+    def locked_once():
+        calls.append(True)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        sync()
+        stop.set()
+
+    monkeypatch.setattr(replica_sync, 'sync', locked_once)
+    thread = threading.Thread(target=replica_sync.loop, args=(stop,), daemon=True)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(calls) == 2
+    assert replica_sync.last_synced is not None